@@ -1,47 +1,21 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from agent_orchestration.latency import call_llm
+from agent_orchestration.prompts import build_prompt, section
 import os
 from dotenv import load_dotenv
 import json
 from langchain_core.messages import HumanMessage
+from persistence.progress_writer import emit_progress
+from analytics.store import clamp_score, record_scores
+from agent_orchestration.agents.hint_node import speculate_hint
+from agent_orchestration.speculation import should_speculate
 
 load_dotenv()
 
-# LLM Setup
-llm = ChatOpenAI(temperature=0.2, api_key=os.getenv("OPEN_API_KEY"))
-
-# Prompt Template
-prompt = ChatPromptTemplate.from_messages([
-    ("system", """You're an intelligent DSA progress tracker. Analyze the user's message and determine their current progress.
-
-Assess:
-1. Problem Understanding (0-100)
-2. Approach Clarity (0-100)
-3. Implementation Readiness (0-100)
-4. Complexity Awareness (0-100)
-
-Respond strictly in JSON:
-{{
-    "checkpoint": "understanding|planning|implementing|optimizing|complete",
-    "problem_understanding": 0-100,
-    "approach_clarity": 0-100,
-    "implementation_readiness": 0-100,
-    "complexity_awareness": 0-100,
-    "completion_confidence": 0-100,
-    "key_concepts_mentioned": [...],
-    "missing_concepts": [...],
-    "progress_summary": "...",
-    "needs_guidance": true/false
-}}"""),
-    ("human", """Problem Title: {title}
-Previous Checkpoint: {previous_checkpoint}
-Problem Description: {description}
-User Message: {user_message}""")
-])
-
-chain = prompt | llm
-
-def checkpoint_node(state):
+# needs_guidance when the average score or any single score drops below these
+GUIDANCE_AVG_SCORE = float(os.getenv("GUIDANCE_AVG_SCORE", "40"))
+GUIDANCE_MIN_SCORE = float(os.getenv("GUIDANCE_MIN_SCORE", "30"))
+
+async def checkpoint_node(state, config=None):
     # Safely get last user message
     user_message = ""
     for msg in reversed(state.get("messages", [])):
@@ -54,55 +28,78 @@ def checkpoint_node(state):
             user_message = msg.get("content", "")
             break
 
-    problem_data = state.get("problem_data", {})
-    title = problem_data.get("title", "Unknown Problem")
-    description = problem_data.get("content", "No description available")
     previous_checkpoint = state.get("current_checkpoint", "understanding")
 
-    # Run LLM
-    response = chain.invoke({
-        "title": title,
-        "user_message": user_message,
-        "description": description,
-        "previous_checkpoint": previous_checkpoint
-    })
+    # Run LLM (title and description live in the shared problem block)
+    response = await call_llm("checkpoint", build_prompt("checkpoint", state, [
+        section("Previous Checkpoint", previous_checkpoint),
+        section("User Message", user_message, trim="tail"),
+    ]))
+
+    if response is None:
+        # Deadline missed: a stale score is fine, keep the previous progress_scores
+        return {"current_checkpoint": previous_checkpoint}
 
     # Try parsing response
     try:
         parsed = json.loads(response.content)
         checkpoint = parsed.get("checkpoint", "understanding")
-        confidence = parsed.get("completion_confidence", 0)
+        confidence = clamp_score(parsed.get("completion_confidence"), 0)
 
-        # Build updated state
-        updated_state = dict(state)
-        updated_state["current_checkpoint"] = checkpoint
+        # Only the keys this node changes; the checkpointer keeps the rest of the state as-is
+        updates = {"current_checkpoint": checkpoint}
 
         # Prevent checkpoint duplication
         prev_checkpoints = set(state.get("checkpoints_completed", []))
         if checkpoint not in prev_checkpoints:
-            updated_state["checkpoints_completed"] = list(prev_checkpoints | {checkpoint})
+            updates["checkpoints_completed"] = list(prev_checkpoints | {checkpoint})
 
-        updated_state["progress_scores"] = {
-            "problem_understanding": parsed.get("problem_understanding", 50),
-            "approach_clarity": parsed.get("approach_clarity", 50),
-            "implementation_readiness": parsed.get("implementation_readiness", 50),
-            "complexity_awareness": parsed.get("complexity_awareness", 50),
+        updates["progress_scores"] = {
+            "problem_understanding": clamp_score(parsed.get("problem_understanding"), 50),
+            "approach_clarity": clamp_score(parsed.get("approach_clarity"), 50),
+            "implementation_readiness": clamp_score(parsed.get("implementation_readiness"), 50),
+            "complexity_awareness": clamp_score(parsed.get("complexity_awareness"), 50),
             "completion_confidence": confidence
         }
-        updated_state["checkpoint_analysis"] = parsed
+        updates["checkpoint_analysis"] = parsed
 
         # Only set needs_guidance if scores are actually low
-        avg_score = sum(updated_state["progress_scores"].values()) / len(updated_state["progress_scores"]) if updated_state["progress_scores"] else 50
-        updated_state["needs_guidance"] = avg_score < 40 or any(score < 30 for score in updated_state["progress_scores"].values())
+        avg_score = sum(updates["progress_scores"].values()) / len(updates["progress_scores"]) if updates["progress_scores"] else 50
+        updates["needs_guidance"] = avg_score < GUIDANCE_AVG_SCORE or any(
+            score < GUIDANCE_MIN_SCORE for score in updates["progress_scores"].values()
+        )
 
         # Optional: mark complete based on confidence
         if checkpoint == "complete" and confidence >= 90:
-            updated_state["conversation_complete"] = True
-
-        return updated_state
+            updates["conversation_complete"] = True
 
     except Exception as e:
         print(f"[checkpoint_node] ❌ JSON parse failed: {e}")
-        fallback_state = dict(state)
-        fallback_state["current_checkpoint"] = previous_checkpoint
-        return fallback_state
+        return {"current_checkpoint": previous_checkpoint}
+
+    return updates
+
+def record_scoring(state, updates: dict, config=None):
+    """
+    Side effects of scoring that was applied to the thread: progress row, analytics turn and
+    hint prefetch. Not part of checkpoint_node, since background scoring can still be dropped.
+    """
+    if "progress_scores" not in updates:
+        return
+    updated_state = {**state, **updates}
+
+    # A failure in one of them must not cost the others
+    try:
+        emit_progress(updated_state, config)
+    except Exception as e:
+        print(f"[checkpoint_node] ⚠️ Progress write failed: {e}")
+    try:
+        record_scores(updated_state, config, previous=state)
+    except Exception as e:
+        print(f"[checkpoint_node] ⚠️ Analytics write failed: {e}")
+    try:
+        # Scores drifting toward the guidance threshold: prefetch the hint the user is likely to need
+        if should_speculate(updates["progress_scores"]):
+            speculate_hint(updated_state, config)
+    except Exception as e:
+        print(f"[checkpoint_node] ⚠️ Hint speculation failed: {e}")
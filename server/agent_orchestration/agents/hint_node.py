@@ -1,113 +1,124 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from agent_orchestration.latency import call_llm
+from agent_orchestration.prompts import build_prompt, section
 from langchain_core.messages import HumanMessage
-import os
 import json
-from dotenv import load_dotenv
-
-load_dotenv()
+import time
+from persistence.progress_writer import emit_progress
+from analytics.store import record_hint
+from agent_orchestration.speculation import hint_speculator, speculation_key
 
 def is_human(message) -> bool:
     return isinstance(message, HumanMessage)
 
-# === Define Chat Models ===
-llm = ChatOpenAI(temperature=0.4, api_key=os.getenv("OPEN_API_KEY"))
-
-# === Prompts ===
-
-assessment_prompt = ChatPromptTemplate.from_messages([
-    ("system", """You're an intelligent tutoring assistant and an expert in Leetcode problems. Analyze whether the user is stuck and needs help.
-
-Respond in JSON format like this (escape the braces properly):
-{{
-  "is_stuck": true,
-  "struggling_with": "short phrase",
-  "hint_type": "conceptual",
-  "understanding_level": "beginner"
-}}
-
-Hint types: conceptual, algorithmic, implementation, example
-Understanding levels: beginner, intermediate, advanced"""),
-    ("human", """User Messages: {recent_messages}
-
-Checkpoint: {checkpoint}
-Problem: {title}""")
-])
-
-hint_prompt = ChatPromptTemplate.from_messages([
-    ("system", """You're a helpful tutor. Give a concise hint based on the following:
-    
-Hint Type: {hint_type}
-User Level: {understanding_level}
-Struggling With: {struggling_with}
-
-Respond in 1-3 sentences. Be actionable and clear."""),
-    ("human", "Problem: {title}\nCheckpoint: {checkpoint}\nDescription: {description_html}")
-])
-
-assessment_chain = assessment_prompt | llm
-hint_chain = hint_prompt | llm
-
-# === Hint Node ===
-def hint_node(state):
-    problem_data = state.get("problem_data", {})
+DEFAULT_ASSESSMENT = {
+    "struggling_with": "general reasoning",
+    "hint_type": "conceptual",
+    "understanding_level": "intermediate"
+}
+
+CANNED_HINTS = {
+    "understanding": "Restate the problem in your own words: what exactly is the input, and what must you return?",
+    "planning": "Try the smallest example by hand and notice what you keep looking up or recomputing.",
+    "implementing": "Write down the loop invariant first: what is true about your data structure after each step?",
+    "optimizing": "Find the step you repeat most often and ask which data structure makes that step O(1).",
+    "complete": "Walk through an edge case (empty input, duplicates, one element) against your solution.",
+}
+
+def _tokens(response) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+async def generate_hint(state, result: dict) -> tuple:
+    """Run the hint prompt for an assessment; returns (hint content, tokens used)"""
+    hint_response = await call_llm("hint", build_prompt("hint", state, [
+        section("Checkpoint", state.get("current_checkpoint", "understanding")),
+        section("Hint Type", result.get("hint_type", "conceptual")),
+        section("User Level", result.get("understanding_level", "intermediate")),
+        section("Struggling With", result.get("struggling_with", "general"), trim="tail"),
+    ]))
+    if hint_response is None:
+        # Deadline missed: serve a canned hint for the checkpoint instead of making the user wait
+        checkpoint = state.get("current_checkpoint", "understanding")
+        return CANNED_HINTS.get(checkpoint, CANNED_HINTS["understanding"]), 0
+    return getattr(hint_response, "content", str(hint_response)), _tokens(hint_response)
+
+async def build_hint(state, assess: bool = True) -> dict:
+    """Assessment + hint generation, shared by hint_node and speculative prefetching"""
     recent_messages = [m.content for m in state["messages"][-10:] if is_human(m)]
-    checkpoint = state.get("current_checkpoint", "understanding")
-    title = problem_data.get("title", "Unknown Problem")
-    description = problem_data.get("content", "No description available")
-
-    # --- CASE 1: If user clicked "Get Hint", skip LLM assessment ---
-    if state.get("hint_requested", False):
-        is_hint_forced = True
-    else:
-        is_hint_forced = False
+    tokens = 0
 
-    # --- CASE 2: Otherwise assess if user is struggling ---
-    if not is_hint_forced:
-        response = assessment_chain.invoke({
-            "recent_messages": "\n".join(recent_messages),
-            "checkpoint": checkpoint,
-            "title": title
-        })
+    if assess:
+        response = await call_llm("hint", build_prompt("hint_assessment", state, [
+            section("Checkpoint", state.get("current_checkpoint", "understanding")),
+            # Oldest user messages go first when over budget
+            section("User Messages", "\n".join(recent_messages), trim="oldest_lines"),
+        ]))
+        tokens += _tokens(response)
 
         try:
+            if response is None:
+                raise ValueError("assessment missed its deadline")
             result = json.loads(response.content)
             is_stuck = result.get("is_stuck", False)
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, ValueError):
             is_stuck = True  # fallback
-            result = {
-                "struggling_with": "general reasoning",
-                "hint_type": "conceptual",
-                "understanding_level": "intermediate"
-            }
+            result = dict(DEFAULT_ASSESSMENT)
 
         if not is_stuck:
-            return {
-                "messages": state["messages"] + [
-                    {"role": "system", "content": "👍 Keep going — you're making good progress!"}
-                ],
-                "hint_requested": False,
-                "hint_satisfied": False
-            }
+            return {"assessment": result, "is_stuck": False, "content": None, "tokens": tokens}
     else:
         # Default fallback in case hint_requested is True but no prior assessment
-        result = {
-            "struggling_with": "general reasoning",
-            "hint_type": "conceptual",
-            "understanding_level": "intermediate"
-        }
+        result = dict(DEFAULT_ASSESSMENT)
+
+    content, hint_tokens = await generate_hint(state, result)
+    return {"assessment": result, "is_stuck": True, "content": content, "tokens": tokens + hint_tokens}
+
+def speculate_hint(state, config=None):
+    """Prefetch the likely next hint in the background (called by checkpoint_node)"""
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    if not thread_id:
+        return
+    snapshot = dict(state)
+    hint_speculator.submit(
+        thread_id,
+        speculation_key(snapshot),
+        snapshot.get("total_socratic_turns", 0),
+        lambda: build_hint(snapshot, assess=True),
+    )
 
-    # --- Generate Hint ---
-    hint_response = hint_chain.invoke({
-        "title": title,
-        "checkpoint": checkpoint,
-        "description_html": description,
-        "hint_type": result.get("hint_type", "conceptual"),
-        "understanding_level": result.get("understanding_level", "intermediate"),
-        "struggling_with": result.get("struggling_with", "general")
-    })
+# === Hint Node ===
+async def hint_node(state, config=None):
+    started = time.perf_counter()
+    checkpoint = state.get("current_checkpoint", "understanding")
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+
+    # --- CASE 1: If user clicked "Get Hint", skip LLM assessment ---
+    is_hint_forced = state.get("hint_requested", False)
+
+    # --- Serve a speculative hint if one is ready for this checkpoint / struggle ---
+    built = await hint_speculator.take(thread_id, speculation_key(state), state.get("total_socratic_turns", 0))
+    speculative_hit = built is not None
+    if built is None:
+        # --- CASE 2: Otherwise assess if user is struggling ---
+        built = await build_hint(state, assess=not is_hint_forced)
+    elif is_hint_forced and built["content"] is None:
+        # Speculation decided the user wasn't stuck, but they asked anyway
+        content, _ = await generate_hint(state, built["assessment"])
+        built = {**built, "is_stuck": True, "content": content}
+
+    hint_speculator.record_latency((time.perf_counter() - started) * 1000, speculative_hit)
+    result = built["assessment"]
+
+    if not built["is_stuck"] and not is_hint_forced:
+        return {
+            "messages": [
+                {"role": "system", "content": "👍 Keep going — you're making good progress!"}
+            ],
+            "hint_requested": False,
+            "hint_satisfied": False
+        }
 
-    hint_content = getattr(hint_response, "content", str(hint_response))
+    hint_content = built["content"]
 
     # --- Update State ---
     new_hint_data = {
@@ -117,10 +128,13 @@ def hint_node(state):
         "content": hint_content
     }
 
-    return {
-        "messages": state["messages"] + [{"role": "assistant", "content": f"💡 **Hint**: {hint_content}"}],
+    updated_state = {
+        "messages": [{"role": "assistant", "content": f"💡 **Hint**: {hint_content}"}],
         "hints_given": state.get("hints_given", []) + [new_hint_data],
         "hint_requested": False,
         "hint_satisfied": True,
         "last_hint_assessment": result
     }
+    emit_progress({**state, **updated_state}, config)
+    record_hint(config)
+    return updated_state
@@ -1,48 +1,168 @@
 from agent_orchestration.tools.leetcode_problem_tool import fetch_leetcode_problem
-import re 
+from agent_orchestration.problem_store import problem_store
+import asyncio
+import os
+import re
 import json
+import time
+from typing import Iterator, List, Optional, Tuple
 from langchain_core.messages import HumanMessage
 
+# A fetched problem is reused by every thread for this long before it's fetched again
+PROBLEM_TTL_S = float(os.getenv("PROBLEM_TTL_S", str(24 * 3600)))
+# A slug whose fetch failed isn't fetched again for this long
+FAILED_SLUG_TTL_S = float(os.getenv("FAILED_SLUG_TTL_S", "300"))
+MAX_FAILED_SLUGS = 1024
+
 def is_human(message) -> bool:
     return isinstance(message, HumanMessage)
 
-def extract_title_slug(user_input: str) -> str:
+# === Slug Matching ===
+# Compiled once; most turns contain neither marker and skip the regex entirely.
+# LeetCode URLs (optionally @-prefixed) or @slug mentions, anywhere in a message.
+SLUG_MENTION = re.compile(
+    r"@?https?://(?:www\.)?leetcode\.(?:com|cn)/problems/([A-Za-z0-9-]+)|(?<![\w/])@([A-Za-z0-9-]+)"
+)
+BARE_SLUG = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+def _mentions(text: str) -> Iterator[Tuple[str, bool]]:
+    """(slug, from a full URL) for every mention in a message"""
+    if "leetcode." not in text and "@" not in text:
+        return
+    for match in SLUG_MENTION.finditer(text):
+        yield (match.group(1) or match.group(2)).lower(), match.group(1) is not None
+
+def find_problem_slugs(text: str) -> List[str]:
+    """Problem slugs mentioned in a message, in order, without duplicates"""
+    slugs = []
+    for slug, _ in _mentions(text):
+        if slug not in slugs:
+            slugs.append(slug)
+    return slugs
+
+def find_switch_slugs(text: str) -> List[str]:
+    """
+    Problems a message asks for once the thread already has one: full LeetCode URLs, or
+    @slugs of problems fetched before. Any other @word (@lru_cache, @alice) is prose.
+    """
+    slugs = []
+    for slug, from_url in _mentions(text):
+        if slug in slugs or recently_failed(slug):
+            continue
+        if from_url or problem_store.latest(slug) is not None:
+            slugs.append(slug)
+    return slugs
+
+def extract_title_slug(user_input: str) -> Optional[str]:
     """Extract title_slug from various LeetCode URL formats or direct slug input"""
-    # Pattern to match LeetCode URLs with optional @ prefix and trailing slash
-    url_pattern = r'@?https?://leetcode\.com/problems/([^/\s]+)/?'
-    match = re.search(url_pattern, user_input)
-    
-    if match:
-        return match.group(1)
-    
-    # Alternative pattern for just the problem slug with @
-    slug_pattern = r'@([a-z0-9-]+)'
-    match = re.search(slug_pattern, user_input.lower())
-    if match:
-        return match.group(1)
-    
+    slugs = find_problem_slugs(user_input)
+    if slugs:
+        return slugs[0]
+
     # If no special patterns, assume the input is just the slug itself
-    # Clean it up by removing any whitespace and converting to lowercase
     cleaned = user_input.strip().lower()
-    if re.match(r'^[a-z0-9-]+$', cleaned):
-        return cleaned
-    
-    return None
+    return cleaned if BARE_SLUG.fullmatch(cleaned) else None
+
+def last_user_message(state: dict) -> str:
+    for message in reversed(state.get("messages", [])):
+        if is_human(message):
+            return message.content.strip()
+    return ""
+
+# === Warm Problem Loading ===
+_inflight = {}
+_failed = {}  # slug -> when its last fetch failed (monotonic), oldest first
+
+def recently_failed(title_slug: str) -> bool:
+    failed_at = _failed.get(title_slug)
+    return failed_at is not None and time.monotonic() - failed_at < FAILED_SLUG_TTL_S
+
+def _record_failure(title_slug: str):
+    _failed.pop(title_slug, None)
+    _failed[title_slug] = time.monotonic()
+    while len(_failed) > MAX_FAILED_SLUGS:
+        del _failed[next(iter(_failed))]
+
+async def _fetch_and_intern(title_slug: str) -> dict:
+    try:
+        problem_data = await fetch_leetcode_problem.ainvoke(title_slug)
+    except Exception:
+        _record_failure(title_slug)
+        raise
+
+    # Get the Python code snippet
+    code_snippet_python = next(
+        (snip["code"] for snip in problem_data["codeSnippets"] if "python" in snip["langSlug"].lower()), ""
+    )
+
+    return problem_store.intern({
+        "question_id": problem_data["questionId"],
+        "title": problem_data["title"],
+        "title_slug": title_slug,
+        "difficulty": problem_data["difficulty"],
+        # Topic tags (e.g., Array, Hash Table)
+        "topics": [tag["name"] for tag in problem_data["topicTags"]],
+        "description_html": problem_data["content"],
+        "examples": problem_data.get("exampleTestcases", []),
+        "code_snippet_python": code_snippet_python,
+    })
+
+async def load_problem(title_slug: str) -> dict:
+    """
+    Reference to an interned problem: reused if any thread fetched it within PROBLEM_TTL_S,
+    otherwise fetched once no matter how many threads ask for it at the same time.
+    """
+    ref = problem_store.fresh(title_slug, PROBLEM_TTL_S)
+    if ref is not None:
+        return ref
+    if recently_failed(title_slug):
+        raise LookupError(f"fetching '{title_slug}' failed less than {FAILED_SLUG_TTL_S:.0f}s ago")
+    task = _inflight.get(title_slug)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_intern(title_slug))
+        _inflight[title_slug] = task
+        task.add_done_callback(lambda _: _inflight.pop(title_slug, None))
+    return await asyncio.shield(task)
+
+def fresh_problem_state(ref: dict) -> dict:
+    """Per-problem fields for a problem the thread hasn't worked on yet"""
+    return {
+        "problem_extracted": True,
+        "title_slug": ref["title_slug"],
+        "problem_data": None,
+        "problem_ref": ref,
+        "current_checkpoint": "understanding",
+        "checkpoints_completed": [],
+        "hints_given": [],
+        "progress_scores": {},
+        "checkpoint_analysis": {},
+        "needs_guidance": False,
+        "last_hint_assessment": {},
+        "total_socratic_turns": 0,
+        "conversation_complete": False,
+        "hint_satisfied": False,
+        "session_started": True,
+    }
+
+def fetched_message(ref: dict) -> dict:
+    problem = problem_store.get(ref) or {}
+    return {
+        "role": "system",
+        "content": f"Fetched '{problem.get('title')}' with difficulty {problem.get('difficulty')} and topics: {', '.join(problem.get('topics') or ())}."
+    }
 
 async def ingest_node(state: dict) -> dict:
     """Extract LeetCode problem slug from user input and fetch problem data"""
-    # Fix: Access .content directly from the message object
-    user_input = "" 
-    if is_human(state["messages"][0]):
-        user_input = state["messages"][0].content.strip()
-    
-    # Extract the title slug
-    title_slug = extract_title_slug(user_input)
-    
+    user_input = last_user_message(state)
+
+    # Extract the title slug; further problems in the same message are queued
+    slugs = find_problem_slugs(user_input)
+    title_slug = slugs[0] if slugs else extract_title_slug(user_input)
+
     if not title_slug:
         return {
-            "messages": state["messages"] + [{
-                "role": "system", 
+            "messages": [{
+                "role": "system",
                 "content": json.dumps({
                     "problem_extracted": False,
                     "error": "Could not extract LeetCode problem slug from input. Please provide a valid LeetCode URL or problem slug."
@@ -52,52 +172,29 @@ async def ingest_node(state: dict) -> dict:
             "problem_data": None,
             "session_started": False
         }
-    
-    try:
-        problem_data = await fetch_leetcode_problem.ainvoke(title_slug)
 
-        # Get the Python code snippet
-        code_snippet_python = next(
-            (snip["code"] for snip in problem_data["codeSnippets"] if "python" in snip["langSlug"].lower()), ""
-        )
-
-        # Extract topic tags (e.g., Array, Hash Table)
-        topics = [tag["name"] for tag in problem_data["topicTags"]]
+    try:
+        ref = await load_problem(title_slug)
 
-        # Update the state with extracted problem data
+        # Update the state with the problem reference
         return {
-            "messages": state["messages"] + [{
-                "role": "system",
-                "content": f"Fetched '{problem_data['title']}' with difficulty {problem_data['difficulty']} and topics: {', '.join(topics)}."
-            }],
-            "problem_extracted": True,
-            "problem_data": {
-                "question_id": problem_data["questionId"],
-                "title": problem_data["title"],
-                "difficulty": problem_data["difficulty"],
-                "topics": topics,
-                "description_html": problem_data["content"],
-                "examples": problem_data.get("exampleTestcases", []),
-                "code_snippet_python": code_snippet_python,
-            },
-            "current_checkpoint": "understanding",
-            "checkpoints_completed": [],
-            "hints_given": [],
-            "session_started": True
+            "messages": [fetched_message(ref)],
+            **fresh_problem_state(ref),
+            "problem_queue": [slug for slug in slugs[1:] if slug != title_slug],
         }
-        
+
     except Exception as e:
         error_analysis = {
             "problem_extracted": False,
             "error": f"Failed to fetch problem data for '{title_slug}': {str(e)}"
         }
-        
+
         return {
-            "messages": state["messages"] + [{
+            "messages": [{
                 "role": "system",
                 "content": json.dumps(error_analysis)
             }],
             "problem_extracted": False,
             "problem_data": None,
             "session_started": False
-        }
\ No newline at end of file
+        }
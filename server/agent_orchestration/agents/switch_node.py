@@ -0,0 +1,86 @@
+from agent_orchestration.agents.ingest_node import (
+    fetched_message, find_switch_slugs, fresh_problem_state, last_user_message, load_problem, recently_failed,
+)
+from agent_orchestration.problem_store import problem_store
+import os
+import json
+from typing import Optional
+
+# Fields that belong to the active problem; parked per problem in state["problems"] on a switch
+PROBLEM_FIELDS = (
+    "problem_ref",
+    "current_checkpoint",
+    "checkpoints_completed",
+    "hints_given",
+    "progress_scores",
+    "checkpoint_analysis",
+    "needs_guidance",
+    "last_hint_assessment",
+    "total_socratic_turns",
+    "conversation_complete",
+    "hint_satisfied",
+)
+# Parked problems per thread; the least recently left one is dropped beyond this
+MAX_PARKED_PROBLEMS = int(os.getenv("MAX_PARKED_PROBLEMS", "20"))
+
+def requested_problem(state: dict) -> Optional[str]:
+    """Problem this turn switches to: a newly mentioned one, or the next queued one once the current is done"""
+    active = state.get("title_slug")
+    for slug in find_switch_slugs(last_user_message(state)):
+        if slug != active:
+            return slug
+    if state.get("conversation_complete") and state.get("problem_queue"):
+        return state["problem_queue"][0]
+    return None
+
+def park_problem(state: dict) -> dict:
+    return {field: state.get(field) for field in PROBLEM_FIELDS}
+
+async def switch_node(state: dict) -> dict:
+    """
+    Switch the thread to another problem. The current problem's progress is parked in
+    state["problems"]; a parked problem is restored as it was, with no fetch or ingest.
+    """
+    target = requested_problem(state)
+    active = state.get("title_slug")
+    mentioned = find_switch_slugs(last_user_message(state))
+    queue = [slug for slug in state.get("problem_queue") or [] if slug != target and not recently_failed(slug)]
+    queue += [slug for slug in mentioned if slug not in (target, active) and slug not in queue]
+
+    problems = dict(state.get("problems") or {})
+    parked = problems.pop(target, None)
+    if parked is not None:
+        restored = {**parked, "problem_extracted": True, "title_slug": target, "problem_data": None}
+        problem = problem_store.get(parked.get("problem_ref")) or {}
+        message = {
+            "role": "system",
+            "content": f"Back to '{problem.get('title', target)}' at checkpoint {parked.get('current_checkpoint')}."
+        }
+    else:
+        try:
+            ref = await load_problem(target)
+        except Exception as e:
+            # Stay on the current problem; the mention may not have been a problem at all
+            print(f"[switch] ❌ Could not load '{target}': {e}")
+            return {
+                "messages": [{
+                    "role": "system",
+                    "content": json.dumps({"problem_switched": False, "error": f"Failed to fetch problem data for '{target}': {str(e)}"})
+                }],
+                "problem_queue": queue,
+            }
+        restored = fresh_problem_state(ref)
+        message = fetched_message(ref)
+
+    if active:
+        problems[active] = park_problem(state)
+        while len(problems) > MAX_PARKED_PROBLEMS:
+            del problems[next(iter(problems))]
+    print(f"[switch] 🔀 {active} → {target} ({'restored' if parked is not None else 'new'})")
+
+    return {
+        "messages": [message],
+        **restored,
+        "problems": problems,
+        "problem_queue": queue,
+    }
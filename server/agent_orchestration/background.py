@@ -0,0 +1,167 @@
+import asyncio
+import itertools
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+# Lower runs first
+PRIORITY_SCORING = 0
+PRIORITY_ANALYTICS = 5
+PRIORITY_PERSISTENCE = 9
+
+
+class _Job:
+    def __init__(self, thread_id: Optional[str], name: str, run: Callable[[], Awaitable], retries: int):
+        self.thread_id = thread_id
+        self.name = name
+        self.run = run
+        self.retries = retries
+        self.attempts = 0
+        self.enqueued = time.perf_counter()
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class JobQueue:
+    """
+    Bounded priority queue + worker pool for graph work the user does not wait on
+    (scoring, hint-need assessment, analytics). Jobs are tracked per thread so the next
+    turn can wait for its thread's pending work before it is routed.
+    """
+
+    def __init__(self, workers: int = 8, max_depth: int = 1000, retries: int = 2, backoff_s: float = 0.5):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {
+            "enqueued": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "rejected": 0,
+            "max_depth_seen": 0,
+            "last_job_ms": 0.0,
+            "last_wait_ms": 0.0,
+        }
+
+    def _ensure_started(self):
+        # Workers start lazily on the running loop so the harnesses work without FastAPI startup
+        loop = asyncio.get_running_loop()
+        if self._queue is not None and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_depth)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def start(self):
+        self._ensure_started()
+
+    async def stop(self, drain_timeout: float = 5.0):
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"[background] ⚠️ Stopping with {self._queue.qsize()} jobs still queued")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def enqueue(self, name: str, run: Callable[[], Awaitable], thread_id: Optional[str] = None,
+                priority: int = PRIORITY_SCORING, retries: Optional[int] = None) -> Optional[asyncio.Future]:
+        """Queue a job; returns None (and counts a rejection) when the queue is full"""
+        self._ensure_started()
+        job = _Job(thread_id, name, run, self.retries if retries is None else retries)
+        try:
+            self._queue.put_nowait((priority, next(self._seq), job))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            print(f"[background] ⚠️ Queue full, dropping {name} job for {thread_id}")
+            return None
+        self.stats["enqueued"] += 1
+        self.stats["max_depth_seen"] = max(self.stats["max_depth_seen"], self._queue.qsize())
+        if thread_id:
+            self._pending.setdefault(thread_id, set()).add(job.done)
+            job.done.add_done_callback(lambda _: self._forget(thread_id, job.done))
+        return job.done
+
+    def _forget(self, thread_id: str, done: asyncio.Future):
+        pending = self._pending.get(thread_id)
+        if pending is not None:
+            pending.discard(done)
+            if not pending:
+                del self._pending[thread_id]
+
+    def pending(self, thread_id: str) -> int:
+        return len(self._pending.get(thread_id, ()))
+
+    async def wait_for_thread(self, thread_id: str, timeout: float) -> bool:
+        """Wait for a thread's queued work; False if it did not finish within `timeout`"""
+        pending = list(self._pending.get(thread_id, ()))
+        if not pending:
+            return True
+        started = time.perf_counter()
+        done, not_done = await asyncio.wait(pending, timeout=timeout)
+        self.stats["last_wait_ms"] = (time.perf_counter() - started) * 1000
+        return not not_done
+
+    async def _worker(self):
+        while True:
+            priority, _, job = await self._queue.get()
+            try:
+                await self._run(priority, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, priority: int, job: _Job):
+        job.attempts += 1
+        started = time.perf_counter()
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            if not job.done.done():
+                job.done.cancel()
+            raise
+        except Exception as e:
+            if job.attempts <= job.retries:
+                self.stats["retried"] += 1
+                print(f"[background] 🔁 {job.name} for {job.thread_id} failed ({e}), retry {job.attempts}")
+                asyncio.get_running_loop().call_later(
+                    self.backoff_s * 2 ** (job.attempts - 1), self._requeue, priority, job
+                )
+                return
+            self.stats["failed"] += 1
+            print(f"[background] ❌ {job.name} for {job.thread_id} failed: {e}")
+            if not job.done.done():
+                job.done.set_exception(e)
+                job.done.exception()  # mark retrieved; waiters only care that it finished
+            return
+        self.stats["completed"] += 1
+        self.stats["last_job_ms"] = (time.perf_counter() - started) * 1000
+        if not job.done.done():
+            job.done.set_result(result)
+
+    def _requeue(self, priority: int, job: _Job):
+        try:
+            self._queue.put_nowait((priority, next(self._seq), job))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            job.done.set_exception(RuntimeError("queue full on retry"))
+            job.done.exception()
+
+    def metrics(self) -> dict:
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {**self.stats, "depth": depth, "max_depth": self.max_depth, "threads_pending": len(self._pending)}
+
+
+background_jobs = JobQueue(
+    workers=int(os.getenv("BACKGROUND_WORKERS", "8")),
+    max_depth=int(os.getenv("BACKGROUND_MAX_DEPTH", "1000")),
+)
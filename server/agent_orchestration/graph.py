@@ -1,12 +1,16 @@
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
-from typing import TypedDict, List, Optional, Annotated
+from langchain_core.runnables import RunnableLambda
+from typing import TypedDict, Dict, List, Optional, Annotated
 
 from agent_orchestration.agents.ingest_node import ingest_node
 from agent_orchestration.agents.socratic_node import socratic_node
 from agent_orchestration.agents.hint_node import hint_node
-from agent_orchestration.agents.checkpoint_node import checkpoint_node
+from agent_orchestration.agents.checkpoint_node import checkpoint_node, record_scoring
+from agent_orchestration.agents.switch_node import switch_node, requested_problem
+from agent_orchestration.session_lifecycle import SessionSaver
+from agent_orchestration.speculation import hint_speculator
+from analytics.store import analytics_store
 
 # === State Schema ===
 class ProblemData(TypedDict, total=False):
@@ -24,6 +28,10 @@ class ProblemData(TypedDict, total=False):
     data_structures: List[str]
     concepts: List[str]
 
+class ProblemRef(TypedDict):
+    title_slug: str
+    version: str
+
 class HintData(TypedDict, total=False):
     checkpoint: str
     hint_type: str
@@ -36,10 +44,25 @@ class HintAssessment(TypedDict, total=False):
     hint_type: str
     understanding_level: str
 
+class ProblemSession(TypedDict, total=False):
+    """Progress on a problem the thread switched away from (see switch_node.PROBLEM_FIELDS)"""
+    problem_ref: ProblemRef
+    current_checkpoint: str
+    checkpoints_completed: List[str]
+    hints_given: List[HintData]
+    progress_scores: dict
+    checkpoint_analysis: dict
+    needs_guidance: bool
+    last_hint_assessment: HintAssessment
+    total_socratic_turns: int
+    conversation_complete: bool
+    hint_satisfied: bool
+
 class State(TypedDict, total=False):
     messages: Annotated[List[dict], add_messages]
     problem_extracted: bool
-    problem_data: Optional[ProblemData]
+    problem_data: Optional[ProblemData]  # only in checkpoints written before problem_ref
+    problem_ref: Optional[ProblemRef]
     title_slug: Optional[str]
     extraction_successful: bool
     current_checkpoint: Optional[str]
@@ -55,28 +78,66 @@ class State(TypedDict, total=False):
     last_hint_assessment: Optional[HintAssessment]
     total_socratic_turns: int
     ingest_completed: bool
+    problems: Dict[str, ProblemSession]
+    problem_queue: List[str]
+
+def new_session_state(messages: list) -> State:
+    """Initial state for the first message on a thread"""
+    return {
+        "messages": messages,
+        "problem_extracted": False,
+        "problem_data": None,
+        "problem_ref": None,
+        "current_checkpoint": "understanding",
+        "checkpoints_completed": [],
+        "hint_requested": False,
+        "hints_given": [],
+        "session_started": False,
+        "conversation_complete": False,
+        "hint_satisfied": False,
+        "progress_scores": {},
+        "checkpoint_analysis": {},
+        "needs_guidance": False,
+        "last_hint_assessment": {},
+        "total_socratic_turns": 0,
+        "problems": {},
+        "problem_queue": [],
+    }
 
 # === Memory + Graph Builder ===
-memory = MemorySaver()
+# In-memory checkpoints, pruned per thread and spilled to disk when idle (see session_lifecycle)
+memory = SessionSaver()
+memory.add_eviction_listener(hint_speculator.evict)
+memory.add_eviction_listener(analytics_store.evict)
 builder = StateGraph(State)
 
+async def scored_checkpoint_node(state: State, config=None) -> dict:
+    """Inline scoring: the node's updates go straight into the thread, so record them here"""
+    updates = await checkpoint_node(state, config)
+    record_scoring(state, updates, config)
+    return updates
+
 # === Define Nodes ===
 builder.set_entry_point("router")
 builder.add_node("router", lambda state: state)
 builder.add_node("ingest", ingest_node)
+builder.add_node("switch", switch_node)
 builder.add_node("socratic", socratic_node)
-builder.add_node("checkpoint", checkpoint_node)
+builder.add_node("checkpoint", scored_checkpoint_node)
 builder.add_node("hint", hint_node)
-builder.add_node("completion_checker", lambda state: {
-    **state,
-    "conversation_complete": state.get("current_checkpoint") == "complete"
-})
+builder.add_node("completion_checker", lambda state: completion_checker(state))
+
+def completion_checker(state: State) -> dict:
+    return {"conversation_complete": state.get("current_checkpoint") == "complete"}
 
 # === Routing Logic ===
 def router_node(state: State) -> str:
     if not state.get("problem_extracted"):
         print("🧭 ROUTER → ingest")
         return "ingest"
+    if requested_problem(state):
+        print("🧭 ROUTER → switch")
+        return "switch"
     if state.get("conversation_complete"):
         print("🧭 ROUTER → END")
         return END
@@ -86,6 +147,9 @@ def router_node(state: State) -> str:
 def after_ingest(state: State) -> str:
     return "socratic" if state.get("problem_extracted") else END
 
+def after_switch(state: State) -> str:
+    return END if state.get("conversation_complete") else "socratic"
+
 def after_socratic(state: State) -> str:
     return "checkpoint"
 
@@ -108,6 +172,7 @@ def after_hint(state: State) -> str:
 # === Define Graph Edges ===
 builder.add_conditional_edges("router", router_node, {
     "ingest": "ingest",
+    "switch": "switch",
     "socratic": "socratic",
     END: END,
 })
@@ -117,6 +182,11 @@ builder.add_conditional_edges("ingest", after_ingest, {
     END: END,
 })
 
+builder.add_conditional_edges("switch", after_switch, {
+    "socratic": "socratic",
+    END: END,
+})
+
 builder.add_conditional_edges("socratic", after_socratic, {
     "checkpoint": "checkpoint"
 })
@@ -137,3 +207,59 @@ builder.add_conditional_edges("hint", after_hint, {
 
 # === Compile the Graph ===
 graph = builder.compile(checkpointer=memory)
+
+# === Interactive Graph ===
+# Reply path only: route → socratic reply (→ hint). Scoring, completion and hint-need
+# assessment run afterwards as a background job (score_turn) on the same checkpointer.
+interactive_builder = StateGraph(State)
+interactive_builder.set_entry_point("router")
+interactive_builder.add_node("router", lambda state: state)
+interactive_builder.add_node("ingest", ingest_node)
+interactive_builder.add_node("switch", switch_node)
+interactive_builder.add_node("socratic", socratic_node)
+interactive_builder.add_node("hint", hint_node)
+# Never routed to: background scoring writes its updates as this node (see score_turn)
+interactive_builder.add_node("score", lambda state: {})
+
+def after_socratic_interactive(state: State) -> str:
+    # needs_guidance comes from the previous turn's background scoring
+    if state.get("hint_requested") or state.get("needs_guidance"):
+        print("🧠 Needs guidance → hint")
+        return "hint"
+    return END
+
+interactive_builder.add_conditional_edges("router", router_node, {
+    "ingest": "ingest",
+    "switch": "switch",
+    "socratic": "socratic",
+    END: END,
+})
+interactive_builder.add_conditional_edges("ingest", after_ingest, {
+    "socratic": "socratic",
+    END: END,
+})
+interactive_builder.add_conditional_edges("switch", after_switch, {
+    "socratic": "socratic",
+    END: END,
+})
+interactive_builder.add_conditional_edges("socratic", after_socratic_interactive, {
+    "hint": "hint",
+    END: END,
+})
+interactive_builder.add_edge("hint", END)
+interactive_builder.add_edge("score", END)
+
+interactive_graph = interactive_builder.compile(checkpointer=memory)
+
+async def score_turn(state: State, config=None) -> dict:
+    """
+    Background half of a turn: checkpoint scoring + completion check. Once the updates are
+    applied, record_scoring also prefetches the hint when scores drop, so a hint on the next
+    turn is served without waiting.
+    """
+    if not state.get("problem_extracted") or state.get("conversation_complete"):
+        return {}
+    # As a runnable, so its LLM calls report to the config's callbacks (token accounting)
+    updates = await RunnableLambda(checkpoint_node).ainvoke(state, config)
+    updates.update(completion_checker({**state, **updates}))
+    return updates
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from agent_orchestration.llm import get_llm
+from agent_orchestration.prompts import prompt_cache_stats
+
+# Per-node latency policy:
+#   deadline_s       give up on an attempt after this long
+#   hedge            send a duplicate request once the attempt is slower than the node's p95
+#   retries          extra attempts after a deadline miss before falling back
+NODE_POLICIES = {
+    "checkpoint": {"deadline_s": 6.0, "hedge": True, "retries": 0},
+    "hint": {"deadline_s": 8.0, "hedge": True, "retries": 0},
+    "socratic": {"deadline_s": 12.0, "hedge": True, "retries": 1},
+}
+DEFAULT_POLICY = {"deadline_s": 10.0, "hedge": False, "retries": 0}
+
+# Until a node has enough samples its p95 is unknown; hedge after this instead
+DEFAULT_HEDGE_AFTER_S = 2.0
+MIN_HEDGE_AFTER_S = 0.05
+MIN_SAMPLES = 20
+WINDOW = 500
+
+SERVED_PATHS = ("primary", "hedge", "retry", "fallback")
+
+
+def percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LatencyPolicy:
+    """
+    Deadlines, p95-triggered hedged requests and retries around a node's LLM calls.
+    `call` returns None when every attempt missed its deadline or failed; the node then
+    serves its own fallback (previous scores, a banked hint, a canned reply).
+    """
+
+    def __init__(self, policies: dict):
+        self.policies = policies
+        self._samples = {}
+        self.served = {}
+
+    def policy(self, node: str) -> dict:
+        return self.policies.get(node, DEFAULT_POLICY)
+
+    def hedge_after(self, node: str) -> float:
+        samples = self._samples.get(node)
+        if not samples or len(samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_AFTER_S
+        return max(MIN_HEDGE_AFTER_S, percentile(samples, 95))
+
+    def _observe(self, node: str, seconds: float):
+        self._samples.setdefault(node, deque(maxlen=WINDOW)).append(seconds)
+
+    def _serve(self, node: str, path: str):
+        counts = self.served.setdefault(node, dict.fromkeys(SERVED_PATHS, 0))
+        counts[path] += 1
+
+    async def _timed(self, node: str, variant: str, prompt, inputs: Optional[dict]):
+        started = time.perf_counter()
+        if inputs is None:
+            # Already-assembled messages (agent_orchestration.prompts.build_prompt)
+            response = await get_llm(variant).ainvoke(prompt)
+        else:
+            response = await (prompt | get_llm(variant)).ainvoke(inputs)
+        self._observe(node, time.perf_counter() - started)
+        prompt_cache_stats.observe(node, response)
+        return response
+
+    async def _attempt(self, node: str, prompt, inputs: Optional[dict], policy: dict):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + policy["deadline_s"]
+        hedge_at = started + self.hedge_after(node) if policy["hedge"] else None
+
+        primary = asyncio.create_task(self._timed(node, node, prompt, inputs))
+        tasks = {primary: "primary"}
+        try:
+            while True:
+                wake_at = min(deadline, hedge_at) if hedge_at is not None else deadline
+                done, _ = await asyncio.wait(tasks, timeout=max(0.0, wake_at - loop.time()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    path = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result(), path
+                    print(f"[latency] ❌ {node} {path} request failed: {task.exception()}")
+
+                now = loop.time()
+                if hedge_at is not None and (now >= hedge_at or not tasks):
+                    # Slower than p95 (or the primary errored): race a duplicate request
+                    hedge = asyncio.create_task(self._timed(node, f"{node}:hedge", prompt, inputs))
+                    tasks[hedge] = "hedge"
+                    hedge_at = None
+                elif now >= deadline or not tasks:
+                    if now >= deadline:
+                        # Censored sample: the call took at least the deadline
+                        self._observe(node, policy["deadline_s"])
+                    return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, node: str, prompt, inputs: Optional[dict] = None):
+        """
+        Run a node's LLM request under its latency policy: `prompt | llm` with `inputs`, or
+        `prompt` as ready-made messages when `inputs` is None. None means use the fallback.
+        """
+        policy = self.policy(node)
+        for attempt in range(policy["retries"] + 1):
+            result = await self._attempt(node, prompt, inputs, policy)
+            if result is not None:
+                response, path = result
+                self._serve(node, "retry" if attempt else path)
+                return response
+            print(f"[latency] ⏱️ {node} missed its {policy['deadline_s']}s deadline (attempt {attempt + 1})")
+        self._serve(node, "fallback")
+        return None
+
+    def metrics(self) -> dict:
+        report = {}
+        for node in sorted(set(self._samples) | set(self.served)):
+            samples = self._samples.get(node, ())
+            report[node] = {
+                "served": self.served.get(node, dict.fromkeys(SERVED_PATHS, 0)),
+                "p50_ms": round(percentile(samples, 50) * 1000, 1) if samples else None,
+                "p95_ms": round(percentile(samples, 95) * 1000, 1) if samples else None,
+                "p99_ms": round(percentile(samples, 99) * 1000, 1) if samples else None,
+                "hedge_after_ms": round(self.hedge_after(node) * 1000, 1),
+            }
+        return report
+
+
+latency_policy = LatencyPolicy(NODE_POLICIES)
+call_llm = latency_policy.call
@@ -0,0 +1,41 @@
+from langchain_openai import ChatOpenAI
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-node model settings
+LLM_SETTINGS = {
+    "socratic": {"temperature": 0.3, "streaming": True},
+    "checkpoint": {"temperature": 0.2},
+    "hint": {"temperature": 0.4},
+}
+
+# Hedged duplicate requests ("<node>:hedge") can go to a second model
+HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")
+
+_models = {}
+_overrides = {}
+
+
+def get_llm(node: str):
+    """Chat model used by a node; overrides (fake or recorded models) win over OpenAI"""
+    base, _, variant = node.partition(":")
+    for key in (node, base, "*"):
+        if key in _overrides:
+            return _overrides[key]
+    if node not in _models:
+        settings = dict(LLM_SETTINGS.get(base, {}))
+        if variant == "hedge" and HEDGE_MODEL:
+            settings["model"] = HEDGE_MODEL
+        _models[node] = ChatOpenAI(api_key=os.getenv("OPEN_API_KEY"), **settings)
+    return _models[node]
+
+
+def set_llm_override(model, node: str = "*"):
+    """Route a node's (or every node's, with "*") LLM calls to another chat model"""
+    _overrides[node] = model
+
+
+def clear_llm_overrides():
+    _overrides.clear()
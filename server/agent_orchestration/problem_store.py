@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+def content_version(problem: dict) -> str:
+    """Short content hash; a changed problem statement gets a new version"""
+    payload = json.dumps(problem, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class ProblemStore:
+    """
+    Process-wide, immutable problem data interned per (title_slug, version).
+    Thread state only carries the {"title_slug", "version"} reference, so checkpoints
+    don't each hold a copy of the problem HTML.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._problems = {}
+        self._latest = {}
+        self._interned_at = {}
+
+    def intern(self, problem: dict) -> dict:
+        slug = problem["title_slug"]
+        version = content_version(problem)
+        key = (slug, version)
+        with self._lock:
+            if key not in self._problems:
+                frozen = {k: tuple(v) if isinstance(v, list) else v for k, v in problem.items()}
+                self._problems[key] = MappingProxyType(frozen)
+            self._latest[slug] = version
+            self._interned_at[slug] = time.monotonic()
+        return {"title_slug": slug, "version": version}
+
+    def get(self, ref: Optional[dict]) -> Optional[Mapping]:
+        if not ref:
+            return None
+        return self._problems.get((ref.get("title_slug"), ref.get("version")))
+
+    def latest(self, title_slug: str) -> Optional[dict]:
+        version = self._latest.get(title_slug)
+        return {"title_slug": title_slug, "version": version} if version else None
+
+    def fresh(self, title_slug: str, max_age_s: float) -> Optional[dict]:
+        """Latest reference if the problem was fetched within `max_age_s`, so ingest can skip the fetch"""
+        interned_at = self._interned_at.get(title_slug)
+        if interned_at is None or time.monotonic() - interned_at > max_age_s:
+            return None
+        return self.latest(title_slug)
+
+    def __len__(self) -> int:
+        return len(self._problems)
+
+
+problem_store = ProblemStore()
+
+EMPTY_PROBLEM = MappingProxyType({})
+
+
+def resolve_problem(state: dict) -> Mapping:
+    """Problem data for a thread, from its reference (or inline data from older checkpoints)"""
+    problem = problem_store.get(state.get("problem_ref"))
+    if problem is not None:
+        return problem
+    if state.get("problem_ref"):
+        print(f"[problem_store] ⚠️ Unknown problem reference {state['problem_ref']}")
+    return state.get("problem_data") or EMPTY_PROBLEM
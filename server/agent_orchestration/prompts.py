@@ -0,0 +1,262 @@
+import hashlib
+import html
+import re
+import threading
+from typing import List, Mapping, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agent_orchestration.problem_store import resolve_problem
+
+# === Prompt Assembly ===
+# Every LLM request is laid out as
+#   1. the node's system prefix          (static, versioned)
+#   2. the problem context block         (same for every turn and user on a problem)
+#   3. volatile sections                 (checkpoint, conversation, user message)
+# so providers that cache prompt prefixes can reuse 1 + 2 across turns and users.
+# Never put per-request values in a prefix; bump its version whenever its text changes.
+
+PREFIXES = {
+    "socratic": {
+        "version": "socratic/2",
+        "text": """You are an expert Socratic tutor specializing in LeetCode coding interview preparation. Your role is to guide software engineers through problem-solving without giving away solutions.
+
+CORE PRINCIPLES:
+- Ask probing questions that lead to insights rather than providing direct answers
+- Help users break down complex problems into manageable parts
+- Guide them to recognize patterns and data structures
+- Encourage thinking about edge cases, time/space complexity
+- Validate progress with encouraging feedback when they're on the right track
+
+RESPONSE FORMAT:
+- Start with brief validation if user shows correct reasoning: "That's right!" or "Good thinking!" or "You're on the right track!"
+- Follow with 1-2 Socratic questions that advance their understanding
+- Focus on the current checkpoint: understanding → approach → implementation → optimization
+
+QUESTION TYPES TO USE:
+- Pattern recognition: "What similar problems have you solved?"
+- Data structure selection: "What data structure might help here?"
+- Algorithm approach: "How would you approach this step by step?"
+- Edge cases: "What happens if the input is empty/very large?"
+- Complexity analysis: "How efficient is this approach?"
+
+Keep responses concise and focused. Never solve the problem directly.""",
+    },
+    "checkpoint": {
+        "version": "checkpoint/2",
+        "text": """You're an intelligent DSA progress tracker. Analyze the user's message and determine their current progress.
+
+Assess:
+1. Problem Understanding (0-100)
+2. Approach Clarity (0-100)
+3. Implementation Readiness (0-100)
+4. Complexity Awareness (0-100)
+
+Respond strictly in JSON:
+{
+    "checkpoint": "understanding|planning|implementing|optimizing|complete",
+    "problem_understanding": 0-100,
+    "approach_clarity": 0-100,
+    "implementation_readiness": 0-100,
+    "complexity_awareness": 0-100,
+    "completion_confidence": 0-100,
+    "key_concepts_mentioned": [...],
+    "missing_concepts": [...],
+    "progress_summary": "...",
+    "needs_guidance": true/false
+}""",
+    },
+    "hint_assessment": {
+        "version": "hint_assessment/2",
+        "text": """You're an intelligent tutoring assistant and an expert in Leetcode problems. Analyze whether the user is stuck and needs help.
+
+Respond in JSON format like this:
+{
+  "is_stuck": true,
+  "struggling_with": "short phrase",
+  "hint_type": "conceptual",
+  "understanding_level": "beginner"
+}
+
+Hint types: conceptual, algorithmic, implementation, example
+Understanding levels: beginner, intermediate, advanced""",
+    },
+    "hint": {
+        "version": "hint/2",
+        "text": """You're a helpful tutor. Give a concise hint for the problem below, tailored to the hint type, user level and what they are struggling with.
+
+Respond in 1-3 sentences. Be actionable and clear.""",
+    },
+}
+
+PROBLEM_CONTEXT_VERSION = "problem-context/1"
+
+# Input token budget per prompt; volatile sections are trimmed first, the problem block last
+TOKEN_BUDGETS = {
+    "socratic": 6000,
+    "checkpoint": 4000,
+    "hint_assessment": 3000,
+    "hint": 3000,
+}
+MIN_DESCRIPTION_TOKENS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap tokenizer stand-in (~4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+def prefix_fingerprint(name: str) -> str:
+    return hashlib.blake2b(PREFIXES[name]["text"].encode(), digest_size=6).hexdigest()
+
+
+# === Problem Context Block ===
+_TAG = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def html_to_text(markup: str) -> str:
+    return _BLANK_LINES.sub("\n\n", html.unescape(_TAG.sub("", markup or ""))).strip()
+
+
+class ProblemContextCache:
+    """Rendered problem blocks by (title_slug, version); byte-identical for every request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def get(self, state: dict) -> str:
+        ref = state.get("problem_ref") or {}
+        key = (ref.get("title_slug"), ref.get("version"))
+        block = self._blocks.get(key) if ref else None
+        if block is None:
+            block = render_problem_context(resolve_problem(state))
+            if ref:
+                with self._lock:
+                    self._blocks[key] = block
+        return block
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+
+def render_problem_context(problem: Mapping, max_description_tokens: Optional[int] = None) -> str:
+    description = html_to_text(problem.get("description_html") or problem.get("content") or "")
+    if max_description_tokens is not None and estimate_tokens(description) > max_description_tokens:
+        description = description[:max_description_tokens * 4].rstrip() + " …"
+    lines = [
+        f"PROBLEM CONTEXT ({PROBLEM_CONTEXT_VERSION})",
+        f"Title: {problem.get('title', 'Unknown Problem')}",
+        f"Difficulty: {problem.get('difficulty', 'Unknown')}",
+        f"Topics: {', '.join(problem.get('topics') or ()) or 'Unknown'}",
+        "",
+        "Description:",
+        description or "No description available",
+    ]
+    return "\n".join(lines)
+
+
+problem_contexts = ProblemContextCache()
+
+
+# === Volatile Sections + Token Budget ===
+def section(label: str, text: str, trim: Optional[str] = None, priority: int = 0) -> dict:
+    """
+    One labelled volatile block. `trim` is how it may shrink when over budget:
+    "oldest_lines" drops leading lines (conversation history), "tail" cuts the end,
+    None never trims. Lower `priority` sections are trimmed first.
+    """
+    return {"label": label, "text": text or "", "trim": trim, "priority": priority}
+
+
+def _trim(entry: dict, over: int) -> int:
+    """Shrink one section by up to `over` tokens; returns the tokens saved"""
+    text = entry["text"]
+    before = estimate_tokens(text)
+    if entry["trim"] == "oldest_lines":
+        lines = text.split("\n")
+        while len(lines) > 1 and before - estimate_tokens("\n".join(lines)) < over:
+            lines.pop(0)
+        text = "\n".join(lines)
+    if entry["trim"] in ("tail", "oldest_lines") and before - estimate_tokens(text) < over:
+        keep = max(0, len(text) - over * 4 - 4)
+        text = text[:keep].rstrip() + " …" if keep else ""
+    entry["text"] = text
+    return before - estimate_tokens(text)
+
+
+def allocate(budget: int, fixed_tokens: int, sections: List[dict]) -> tuple:
+    """Trim volatile sections (lowest priority first) until everything fits; returns (sections, overflow)"""
+    sections = [dict(entry) for entry in sections]
+    over = fixed_tokens + estimate_tokens(render_sections(sections)) - budget
+    for entry in sorted((s for s in sections if s["trim"]), key=lambda s: s["priority"]):
+        # Re-measure the rendered text: labels and separators cost tokens too
+        while over > 0 and _trim(entry, over):
+            over = fixed_tokens + estimate_tokens(render_sections(sections)) - budget
+    return sections, max(0, over)
+
+
+def render_sections(sections: List[dict]) -> str:
+    return "\n".join(f"{s['label']}: {s['text']}" for s in sections)
+
+
+def build_prompt(name: str, state: dict, sections: List[dict]) -> list:
+    """Messages for one request: system prefix, problem block, then the volatile sections"""
+    prefix = PREFIXES[name]["text"]
+    problem_block = problem_contexts.get(state)
+    budget = TOKEN_BUDGETS.get(name, 4000)
+
+    fixed = estimate_tokens(prefix) + estimate_tokens(problem_block)
+    sections, overflow = allocate(budget, fixed, sections)
+    if overflow:
+        # Volatile content alone doesn't fit: shorten the description (off the shared cache path)
+        description_budget = max(MIN_DESCRIPTION_TOKENS, estimate_tokens(problem_block) - overflow)
+        problem_block = render_problem_context(resolve_problem(state), description_budget)
+        print(f"[prompts] ✂️ {name} over budget by {overflow} tokens, trimmed the problem description")
+
+    return [
+        SystemMessage(content=prefix),
+        SystemMessage(content=problem_block),
+        HumanMessage(content=render_sections(sections)),
+    ]
+
+
+# === Cached Token Accounting ===
+class PromptCacheStats:
+    """Input and provider-cached tokens per node, from the usage data on each response"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}
+
+    def observe(self, node: str, response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        if not usage:
+            return
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        with self._lock:
+            entry = self._nodes.setdefault(node, {"requests": 0, "input_tokens": 0, "cached_tokens": 0,
+                                                  "requests_with_cache_hit": 0})
+            entry["requests"] += 1
+            entry["input_tokens"] += usage.get("input_tokens", 0)
+            entry["cached_tokens"] += cached
+            entry["requests_with_cache_hit"] += bool(cached)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            report = {
+                node: {**entry, "cached_ratio": round(entry["cached_tokens"] / entry["input_tokens"], 3)
+                       if entry["input_tokens"] else 0.0}
+                for node, entry in self._nodes.items()
+            }
+        report["prefixes"] = {name: f"{p['version']}#{prefix_fingerprint(name)}" for name, p in PREFIXES.items()}
+        report["problem_blocks_cached"] = len(problem_contexts)
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._nodes.clear()
+
+
+prompt_cache_stats = PromptCacheStats()
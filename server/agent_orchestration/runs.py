@@ -0,0 +1,284 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent_orchestration.graph import graph, interactive_graph, memory, new_session_state, record_scoring, score_turn
+from agent_orchestration.background import JobQueue, background_jobs, PRIORITY_SCORING
+
+MAX_STEPS_PER_MESSAGE = 8
+BACKGROUND_SCORING = os.getenv("BACKGROUND_SCORING", "1") == "1"
+# How long a turn waits for the previous turn's scoring before routing on stale scores
+SCORING_WAIT_S = float(os.getenv("SCORING_WAIT_S", "5.0"))
+
+
+class TurnSuperseded(Exception):
+    """A newer message on the same thread cancelled this turn"""
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Counts LLM calls and tokens for everything run under one graph invocation"""
+
+    # Just counters: run on the event loop instead of a thread-pool hop per callback event
+    run_inline = True
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.tokens += usage.get("total_tokens", 0)
+
+
+class _ActiveRun:
+    def __init__(self, messages: list, usage: TokenUsageCallback):
+        self.messages = messages
+        self.usage = usage
+        self.task: Optional[asyncio.Task] = None
+        self.superseded = False
+        # Set once the run has picked the checkpoint it starts from; scoring that lands
+        # before then is still picked up by the run
+        self.routed = False
+        self.started = time.perf_counter()
+
+    @property
+    def finished(self) -> bool:
+        return self.task is not None and self.task.done()
+
+
+class RunRegistry:
+    """
+    Tracks the in-flight graph run of every thread. A new message on a thread cancels the
+    outstanding run (aborting its LLM requests), rolls the thread back to the last checkpoint
+    a run finished cleanly on, and replays the superseded user message with the new one.
+
+    With a `background` queue and `scorer`, each finished turn queues the scorer for the
+    thread, and the thread's next turn waits (up to `scoring_wait_s`) for it before routing.
+    `on_scored(state, updates, config)` runs only for scoring that was applied, not dropped.
+    Listeners (add_listener) are called with the thread id whenever scoring wrote new state.
+    evict() forgets an idle thread's bookkeeping when its checkpoints leave memory.
+    """
+
+    def __init__(self, graph, max_steps: int = MAX_STEPS_PER_MESSAGE, background: Optional[JobQueue] = None,
+                 scorer=None, scoring_wait_s: float = SCORING_WAIT_S, on_scored=None):
+        self.graph = graph
+        self.max_steps = max_steps
+        self.background = background
+        self.scorer = scorer
+        self.scoring_wait_s = scoring_wait_s
+        self.on_scored = on_scored
+        self._active = {}
+        self._last_good = {}
+        self._listeners = []
+        self.stats = {
+            "runs_started": 0,
+            "runs_completed": 0,
+            "runs_cancelled": 0,
+            "runs_failed": 0,
+            "completed_tokens": 0,
+            "cancelled_tokens": 0,
+            "tokens_saved_estimate": 0,
+            "scoring_scheduled": 0,
+            "scoring_applied": 0,
+            "scoring_stale": 0,
+            "scoring_wait_timeouts": 0,
+        }
+
+    def metrics(self) -> dict:
+        return {**self.stats, "active_runs": len(self._active), "tracked_threads": len(self._last_good)}
+
+    def add_listener(self, listener):
+        """listener(thread_id) runs on the event loop after background writes to a thread"""
+        self._listeners.append(listener)
+
+    def _notify(self, thread_id: str):
+        for listener in self._listeners:
+            try:
+                listener(thread_id)
+            except Exception as e:
+                print(f"[runs] ⚠️ Update listener failed for {thread_id}: {e}")
+
+    def evict(self, thread_id: str, checkpoint_id: Optional[str]):
+        """
+        Checkpointer eviction listener. On a spill, the last good checkpoint is only dropped
+        when it is the thread's latest one, so the next turn can recover it from the
+        checkpointer. A deleted thread (checkpoint_id None) has nothing left to point to.
+        """
+        if self.active(thread_id) or (self.background is not None and self.background.pending(thread_id)):
+            return
+        if checkpoint_id is None or self._last_good.get(thread_id) == checkpoint_id:
+            self._last_good.pop(thread_id, None)
+
+    def active(self, thread_id: str) -> bool:
+        run = self._active.get(thread_id)
+        return run is not None and not run.finished
+
+    def _routed(self, thread_id: str) -> bool:
+        """A run on the thread already started from its last good checkpoint"""
+        run = self._active.get(thread_id)
+        return run is not None and run.routed and not run.finished
+
+    async def submit(self, thread_id: str, messages: list, updates: Optional[dict] = None,
+                     user_id: Optional[str] = None, callbacks: Optional[list] = None) -> dict:
+        """
+        Run one user turn; raises TurnSuperseded if a newer turn cancels it.
+        `callbacks` are extra LangChain handlers for this run (e.g. token streaming).
+        """
+        usage = TokenUsageCallback()
+        run = _ActiveRun(messages, usage)
+        previous = self._active.get(thread_id)
+        rolled_back = previous is not None and not previous.finished
+        if rolled_back:
+            run.messages = previous.messages + messages
+        elif thread_id not in self._last_good:
+            # Evicted (or new) thread: its latest checkpoint is where a rollback returns to
+            latest = self.graph.checkpointer.get_tuple({"configurable": {"thread_id": thread_id}})
+            if latest is not None:
+                self._last_good[thread_id] = latest.config["configurable"]["checkpoint_id"]
+        # Register before awaiting the cancellation so an even newer message supersedes this one
+        self._active[thread_id] = run
+
+        try:
+            if rolled_back:
+                await self._supersede(previous)
+            if run.superseded:
+                raise TurnSuperseded(thread_id)
+
+            run.task = asyncio.create_task(
+                self._execute(thread_id, run, updates or {}, user_id, rolled_back, callbacks or [])
+            )
+            self.stats["runs_started"] += 1
+            try:
+                return await run.task
+            except asyncio.CancelledError:
+                if run.superseded:
+                    raise TurnSuperseded(thread_id)
+                raise
+        finally:
+            if self._active.get(thread_id) is run:
+                del self._active[thread_id]
+
+    async def _supersede(self, run: _ActiveRun):
+        run.superseded = True
+        self.stats["runs_cancelled"] += 1
+        if run.task is None:
+            # Still waiting on its own predecessor; it will notice and bail out
+            return
+        run.task.cancel()
+        try:
+            await run.task
+        except BaseException:
+            pass
+        self.stats["cancelled_tokens"] += run.usage.tokens
+        completed = self.stats["runs_completed"]
+        if completed:
+            typical = self.stats["completed_tokens"] / completed
+            self.stats["tokens_saved_estimate"] += max(0, round(typical - run.usage.tokens))
+        print(f"[runs] ✂️ Superseded run after {(time.perf_counter() - run.started) * 1000:.0f}ms "
+              f"({run.usage.calls} LLM calls, {run.usage.tokens} tokens)")
+
+    def _config(self, thread_id: str, usage: TokenUsageCallback, user_id: Optional[str],
+                checkpoint_id: Optional[str] = None, callbacks: tuple = ()) -> dict:
+        configurable = {"thread_id": thread_id}
+        if user_id:
+            configurable["user_id"] = user_id
+        if checkpoint_id:
+            configurable["checkpoint_id"] = checkpoint_id
+        return {"configurable": configurable, "callbacks": [usage, *callbacks]}
+
+    def _resume_from(self, thread_id: str, rolled_back: bool) -> Optional[str]:
+        """
+        Checkpoint the next run starts from: the last one a run finished cleanly on, so
+        writes left behind by cancelled or failed runs are skipped.
+        """
+        last_good = self._last_good.get(thread_id)
+        if last_good is None and rolled_back:
+            # The superseded run was the thread's first; start it over
+            self.graph.checkpointer.delete_thread(thread_id)
+        return last_good
+
+    async def _execute(self, thread_id: str, run: _ActiveRun, updates: dict, user_id: Optional[str],
+                       rolled_back: bool, callbacks: list) -> dict:
+        messages, usage = run.messages, run.usage
+        if self.background is not None:
+            if not await self.background.wait_for_thread(thread_id, self.scoring_wait_s):
+                self.stats["scoring_wait_timeouts"] += 1
+                print(f"[runs] ⚠️ Scoring for {thread_id} still running, routing on previous scores")
+
+        checkpoint_id = self._resume_from(thread_id, rolled_back)
+        run.routed = True
+        config = self._config(thread_id, usage, user_id, checkpoint_id, callbacks)
+
+        current_state = self.graph.get_state(config).values
+        if not current_state:
+            turn_input = {**new_session_state(messages), **updates}
+        else:
+            turn_input = {"messages": messages, **updates}
+
+        try:
+            steps = 0
+            async for _ in self.graph.astream(turn_input, config=config):
+                steps += 1
+                if steps >= self.max_steps:
+                    print(f"⚠️ Too many steps for one message ({steps}), skipping ahead")
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats["runs_failed"] += 1
+            raise
+
+        snapshot = self.graph.get_state(self._config(thread_id, usage, user_id))
+        self._last_good[thread_id] = snapshot.config["configurable"].get("checkpoint_id")
+        self.stats["runs_completed"] += 1
+        self.stats["completed_tokens"] += usage.tokens
+        if self.background is not None and self.scorer is not None:
+            self._schedule_scoring(thread_id, user_id)
+        return snapshot.values
+
+    # === Background scoring ===
+    def _schedule_scoring(self, thread_id: str, user_id: Optional[str]):
+        checkpoint_id = self._last_good.get(thread_id)
+        queued = self.background.enqueue(
+            "score_turn",
+            lambda: self._score(thread_id, user_id, checkpoint_id),
+            thread_id=thread_id,
+            priority=PRIORITY_SCORING,
+        )
+        if queued is not None:
+            self.stats["scoring_scheduled"] += 1
+
+    async def _score(self, thread_id: str, user_id: Optional[str], checkpoint_id: Optional[str]) -> dict:
+        usage = TokenUsageCallback()
+        config = self._config(thread_id, usage, user_id, checkpoint_id)
+        state = self.graph.get_state(config).values
+        updates = await self.scorer(state, config)
+
+        if self._routed(thread_id) or self._last_good.get(thread_id) != checkpoint_id:
+            # A newer turn already started from this checkpoint and owns the thread state
+            self.stats["scoring_stale"] += 1
+            return updates
+        if updates:
+            written = await self.graph.aupdate_state(self._config(thread_id, usage, user_id), updates,
+                                                     as_node="score")
+            self._last_good[thread_id] = written["configurable"]["checkpoint_id"]
+            if self.on_scored is not None:
+                self.on_scored(state, updates, config)
+            self._notify(thread_id)
+        self.stats["scoring_applied"] += 1
+        return updates
+
+
+if BACKGROUND_SCORING:
+    run_registry = RunRegistry(interactive_graph, background=background_jobs, scorer=score_turn,
+                               on_scored=record_scoring)
+else:
+    run_registry = RunRegistry(graph)
+memory.add_eviction_listener(run_registry.evict)
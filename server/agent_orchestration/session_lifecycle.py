@@ -0,0 +1,367 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import zstandard
+from langgraph.checkpoint.memory import MemorySaver
+
+# === Session Lifecycle ===
+# The graph checkpointer keeps every step of every thread in RAM, forever, by default.
+# SessionSaver bounds that:
+#   - each thread keeps its latest checkpoint plus the last CHECKPOINT_KEEP_VERSIONS turn
+#     boundaries (the versions clients diff against); intermediate step checkpoints are pruned
+#   - threads idle for SESSION_IDLE_S are spilled to zstd files and rehydrated on next access
+#   - resident checkpoint bytes stay under SESSION_MEMORY_BUDGET_MB by spilling the least
+#     recently active threads
+CHECKPOINT_KEEP_VERSIONS = int(os.getenv("CHECKPOINT_KEEP_VERSIONS", "2"))
+SESSION_IDLE_S = float(os.getenv("SESSION_IDLE_S", "900"))
+SESSION_MEMORY_BUDGET_MB = float(os.getenv("SESSION_MEMORY_BUDGET_MB", "256"))
+SESSION_SWEEP_S = float(os.getenv("SESSION_SWEEP_S", "30"))
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR")
+
+# Spills are synchronous (on the event loop): bound how many one write can trigger
+SPILL_BATCH = 64
+# Spill down to this share of the budget so a full budget doesn't spill on every write
+BUDGET_LOW_WATERMARK = 0.9
+# Checkpoints written at a turn boundary: a new input, or state written from outside a run
+BOUNDARY_SOURCES = ("input", "update")
+
+
+def _size(typed: tuple) -> int:
+    return len(typed[1])
+
+
+class _Thread:
+    __slots__ = ("blob_keys", "write_keys", "bytes", "marks", "last_active")
+
+    def __init__(self):
+        self.blob_keys = set()
+        self.write_keys = set()
+        self.bytes = 0
+        self.marks = []
+        self.last_active = time.monotonic()
+
+
+class SpillStore:
+    """One zstd-compressed file per spilled thread"""
+
+    def __init__(self, directory: Optional[str] = None, level: int = 3):
+        self.owned = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="sessions-")
+        os.makedirs(self.directory, exist_ok=True)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def _path(self, thread_id: str) -> str:
+        return os.path.join(self.directory, hashlib.blake2b(thread_id.encode(), digest_size=16).hexdigest())
+
+    def write(self, thread_id: str, payload: dict) -> int:
+        data = self._compressor.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        with open(self._path(thread_id), "wb") as f:
+            f.write(data)
+        return len(data)
+
+    def read(self, thread_id: str) -> dict:
+        with open(self._path(thread_id), "rb") as f:
+            return pickle.loads(self._decompressor.decompress(f.read()))
+
+    def delete(self, thread_id: str):
+        try:
+            os.remove(self._path(thread_id))
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self.owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SessionSaver(MemorySaver):
+    """
+    MemorySaver with per-thread pruning, idle spill-to-disk and an LRU memory budget.
+    Spilled threads are invisible to callers: any read or write rehydrates them first.
+    Listing checkpoints across all threads (list(None)) only sees resident threads.
+    Eviction listeners (add_eviction_listener) let per-thread caches elsewhere follow spills and deletes.
+    """
+
+    def __init__(self, keep_versions: int = CHECKPOINT_KEEP_VERSIONS, idle_s: float = SESSION_IDLE_S,
+                 budget_mb: float = SESSION_MEMORY_BUDGET_MB, sweep_s: float = SESSION_SWEEP_S,
+                 spill_dir: Optional[str] = SESSION_SPILL_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_versions = keep_versions
+        self.idle_s = idle_s
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.sweep_s = sweep_s
+        self._spill_dir = spill_dir
+        self._store: Optional[SpillStore] = None
+        self._lock = threading.RLock()
+        self._threads = OrderedDict()  # least recently active first
+        self._spilled = {}             # thread_id -> compressed bytes on disk
+        self._resident_bytes = 0
+        self._next_sweep = 0.0
+        self._eviction_listeners = []
+        self.stats = {
+            "pruned_checkpoints": 0,
+            "pruned_bytes": 0,
+            "spilled": 0,
+            "spilled_bytes": 0,
+            "spilled_compressed_bytes": 0,
+            "spill_failures": 0,
+            "rehydrated": 0,
+            "rehydrate_failures": 0,
+            "last_rehydrate_ms": 0.0,
+            "budget_spills": 0,
+        }
+
+    @property
+    def store(self) -> SpillStore:
+        if self._store is None:
+            self._store = SpillStore(self._spill_dir)
+        return self._store
+
+    def add_eviction_listener(self, listener):
+        """
+        listener(thread_id, checkpoint_id) runs after a thread is spilled (with its latest
+        checkpoint) or deleted (with None)
+        """
+        self._eviction_listeners.append(listener)
+
+    def _notify_evicted(self, thread_id: str, checkpoint_id: Optional[str]):
+        for listener in self._eviction_listeners:
+            try:
+                listener(thread_id, checkpoint_id)
+            except Exception as e:
+                print(f"[sessions] ⚠️ Eviction listener failed for {thread_id}: {e}")
+
+    # === Activity + accounting ===
+    def _touch(self, thread_id: str, create: bool = False) -> Optional[_Thread]:
+        """Mark a thread active, rehydrating it if it was spilled"""
+        if thread_id in self._spilled:
+            self._rehydrate(thread_id)
+        entry = self._threads.get(thread_id)
+        if entry is None:
+            if not create:
+                return None
+            entry = self._threads[thread_id] = _Thread()
+        else:
+            self._threads.move_to_end(thread_id)
+        entry.last_active = time.monotonic()
+        return entry
+
+    def _add_bytes(self, entry: _Thread, delta: int):
+        entry.bytes += delta
+        self._resident_bytes += delta
+
+    def _writes_bytes(self, key: tuple) -> int:
+        return sum(_size(write[2]) for write in self.writes.get(key, {}).values())
+
+    # === Checkpointer interface ===
+    def get_tuple(self, config):
+        with self._lock:
+            self._touch(config["configurable"]["thread_id"])
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config is not None:
+            with self._lock:
+                self._touch(config["configurable"]["thread_id"])
+        return super().list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            entry = self._touch(thread_id, create=True)
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                if key in entry.blob_keys:
+                    self._add_bytes(entry, -_size(self.blobs[key]))
+                entry.blob_keys.add(key)
+            written = super().put(config, checkpoint, metadata, new_versions)
+            saved, saved_metadata, _parent = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            delta = _size(saved) + _size(saved_metadata)
+            delta += sum(_size(self.blobs[(thread_id, checkpoint_ns, channel, version)])
+                         for channel, version in new_versions.items())
+            self._add_bytes(entry, delta)
+
+            parent = config["configurable"].get("checkpoint_id")
+            if checkpoint_ns == "" and parent and (metadata or {}).get("source") in BOUNDARY_SOURCES:
+                if parent not in entry.marks:
+                    entry.marks.append(parent)
+                del entry.marks[:-self.keep_versions or len(entry.marks)]
+                self._prune(thread_id, entry)
+            self._maintain(thread_id)
+            return written
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            entry = self._touch(thread_id, create=True)
+            before = self._writes_bytes(key)
+            super().put_writes(config, writes, task_id, task_path)
+            entry.write_keys.add(key)
+            self._add_bytes(entry, self._writes_bytes(key) - before)
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            self._delete_thread(thread_id)
+            self._notify_evicted(thread_id, None)
+
+    def _delete_thread(self, thread_id: str):
+        if self._spilled.pop(thread_id, None) is not None:
+            self.store.delete(thread_id)
+        entry = self._threads.pop(thread_id, None)
+        if entry is None:
+            super().delete_thread(thread_id)
+            return
+        # The key index avoids MemorySaver's scan over every thread's writes and blobs
+        self.storage.pop(thread_id, None)
+        for key in entry.write_keys:
+            self.writes.pop(key, None)
+        for key in entry.blob_keys:
+            self.blobs.pop(key, None)
+        self._resident_bytes -= entry.bytes
+
+    # === Pruning ===
+    def _prune(self, thread_id: str, entry: _Thread):
+        """Drop every root checkpoint except the latest and the marked turn boundaries"""
+        checkpoints = self.storage.get(thread_id, {}).get("")
+        if not checkpoints:
+            return
+        keep = set(entry.marks)
+        keep.add(max(checkpoints))
+        freed = 0
+        for checkpoint_id in [c for c in checkpoints if c not in keep]:
+            saved, saved_metadata, _parent = checkpoints.pop(checkpoint_id)
+            freed += _size(saved) + _size(saved_metadata)
+            key = (thread_id, "", checkpoint_id)
+            if key in entry.write_keys:
+                freed += self._writes_bytes(key)
+                self.writes.pop(key, None)
+                entry.write_keys.discard(key)
+            self.stats["pruned_checkpoints"] += 1
+
+        live = set()
+        for saved, _metadata, _parent in checkpoints.values():
+            live.update(self.serde.loads_typed(saved)["channel_versions"].items())
+        for key in [k for k in entry.blob_keys if k[1] == "" and (k[2], k[3]) not in live]:
+            freed += _size(self.blobs.pop(key))
+            entry.blob_keys.discard(key)
+        entry.marks = [m for m in entry.marks if m in checkpoints]
+        self._add_bytes(entry, -freed)
+        self.stats["pruned_bytes"] += freed
+
+    # === Spill + rehydrate ===
+    def _maintain(self, current: str):
+        """Spill idle threads (every sweep_s) and least recently active ones over the budget"""
+        now = time.monotonic()
+        spills = 0
+        if now >= self._next_sweep:
+            idle_before = now - self.idle_s
+            for thread_id, entry in list(self._threads.items()):
+                if entry.last_active > idle_before or spills >= SPILL_BATCH:
+                    break
+                spills += self._spill(thread_id)
+            # Backlog left: keep sweeping on the next writes
+            self._next_sweep = now if spills >= SPILL_BATCH else now + self.sweep_s
+        if self._resident_bytes > self.budget_bytes:
+            target = self.budget_bytes * BUDGET_LOW_WATERMARK
+            for thread_id in list(self._threads):
+                if self._resident_bytes <= target or spills >= SPILL_BATCH:
+                    break
+                if thread_id != current:
+                    spilled = self._spill(thread_id)
+                    spills += spilled
+                    self.stats["budget_spills"] += spilled
+
+    def _spill(self, thread_id: str) -> int:
+        entry = self._threads[thread_id]
+        self._prune(thread_id, entry)
+        checkpoints = self.storage.get(thread_id, {}).get("")
+        latest = max(checkpoints) if checkpoints else None
+        payload = {
+            "storage": {ns: dict(checkpoints) for ns, checkpoints in self.storage.get(thread_id, {}).items()},
+            "writes": {key: self.writes[key] for key in entry.write_keys if key in self.writes},
+            "blobs": {key: self.blobs[key] for key in entry.blob_keys if key in self.blobs},
+            "marks": entry.marks,
+        }
+        try:
+            compressed = self.store.write(thread_id, payload)
+        except Exception as e:
+            self.stats["spill_failures"] += 1
+            print(f"[sessions] ❌ Spill failed for {thread_id}, keeping it in memory: {e}")
+            self._threads.move_to_end(thread_id)
+            return 0
+
+        self.storage.pop(thread_id, None)
+        for key in entry.write_keys:
+            self.writes.pop(key, None)
+        for key in entry.blob_keys:
+            self.blobs.pop(key, None)
+        del self._threads[thread_id]
+        self._resident_bytes -= entry.bytes
+        self._spilled[thread_id] = compressed
+        self.stats["spilled"] += 1
+        self.stats["spilled_bytes"] += entry.bytes
+        self.stats["spilled_compressed_bytes"] += compressed
+        self._notify_evicted(thread_id, latest)
+        return 1
+
+    def _rehydrate(self, thread_id: str):
+        started = time.perf_counter()
+        self._spilled.pop(thread_id)
+        try:
+            payload = self.store.read(thread_id)
+        except Exception as e:
+            # Nothing to restore from: the thread starts over
+            self.stats["rehydrate_failures"] += 1
+            print(f"[sessions] ❌ Could not rehydrate {thread_id}: {e}")
+            return
+        self.store.delete(thread_id)
+
+        entry = self._threads[thread_id] = _Thread()
+        entry.marks = payload["marks"]
+        for ns, checkpoints in payload["storage"].items():
+            self.storage[thread_id][ns] = checkpoints
+            entry.bytes += sum(_size(saved) + _size(meta) for saved, meta, _parent in checkpoints.values())
+        for key, writes in payload["writes"].items():
+            self.writes[key] = writes
+            entry.write_keys.add(key)
+            entry.bytes += sum(_size(write[2]) for write in writes.values())
+        for key, blob in payload["blobs"].items():
+            self.blobs[key] = blob
+            entry.blob_keys.add(key)
+            entry.bytes += _size(blob)
+        self._resident_bytes += entry.bytes
+        self.stats["rehydrated"] += 1
+        self.stats["last_rehydrate_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    # === Lifecycle ===
+    def metrics(self) -> dict:
+        with self._lock:
+            spilled_bytes = self.stats["spilled_bytes"]
+            return {
+                **self.stats,
+                "resident_threads": len(self._threads),
+                "spilled_threads": len(self._spilled),
+                "resident_mb": round(self._resident_bytes / (1024 * 1024), 2),
+                "budget_mb": round(self.budget_bytes / (1024 * 1024), 2),
+                "disk_mb": round(sum(self._spilled.values()) / (1024 * 1024), 2),
+                "compression_ratio": round(spilled_bytes / self.stats["spilled_compressed_bytes"], 2)
+                if spilled_bytes else 0.0,
+            }
+
+    def close(self):
+        """Drop spilled sessions (they only live as long as the process) and the spill dir"""
+        with self._lock:
+            self._spilled.clear()
+            if self._store is not None:
+                self._store.close()
+                self._store = None
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+# Scores approaching the needs_guidance thresholds (avg < 40, any < 30) start a speculative hint
+SPECULATE_AVG_BELOW = 50
+SPECULATE_ANY_BELOW = 40
+SPECULATION_TTL_S = 300
+# A speculation made on turn N can still serve a hint on turn N + 1
+SPECULATION_MAX_TURN_LAG = 1
+
+
+def should_speculate(progress_scores: Optional[dict]) -> bool:
+    if not progress_scores:
+        return False
+    scores = list(progress_scores.values())
+    return sum(scores) / len(scores) < SPECULATE_AVG_BELOW or min(scores) < SPECULATE_ANY_BELOW
+
+
+def struggling_area(state: dict) -> str:
+    """Cheap, deterministic guess of what the user is stuck on (part of the speculation key)"""
+    missing = (state.get("checkpoint_analysis") or {}).get("missing_concepts") or []
+    if missing:
+        return str(missing[0])
+    scores = state.get("progress_scores") or {}
+    if scores:
+        return min(scores, key=scores.get)
+    return "general"
+
+
+def speculation_key(state: dict) -> tuple:
+    # The problem is part of the key: a thread can switch problems between turns
+    return (state.get("title_slug"), state.get("current_checkpoint", "understanding"), struggling_area(state))
+
+
+class _Slot:
+    def __init__(self, key: tuple, turn: int, task: asyncio.Task):
+        self.key = key
+        self.turn = turn
+        self.task = task
+        self.expires_at = time.monotonic() + SPECULATION_TTL_S
+
+
+class HintSpeculator:
+    """
+    One speculative hint slot per thread. checkpoint_node fills it in the background when
+    scores start dropping; hint_node takes it if it still matches the conversation.
+    """
+
+    def __init__(self, max_latency_samples: int = 1000):
+        self._slots = {}
+        self._next_expiry = 0.0
+        self._latency = {"hit": [], "miss": []}
+        self._max_latency_samples = max_latency_samples
+        self.stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "discarded": 0,
+            "failed": 0,
+            "used_tokens": 0,
+            "wasted_tokens": 0,
+        }
+
+    def submit(self, thread_id: str, key: tuple, turn: int, build: Callable[[], Awaitable[dict]]):
+        """Start generating a hint for `key` unless an equivalent one is already slotted"""
+        self._expire()
+        slot = self._slots.get(thread_id)
+        if slot is not None and slot.key == key and slot.expires_at > time.monotonic():
+            return
+        if slot is not None:
+            self._discard(slot)
+        # Not tied to the graph run: a superseded turn must not kill a still-useful hint
+        self._slots[thread_id] = _Slot(key, turn, asyncio.create_task(build()))
+        self.stats["started"] += 1
+
+    async def take(self, thread_id: Optional[str], key: tuple, turn: int) -> Optional[dict]:
+        """Pop the slotted hint if it matches; waits for it if it is still being generated"""
+        slot = self._slots.get(thread_id) if thread_id else None
+        if slot is None:
+            self.stats["misses"] += 1
+            return None
+        stale = (
+            slot.key != key
+            or slot.expires_at <= time.monotonic()
+            or turn - slot.turn > SPECULATION_MAX_TURN_LAG
+        )
+        if stale:
+            self._pop(thread_id, slot)
+            self._discard(slot)
+            self.stats["misses"] += 1
+            return None
+
+        try:
+            result = await asyncio.shield(slot.task)
+        except asyncio.CancelledError:
+            # The turn was superseded: the slot stays for its replay, or is counted when discarded
+            raise
+        except Exception as e:
+            self._pop(thread_id, slot)
+            print(f"[hint_speculation] ❌ Speculative hint failed: {e}")
+            self.stats["failed"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._pop(thread_id, slot)
+        self.stats["hits"] += 1
+        self.stats["used_tokens"] += result.get("tokens", 0)
+        return result
+
+    def _pop(self, thread_id: str, slot: _Slot):
+        # A newer submit may have replaced the slot while it was awaited
+        if self._slots.get(thread_id) is slot:
+            del self._slots[thread_id]
+
+    def evict(self, thread_id: str, checkpoint_id: Optional[str] = None):
+        """Checkpointer eviction listener: an idle thread's hint won't be taken any more"""
+        slot = self._slots.pop(thread_id, None)
+        if slot is not None:
+            self._discard(slot)
+
+    def _expire(self):
+        """Discard expired slots of threads that never came back for their hint"""
+        now = time.monotonic()
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + SPECULATION_TTL_S
+        for thread_id in [t for t, slot in self._slots.items() if slot.expires_at <= now]:
+            self._discard(self._slots.pop(thread_id))
+
+    def _discard(self, slot: _Slot):
+        self.stats["discarded"] += 1
+        if not slot.task.done():
+            slot.task.cancel()
+        elif not slot.task.cancelled() and slot.task.exception() is None:
+            self.stats["wasted_tokens"] += slot.task.result().get("tokens", 0)
+
+    def record_latency(self, ms: float, hit: bool):
+        samples = self._latency["hit" if hit else "miss"]
+        samples.append(ms)
+        if len(samples) > self._max_latency_samples:
+            del samples[0]
+
+    def metrics(self) -> dict:
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        spent = stats["used_tokens"] + stats["wasted_tokens"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["wasted_token_rate"] = round(stats["wasted_tokens"] / spent, 3) if spent else 0.0
+        stats["slots"] = len(self._slots)
+        for name, samples in self._latency.items():
+            samples = sorted(samples)
+            stats[f"hint_latency_{name}_p50_ms"] = round(samples[len(samples) // 2], 2) if samples else None
+            stats[f"hint_latency_{name}_p95_ms"] = round(samples[int(len(samples) * 0.95)], 2) if samples else None
+        return stats
+
+
+hint_speculator = HintSpeculator()
@@ -0,0 +1,354 @@
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+CHECKPOINTS = ("understanding", "planning", "implementing", "optimizing", "complete")
+SCORE_FIELDS = (
+    "problem_understanding",
+    "approach_clarity",
+    "implementation_readiness",
+    "complexity_awareness",
+    "completion_confidence",
+)
+
+
+def clamp_score(value, default: int = 0) -> int:
+    """A progress score as stored: an int in 0-100, `default` if it isn't a number"""
+    try:
+        return min(100, max(0, round(float(value))))
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+# (column, dtype, trailing shape) of the per-turn table
+TURN_COLUMNS = (
+    ("session", np.int32, ()),
+    ("problem", np.int32, ()),
+    ("turn", np.int16, ()),
+    ("checkpoint", np.int8, ()),
+    ("scores", np.uint8, (len(SCORE_FIELDS),)),
+    ("delta", np.float32, ()),       # mean score change since the session's previous scored turn
+    ("after_hint", np.bool_, ()),    # a hint was given between the previous scored turn and this one
+    ("stuck", np.bool_, ()),         # needs_guidance after this turn
+)
+
+# Milestone turns past this share the last histogram bin
+TURN_BINS = 64
+
+# First turn each session reached each checkpoint
+MILESTONE_COLUMNS = (
+    ("session", np.int32, ()),
+    ("problem", np.int32, ()),
+    ("checkpoint", np.int8, ()),
+    ("turn", np.int16, ()),
+)
+
+
+class _Table:
+    """Append-only columns in preallocated NumPy arrays that double when full"""
+
+    def __init__(self, columns, capacity: int = 1024):
+        self.columns = columns
+        self.size = 0
+        self._data = {name: np.zeros((capacity,) + shape, dtype) for name, dtype, shape in columns}
+
+    def _reserve(self, extra: int):
+        capacity = len(next(iter(self._data.values())))
+        if self.size + extra <= capacity:
+            return
+        while capacity < self.size + extra:
+            capacity *= 2
+        for name, array in self._data.items():
+            grown = np.zeros((capacity,) + array.shape[1:], array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._data[name] = grown
+
+    def append(self, **row):
+        self._reserve(1)
+        for name, value in row.items():
+            self._data[name][self.size] = value
+        self.size += 1
+
+    def extend(self, **columns):
+        count = len(next(iter(columns.values())))
+        self._reserve(count)
+        for name, values in columns.items():
+            self._data[name][self.size:self.size + count] = values
+        self.size += count
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._data[name][:self.size]
+
+
+class _Session:
+    __slots__ = ("index", "problem", "last_mean", "reached", "hint_pending")
+
+    def __init__(self, index: int, problem: int):
+        self.index = index
+        self.problem = problem
+        self.last_mean = None
+        self.reached = -1
+        self.hint_pending = False
+
+
+class AnalyticsStore:
+    """
+    Local columnar store of every session's per-turn progress scores.
+
+    The turn and milestone tables are the history. Per-problem aggregates (turn / stuck /
+    hint counts and a (problem, checkpoint, turn) histogram of milestones) are kept next to
+    them: updated on every append, rebuilt with a few bincounts on bulk load. Queries only
+    touch the aggregates, so they cost O(problems) no matter how many turns are stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = _Table(TURN_COLUMNS)
+        self.milestones = _Table(MILESTONE_COLUMNS, capacity=256)
+        self.problems = []
+        self._problem_index = {}
+        self._sessions = {}
+        self.session_count = 0
+        self._aggregates = self._empty_aggregates(0)
+
+    @staticmethod
+    def _empty_aggregates(problems: int) -> dict:
+        return {
+            "turns": np.zeros(problems, np.int64),
+            "stuck": np.zeros(problems, np.int64),
+            "hinted": np.zeros(problems, np.int64),
+            "hinted_delta": np.zeros(problems, np.float64),
+            "delta": np.zeros(problems, np.float64),
+            "reached": np.zeros((problems, len(CHECKPOINTS), TURN_BINS), np.int64),
+        }
+
+    def _grow_aggregates(self, problems: int):
+        current = len(self._aggregates["turns"])
+        if problems <= current:
+            return
+        grown = self._empty_aggregates(max(problems, current * 2, 64))
+        for name, array in self._aggregates.items():
+            grown[name][:current] = array
+        self._aggregates = grown
+
+    # === Ingestion ===
+    def _problem(self, title_slug: str) -> int:
+        index = self._problem_index.get(title_slug)
+        if index is None:
+            index = self._problem_index[title_slug] = len(self.problems)
+            self.problems.append(title_slug)
+            self._grow_aggregates(len(self.problems))
+        return index
+
+    def _session(self, thread_id: str, title_slug: str, previous: Optional[dict]) -> _Session:
+        session = self._sessions.get(thread_id)
+        problem = self._problem(title_slug)
+        if session is None or session.problem != problem:
+            resumed = session is None and previous is not None
+            session = self._sessions[thread_id] = _Session(self.session_count, problem)
+            self.session_count += 1
+            if resumed:
+                # An evicted thread came back: carry on from its state instead of re-counting milestones
+                reached = [CHECKPOINTS.index(c) for c in previous.get("checkpoints_completed") or () if c in CHECKPOINTS]
+                session.reached = max(reached, default=-1)
+                if previous.get("progress_scores"):
+                    values = [clamp_score(previous["progress_scores"].get(field)) for field in SCORE_FIELDS]
+                    session.last_mean = sum(values) / len(values)
+        return session
+
+    def evict(self, thread_id: str, checkpoint_id: Optional[str] = None):
+        """Checkpointer eviction listener: the thread's session state is recoverable from its checkpoint"""
+        with self._lock:
+            self._sessions.pop(thread_id, None)
+
+    def record_turn(self, thread_id: str, title_slug: str, turn: int, checkpoint: str,
+                    scores: dict, stuck: bool, previous: Optional[dict] = None):
+        """`previous` is the thread's state before this turn, to pick up an evicted session"""
+        checkpoint_index = CHECKPOINTS.index(checkpoint) if checkpoint in CHECKPOINTS else 0
+        # uint8 columns: out-of-range values would raise
+        values = [clamp_score(scores.get(field)) for field in SCORE_FIELDS]
+        mean = sum(values) / len(values)
+        with self._lock:
+            session = self._session(thread_id, title_slug, previous)
+            problem = session.problem
+            delta = 0.0 if session.last_mean is None else mean - session.last_mean
+            self.turns.append(
+                session=session.index,
+                problem=problem,
+                turn=turn,
+                checkpoint=checkpoint_index,
+                scores=values,
+                delta=delta,
+                after_hint=session.hint_pending,
+                stuck=stuck,
+            )
+            aggregates = self._aggregates
+            aggregates["turns"][problem] += 1
+            aggregates["stuck"][problem] += stuck
+            aggregates["delta"][problem] += delta
+            if session.hint_pending:
+                aggregates["hinted"][problem] += 1
+                aggregates["hinted_delta"][problem] += delta
+            for reached in range(session.reached + 1, checkpoint_index + 1):
+                self.milestones.append(session=session.index, problem=problem, checkpoint=reached, turn=turn)
+                aggregates["reached"][problem, reached, min(turn, TURN_BINS - 1)] += 1
+            session.reached = max(session.reached, checkpoint_index)
+            session.last_mean = mean
+            session.hint_pending = False
+
+    def record_hint(self, thread_id: str):
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            if session is not None:
+                session.hint_pending = True
+
+    def _rebuild_aggregates(self):
+        count = len(self.problems)
+        problems = self.turns["problem"]
+        after_hint = self.turns["after_hint"]
+        delta = self.turns["delta"]
+        aggregates = self._empty_aggregates(count)
+        aggregates["turns"] = np.bincount(problems, minlength=count)
+        aggregates["stuck"] = np.bincount(problems[self.turns["stuck"]], minlength=count)
+        aggregates["hinted"] = np.bincount(problems[after_hint], minlength=count)
+        aggregates["hinted_delta"] = np.bincount(problems[after_hint], weights=delta[after_hint], minlength=count)
+        aggregates["delta"] = np.bincount(problems, weights=delta, minlength=count)
+        cell = (
+            self.milestones["problem"].astype(np.int64) * len(CHECKPOINTS) + self.milestones["checkpoint"]
+        ) * TURN_BINS + np.minimum(self.milestones["turn"], TURN_BINS - 1)
+        aggregates["reached"] = np.bincount(cell, minlength=count * len(CHECKPOINTS) * TURN_BINS).reshape(
+            count, len(CHECKPOINTS), TURN_BINS
+        )
+        self._aggregates = aggregates
+
+    # === Queries ===
+    def stuck_rates(self, top: int = 20, min_turns: int = 20) -> list:
+        """Problems where the most turns end with needs_guidance"""
+        count = len(self.problems)
+        turns = self._aggregates["turns"][:count]
+        stuck = self._aggregates["stuck"][:count]
+        eligible = np.flatnonzero(turns >= min_turns)
+        rates = stuck[eligible] / turns[eligible]
+        order = eligible[np.argsort(-rates, kind="stable")[:top]]
+        return [
+            {"title_slug": self.problems[i], "stuck_rate": round(float(stuck[i] / turns[i]), 4), "turns": int(turns[i])}
+            for i in order
+        ]
+
+    def turns_to_checkpoint(self, problem: Optional[int] = None) -> dict:
+        """Median (and p90) turn at which sessions first reach each checkpoint"""
+        reached = self._aggregates["reached"]
+        histogram = reached[:len(self.problems)].sum(axis=0) if problem is None else reached[problem]
+        cumulative = np.cumsum(histogram, axis=1)
+        result = {}
+        for index, name in enumerate(CHECKPOINTS):
+            sessions = int(cumulative[index, -1])
+            if sessions:
+                result[name] = {
+                    "sessions": sessions,
+                    "median_turn": int(np.searchsorted(cumulative[index], sessions * 0.5)),
+                    "p90_turn": int(np.searchsorted(cumulative[index], sessions * 0.9)),
+                }
+        return result
+
+    def hint_effectiveness(self, problem: Optional[int] = None) -> dict:
+        """Mean score change on turns right after a hint vs turns without one"""
+        selected = slice(0, len(self.problems)) if problem is None else slice(problem, problem + 1)
+        aggregates = self._aggregates
+        turns = int(aggregates["turns"][selected].sum())
+        hinted = int(aggregates["hinted"][selected].sum())
+        hinted_delta = float(aggregates["hinted_delta"][selected].sum())
+        other_delta = float(aggregates["delta"][selected].sum()) - hinted_delta
+        mean_after = hinted_delta / hinted if hinted else None
+        mean_other = other_delta / (turns - hinted) if turns > hinted else None
+        return {
+            "hinted_turns": hinted,
+            "mean_delta_after_hint": None if mean_after is None else round(mean_after, 3),
+            "mean_delta_without_hint": None if mean_other is None else round(mean_other, 3),
+            "uplift": None if mean_after is None or mean_other is None else round(mean_after - mean_other, 3),
+        }
+
+    def session_history(self, thread_id: str) -> dict:
+        """One session's per-turn score trajectory"""
+        session = self._sessions.get(thread_id)
+        if session is None:
+            return {}
+        mask = self.turns["session"] == session.index
+        return {
+            "turn": self.turns["turn"][mask].tolist(),
+            "checkpoint": [CHECKPOINTS[i] for i in self.turns["checkpoint"][mask]],
+            **{field: self.turns["scores"][mask, i].tolist() for i, field in enumerate(SCORE_FIELDS)},
+        }
+
+    def summary(self, title_slug: Optional[str] = None, top: int = 20) -> dict:
+        problem = self._problem_index.get(title_slug) if title_slug else None
+        if title_slug and problem is None:
+            return {"title_slug": title_slug, "turns": 0}
+        return {
+            "turns": self.turns.size,
+            "sessions": self.session_count,
+            "live_sessions": len(self._sessions),
+            "problems": len(self.problems),
+            "title_slug": title_slug,
+            "most_stuck": self.stuck_rates(top) if problem is None else None,
+            "turns_to_checkpoint": self.turns_to_checkpoint(problem),
+            "hint_effectiveness": self.hint_effectiveness(problem),
+        }
+
+    # === Local persistence ===
+    def save(self, path: str):
+        arrays = {f"turns_{name}": self.turns[name] for name, _, _ in TURN_COLUMNS}
+        arrays.update({f"milestones_{name}": self.milestones[name] for name, _, _ in MILESTONE_COLUMNS})
+        np.savez_compressed(path, problems=np.array(self.problems), **arrays)
+
+    def load(self, path: str):
+        with np.load(path) as data:
+            self.extend(
+                [str(slug) for slug in data["problems"]],
+                {name: data[f"turns_{name}"] for name, _, _ in TURN_COLUMNS},
+                {name: data[f"milestones_{name}"] for name, _, _ in MILESTONE_COLUMNS},
+            )
+
+    def extend(self, problems: list, turns: dict, milestones: dict):
+        """Bulk-append columns (from a saved store or a generator) for a fresh store"""
+        with self._lock:
+            self.problems = list(problems)
+            self._problem_index = {slug: i for i, slug in enumerate(self.problems)}
+            self.turns.extend(**turns)
+            self.milestones.extend(**milestones)
+            sessions = self.turns["session"]
+            self.session_count = int(sessions.max()) + 1 if len(sessions) else 0
+            self._rebuild_aggregates()
+
+
+analytics_store = AnalyticsStore()
+
+# Optional .npz file the app loads on startup and saves on shutdown
+ANALYTICS_PATH = os.getenv("ANALYTICS_PATH")
+
+
+def record_scores(state: dict, config: Optional[dict], previous: Optional[dict] = None):
+    """Called once scoring is applied, with the scored state and the state before scoring"""
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    problem_ref = state.get("problem_ref") or {}
+    title_slug = problem_ref.get("title_slug") or state.get("title_slug")
+    if not thread_id or not title_slug or not state.get("progress_scores"):
+        return
+    analytics_store.record_turn(
+        thread_id,
+        title_slug,
+        state.get("total_socratic_turns", 0),
+        state.get("current_checkpoint", "understanding"),
+        state["progress_scores"],
+        bool(state.get("needs_guidance")),
+        previous,
+    )
+
+
+def record_hint(config: Optional[dict]):
+    """Called from hint_node when a hint is actually shown"""
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    if thread_id:
+        analytics_store.record_hint(thread_id)
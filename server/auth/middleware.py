@@ -0,0 +1,74 @@
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+
+from auth.supabase_jwt import AuthError, TokenVerifier
+
+PUBLIC_PATHS = ("/health", "/docs", "/redoc", "/openapi.json")
+
+
+def bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    if scope["type"] == "websocket":
+        # Browsers can't set headers on a WebSocket handshake
+        token = parse_qs(scope.get("query_string", b"").decode()).get("access_token")
+        return token[0] if token else None
+    return None
+
+
+class SupabaseAuthMiddleware:
+    """
+    Verifies the Supabase bearer token of every request locally and puts the user id on
+    request.state.user_id. Requests without a token pass through anonymously unless
+    `required` is set.
+    """
+
+    def __init__(self, app, verifier: TokenVerifier, required: bool = False):
+        self.app = app
+        self.verifier = verifier
+        self.required = required
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        state = scope.setdefault("state", {})
+        state["user_id"] = None
+        token = bearer_token(scope)
+        if token:
+            try:
+                claims = await self.verifier.verify(token)
+            except AuthError as e:
+                return await self._reject(scope, receive, send, e.detail)
+            state["user_id"] = claims["sub"]
+            state["claims"] = claims
+        elif self.required and scope.get("method") != "OPTIONS" and not scope["path"].startswith(PUBLIC_PATHS):
+            return await self._reject(scope, receive, send, "Missing bearer token")
+
+        await self.app(scope, receive, send)
+
+    async def _reject(self, scope, receive, send, detail: str):
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 4401, "reason": detail})
+            return
+        response = JSONResponse({"detail": detail}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+        await response(scope, receive, send)
+
+
+def current_user_id(connection: HTTPConnection) -> Optional[str]:
+    """User id the middleware attached, None for anonymous requests"""
+    return getattr(connection.state, "user_id", None)
+
+
+def thread_key(user_id: Optional[str], thread_id: str) -> str:
+    """
+    Threads are namespaced per user so one user can't reach another's session. Anonymous
+    threads get their own namespace: a client-chosen "<user>:<thread>" id must not land
+    on that user's thread.
+    """
+    return f"{user_id}:{thread_id}" if user_id else f"anon:{thread_id}"
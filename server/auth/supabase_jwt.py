@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import httpx
+import jwt
+
+ASYMMETRIC_ALGORITHMS = ("ES256", "RS256", "EdDSA")
+JWKS_REFRESH_S = 600
+# Unknown kids (key rotation) trigger a refresh, but not more often than this
+JWKS_MIN_REFRESH_S = 30
+
+
+class AuthError(Exception):
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def jwks_url(supabase_url: str) -> str:
+    return f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+
+
+async def fetch_jwks(url: str) -> dict:
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+
+class JWKSCache:
+    """
+    Signing keys of the Supabase project by kid. Refreshed periodically in the background,
+    and on demand when a token names a kid we haven't seen (rate-limited).
+    """
+
+    def __init__(self, url: Optional[str], fetch: Optional[Callable] = None,
+                 refresh_s: float = JWKS_REFRESH_S, min_refresh_s: float = JWKS_MIN_REFRESH_S):
+        self.url = url
+        self.fetch = fetch or fetch_jwks
+        self.refresh_s = refresh_s
+        self.min_refresh_s = min_refresh_s
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"refreshes": 0, "refresh_errors": 0}
+
+    def get(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        return self._keys.get(kid)
+
+    async def refresh(self, force: bool = False) -> bool:
+        if not self.url:
+            return False
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            if not force and time.monotonic() - self._fetched_at < self.min_refresh_s:
+                return False
+            try:
+                key_set = await self.fetch(self.url)
+                keys = {}
+                for jwk in key_set.get("keys", []):
+                    try:
+                        keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+                    except jwt.PyJWTError as e:
+                        print(f"[auth] ⚠️ Skipping unusable JWK {jwk.get('kid')}: {e}")
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                print(f"[auth] ❌ JWKS refresh failed, keeping {len(self._keys)} cached keys: {e}")
+                return False
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self.stats["refreshes"] += 1
+            return True
+
+    async def key_for(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        key = self._keys.get(kid)
+        if key is None and await self.refresh():
+            key = self._keys.get(kid)
+        return key
+
+    async def start(self):
+        if self._task is None and self.url:
+            await self.refresh(force=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_s)
+            await self.refresh(force=True)
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally: asymmetric tokens against the cached JWKS,
+    HS256 tokens against the project's JWT secret. Tokens that verified are remembered
+    (LRU) until they expire, so repeat requests skip the signature check.
+    """
+
+    def __init__(self, jwks: Optional[JWKSCache] = None, secret: Optional[str] = None,
+                 audience: str = "authenticated", issuer: Optional[str] = None,
+                 cache_size: int = 10000, leeway_s: int = 30):
+        self.jwks = jwks
+        self.secret = secret
+        self.audience = audience
+        self.issuer = issuer
+        self.cache_size = cache_size
+        self.leeway_s = leeway_s
+        self._lock = threading.Lock()
+        self._verified = OrderedDict()
+        self.stats = {"cache_hits": 0, "verified": 0, "rejected": 0}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.secret or (self.jwks and self.jwks.url))
+
+    def _cached(self, digest: bytes) -> Optional[dict]:
+        with self._lock:
+            entry = self._verified.get(digest)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._verified[digest]
+                return None
+            self._verified.move_to_end(digest)
+            self.stats["cache_hits"] += 1
+            return claims
+
+    def _remember(self, digest: bytes, claims: dict):
+        with self._lock:
+            self._verified[digest] = (claims, claims["exp"])
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    async def verify(self, token: str) -> dict:
+        """Claims of a valid token; raises AuthError otherwise"""
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        claims = self._cached(digest)
+        if claims is not None:
+            return claims
+
+        try:
+            header = jwt.get_unverified_header(token)
+            algorithm = header.get("alg")
+            if algorithm == "HS256" and self.secret:
+                key = self.secret
+            elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks is not None:
+                key = await self.jwks.key_for(header.get("kid"))
+                if key is None:
+                    raise AuthError(f"Unknown signing key {header.get('kid')}")
+            else:
+                raise AuthError(f"Unsupported token algorithm {algorithm}")
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway_s,
+                options={"require": ["exp", "sub"]},
+            )
+        except AuthError:
+            self.stats["rejected"] += 1
+            raise
+        except jwt.PyJWTError as e:
+            self.stats["rejected"] += 1
+            raise AuthError(f"Invalid token: {e}")
+
+        self.stats["verified"] += 1
+        self._remember(digest, claims)
+        return claims
+
+    def metrics(self) -> dict:
+        with self._lock:
+            cached = len(self._verified)
+        jwks = {**self.jwks.stats, "keys": len(self.jwks._keys)} if self.jwks else None
+        return {**self.stats, "cached_tokens": cached, "jwks": jwks}
+
+
+def create_verifier() -> TokenVerifier:
+    supabase_url = os.getenv("SUPABASE_URL")
+    return TokenVerifier(
+        jwks=JWKSCache(jwks_url(supabase_url) if supabase_url else None),
+        secret=os.getenv("SUPABASE_JWT_SECRET"),
+        issuer=f"{supabase_url.rstrip('/')}/auth/v1" if supabase_url else None,
+        cache_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    )
+
+
+token_verifier = create_verifier()
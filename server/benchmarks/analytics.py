@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+/analytics query latency over synthetic per-turn score history at millions of turns,
+plus the per-turn cost of recording a scored turn.
+
+Usage:
+  python -m benchmarks.analytics --sessions 500000 --problems 3000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from analytics.store import AnalyticsStore, CHECKPOINTS, SCORE_FIELDS
+from benchmarks.replay import percentile
+
+
+def synthetic_columns(sessions: int, problems: int, max_turns: int, seed: int) -> tuple:
+    """Sessions of 3..max_turns scored turns; harder problems progress slower and get stuck more"""
+    rng = np.random.default_rng(seed)
+    difficulty = rng.beta(2, 2, problems)
+    session_problem = np.minimum(rng.zipf(1.3, sessions) - 1, problems - 1).astype(np.int32)
+    lengths = rng.integers(3, max_turns + 1, sessions)
+    rows = int(lengths.sum())
+
+    session = np.repeat(np.arange(sessions, dtype=np.int32), lengths)
+    problem = session_problem[session]
+    starts = np.cumsum(lengths) - lengths
+    turn = (np.arange(rows) - np.repeat(starts, lengths)).astype(np.int16)
+    first = turn == 0
+
+    # Checkpoint only moves forward, one step at a time
+    advance = (rng.random(rows) < 0.45 - 0.3 * difficulty[problem]) & ~first
+    step = np.cumsum(advance)
+    checkpoint = np.minimum(step - np.repeat(step[starts], lengths), len(CHECKPOINTS) - 1).astype(np.int8)
+
+    base = 25 + checkpoint * 15 - difficulty[problem] * 20
+    scores = np.clip(base[:, None] + rng.normal(0, 8, (rows, len(SCORE_FIELDS))), 0, 100).astype(np.uint8)
+    mean = scores.mean(axis=1)
+    stuck = (mean < 40) | (scores.min(axis=1) < 30)
+
+    previous_stuck = np.roll(stuck, 1) & ~first
+    after_hint = previous_stuck & (rng.random(rows) < 0.6)
+    delta = np.where(first, 0.0, mean - np.roll(mean, 1)).astype(np.float32)
+    delta[after_hint] += 4.0
+
+    changed = first | (checkpoint != np.roll(checkpoint, 1))
+    turns = {
+        "session": session, "problem": problem, "turn": turn, "checkpoint": checkpoint,
+        "scores": scores, "delta": delta, "after_hint": after_hint, "stuck": stuck,
+    }
+    milestones = {
+        "session": session[changed], "problem": problem[changed],
+        "checkpoint": checkpoint[changed], "turn": turn[changed],
+    }
+    return [f"problem-{i}" for i in range(problems)], turns, milestones
+
+
+def time_ms(call, repeats: int) -> list:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized analytics over synthetic score history")
+    parser.add_argument("--sessions", type=int, default=500000)
+    parser.add_argument("--problems", type=int, default=3000)
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    problems, turns, milestones = synthetic_columns(args.sessions, args.problems, args.max_turns, args.seed)
+    store = AnalyticsStore()
+    store.extend(problems, turns, milestones)
+    load_s = time.perf_counter() - started
+
+    overall = time_ms(lambda: store.summary(), args.repeats)
+    one_problem = time_ms(lambda: store.summary("problem-0"), args.repeats)
+
+    # Online ingestion cost, as checkpoint_node pays it
+    live = AnalyticsStore()
+    scores = dict(zip(SCORE_FIELDS, (40, 35, 30, 25, 20)))
+    appends = 100000
+    started = time.perf_counter()
+    for i in range(appends):
+        live.record_turn(f"thread-{i // 10}", "two-sum", i % 10, CHECKPOINTS[(i % 10) // 3], scores, i % 3 == 0)
+    record_us = (time.perf_counter() - started) / appends * 1e6
+
+    summary = store.summary(top=5)
+    print(json.dumps({
+        "turns": store.turns.size,
+        "sessions": store.session_count,
+        "problems": len(store.problems),
+        "generate_and_load_s": round(load_s, 2),
+        "summary_p50_ms": round(percentile(overall, 50), 2),
+        "summary_p95_ms": round(percentile(overall, 95), 2),
+        "problem_summary_p50_ms": round(percentile(one_problem, 50), 2),
+        "record_turn_us": round(record_us, 2),
+        "sample": {
+            "most_stuck": summary["most_stuck"][:3],
+            "turns_to_checkpoint": summary["turns_to_checkpoint"],
+            "hint_effectiveness": summary["hint_effectiveness"],
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
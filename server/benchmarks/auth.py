@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Local Supabase JWT verification: per-request verification cost against locally minted
+tokens (ES256 via a JWKS, HS256 via the JWT secret), cold (signature check) vs cached
+(LRU hit). Correctness checks live in tests/test_auth.py.
+
+Usage:
+  python -m benchmarks.auth --tokens 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.supabase_jwt import TokenVerifier
+from benchmarks.replay import percentile
+from tests.test_auth import LocalProject, new_verifier
+
+
+async def timed(verifier: TokenVerifier, tokens: list) -> list:
+    timings = []
+    for token in tokens:
+        started = time.perf_counter()
+        await verifier.verify(token)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+async def microbenchmark(count: int) -> dict:
+    project = LocalProject()
+    verifier = new_verifier(project)
+    await verifier.jwks.start()
+    es256 = [project.mint(f"user-{i}") for i in range(count)]
+    hs256 = [project.mint(f"user-{i}", algorithm="HS256") for i in range(count)]
+
+    results = {}
+    for name, tokens in (("es256", es256), ("hs256", hs256)):
+        cold = await timed(verifier, tokens)
+        cached = await timed(verifier, tokens)
+        results[f"{name}_cold_p50_us"] = round(percentile(cold, 50), 1)
+        results[f"{name}_cold_p95_us"] = round(percentile(cold, 95), 1)
+        results[f"{name}_cached_p50_us"] = round(percentile(cached, 50), 1)
+    results["jwks_fetches"] = project.fetches
+    await verifier.jwks.stop()
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Local JWT verification cost per request")
+    parser.add_argument("--tokens", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(await microbenchmark(args.tokens), indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+User-visible turn latency with scoring inline (full graph) vs on the background queue
+(interactive graph + score_turn jobs), against a fake LLM with fixed latency.
+
+Every session must still end with progress scores; the background run fails otherwise.
+A second background run sends every message right after the previous reply (no think time):
+each turn waits for the previous turn's scoring, so none of it may be dropped as stale.
+
+Usage:
+  python -m benchmarks.background_scoring --sessions 50 --llm-latency-ms 150 --think-ms 1000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.background import JobQueue
+from agent_orchestration.graph import graph, interactive_graph, record_scoring, score_turn
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import RunRegistry
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems, load_script, percentile
+
+SCRIPTS = ("two_sum", "valid_parentheses", "stock")
+
+
+async def run_mode(name: str, registry: RunRegistry, sessions: int, think_s: float) -> dict:
+    latencies = []
+    thread_ids = []
+
+    async def one(index: int):
+        script = load_script(SCRIPTS[index % len(SCRIPTS)])
+        thread_id = f"{name}-{index}"
+        thread_ids.append(thread_id)
+        await asyncio.sleep(random.Random(index).uniform(0, think_s))  # don't start sessions in lockstep
+        for turn, user_msg in enumerate(script["turns"]):
+            started = time.perf_counter()
+            await registry.submit(thread_id, [HumanMessage(content=user_msg)])
+            if turn:  # the first turn is the problem URL (ingest), same in both modes
+                latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(think_s)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    wall_s = time.perf_counter() - started
+    if registry.background is not None:
+        await registry.background.stop()  # drains the last turn's scoring
+    final_states = [registry.graph.get_state({"configurable": {"thread_id": t}}).values for t in thread_ids]
+
+    return {
+        "mode": name,
+        "turns": len(latencies),
+        "turn_p50_ms": round(percentile(latencies, 50), 1),
+        "turn_p95_ms": round(percentile(latencies, 95), 1),
+        "sessions_with_scores": sum(1 for state in final_states if state.get("progress_scores")),
+        "wall_s": round(wall_s, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Inline vs background scoring turn latency")
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--llm-latency-ms", type=float, default=150.0)
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="pause between a reply and the next message")
+    args = parser.parse_args()
+
+    llm_s = args.llm_latency_ms / 1000
+    models = {node: ScriptedChatModel(latency=lambda: llm_s) for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())), contextlib.redirect_stdout(io.StringIO()):
+        inline = await run_mode("inline", RunRegistry(graph), args.sessions, args.think_ms / 1000)
+        queue = JobQueue(workers=16)
+        background_registry = RunRegistry(interactive_graph, background=queue, scorer=score_turn,
+                                          on_scored=record_scoring)
+        background = await run_mode("background", background_registry, args.sessions, args.think_ms / 1000)
+        back_to_back_registry = RunRegistry(interactive_graph, background=JobQueue(workers=16),
+                                            scorer=score_turn, on_scored=record_scoring)
+        back_to_back = await run_mode("back_to_back", back_to_back_registry, args.sessions, 0.0)
+
+    for result in (inline, background):
+        result["turn_p50_llm_calls"] = round(result["turn_p50_ms"] / args.llm_latency_ms, 2)
+    background["queue"] = queue.metrics()
+    background["runs"] = background_registry.metrics()
+    back_to_back["runs"] = back_to_back_registry.metrics()
+    print(json.dumps([inline, background, back_to_back], indent=2))
+    print(f"\n📉 turn p50 {inline['turn_p50_ms']}ms → {background['turn_p50_ms']}ms "
+          f"(~{background['turn_p50_llm_calls']} LLM calls on the reply path)")
+
+    if background["sessions_with_scores"] < args.sessions:
+        print(f"❌ Only {background['sessions_with_scores']}/{args.sessions} sessions were scored")
+        sys.exit(1)
+    stale = back_to_back["runs"]["scoring_stale"]
+    if stale:
+        print(f"❌ {stale}/{back_to_back['runs']['scoring_scheduled']} scoring jobs dropped as stale "
+              f"with back-to-back turns")
+        sys.exit(1)
+    print(f"✅ back-to-back turns: {back_to_back['runs']['scoring_applied']} scoring jobs applied, none stale")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+import hashlib
+import importlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agent_orchestration.llm import LLM_SETTINGS, get_llm, set_llm_override, clear_llm_overrides
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def request_key(node: str, messages: list) -> str:
+    payload = json.dumps([node] + [[m.type, m.content] for m in messages], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class Cassette:
+    """
+    Recorded LLM responses and LeetCode problems for one scripted run.
+    Identical requests are replayed in the order they were recorded.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.llm = {}
+        self.problems = {}
+        self._cursor = {}
+        if mode == "replay":
+            with open(path) as f:
+                data = json.load(f)
+            self.llm = data.get("llm", {})
+            self.problems = data.get("problems", {})
+
+    def next_response(self, key: str) -> dict:
+        if key not in self.llm:
+            raise CassetteMiss(f"No recorded LLM response for request {key} in {self.path}")
+        responses = self.llm[key]
+        index = self._cursor.get(key, 0)
+        self._cursor[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
+
+    def record_response(self, key: str, content: str, usage: Optional[dict]):
+        self.llm.setdefault(key, []).append({"content": content, "usage": usage})
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"llm": self.llm, "problems": self.problems}, f, indent=2, sort_keys=True)
+
+
+class CassetteChatModel(BaseChatModel):
+    """Records a node's real LLM responses, or replays them with no network"""
+
+    cassette: Any
+    node: str
+    inner: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.cassette.mode}"
+
+    def _replayed(self, key: str) -> ChatResult:
+        recorded = self.cassette.next_response(key)
+        message = AIMessage(content=recorded["content"], usage_metadata=recorded.get("usage"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _recorded(self, key: str, response) -> ChatResult:
+        usage = getattr(response, "usage_metadata", None)
+        self.cassette.record_response(key, response.content, dict(usage) if usage else None)
+        message = AIMessage(content=response.content, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = request_key(self.node, messages)
+        if self.cassette.mode == "replay":
+            return self._replayed(key)
+        return self._recorded(key, self.inner.invoke(messages, config={"callbacks": []}))
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = request_key(self.node, messages)
+        if self.cassette.mode == "replay":
+            return self._replayed(key)
+        return self._recorded(key, await self.inner.ainvoke(messages, config={"callbacks": []}))
+
+
+class ProblemFetcher:
+    """Stands in for the `fetch_leetcode_problem` tool (same `ainvoke` interface)"""
+
+    def __init__(self, problems: dict, inner=None, cassette: Optional[Cassette] = None):
+        self.problems = problems
+        self.inner = inner
+        self.cassette = cassette
+
+    async def ainvoke(self, title_slug: str) -> dict:
+        if self.inner is not None:
+            problem = await self.inner.ainvoke(title_slug)
+            if self.cassette is not None:
+                self.cassette.problems[title_slug] = problem
+            return problem
+        if title_slug not in self.problems:
+            raise CassetteMiss(f"No recorded problem for '{title_slug}'")
+        return self.problems[title_slug]
+
+
+@contextmanager
+def patched_backends(models: dict, fetcher: ProblemFetcher):
+    """Point every node at the given models and the ingest node at the given fetcher"""
+    ingest_module = importlib.import_module("agent_orchestration.agents.ingest_node")
+    original_fetch = ingest_module.fetch_leetcode_problem
+    for node, model in models.items():
+        set_llm_override(model, node)
+    ingest_module.fetch_leetcode_problem = fetcher
+    try:
+        yield
+    finally:
+        ingest_module.fetch_leetcode_problem = original_fetch
+        clear_llm_overrides()
+
+
+@contextmanager
+def use_cassette(cassette: Cassette):
+    if cassette.mode == "record":
+        from agent_orchestration.tools.leetcode_problem_tool import fetch_leetcode_problem
+        models = {node: CassetteChatModel(cassette=cassette, node=node, inner=get_llm(node)) for node in LLM_SETTINGS}
+        fetcher = ProblemFetcher({}, inner=fetch_leetcode_problem, cassette=cassette)
+    else:
+        models = {node: CassetteChatModel(cassette=cassette, node=node) for node in LLM_SETTINGS}
+        fetcher = ProblemFetcher(cassette.problems)
+    with patched_backends(models, fetcher):
+        yield cassette
+    if cassette.mode == "record":
+        cassette.save()
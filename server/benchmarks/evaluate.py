@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of tutoring quality against cost.
+
+Every scripted learner persona (benchmarks/fixtures/eval_corpus.json) works through every
+corpus problem on the same pipeline the API runs: the interactive graph plus background
+scoring, or the full graph with BACKGROUND_SCORING=0. Sessions are spread over worker
+processes, and each worker runs several at a time. A deterministic local judge scores
+each session:
+  - quality: solution leaks, hints given, turns to complete, share of replies asking a
+    question, and whether the persona's expectations held
+  - cost: LLM calls, input/cached/output tokens, USD, and user-visible turn latency
+Results are reported overall, per problem and per persona, then compared with a
+committed baseline. The run exits 1 if quality drops or cost grows past tolerance.
+
+To evaluate a change, set the knobs as env vars, or edit the prompts, then compare:
+  GUIDANCE_MIN_SCORE=40 python -m benchmarks.evaluate --label min-score-40
+
+Modes:
+  synthetic  scripted fake LLM + fixture problems
+  record     real OpenAI + LeetCode, saved to benchmarks/cassettes/eval_corpus.json
+  replay     served from that cassette
+
+Usage:
+  python -m benchmarks.evaluate --workers 4 --repeats 5
+  python -m benchmarks.evaluate --personas stuck,steady --problems two-sum --out /tmp/eval.json
+  python -m benchmarks.evaluate --update-baseline
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+import agent_orchestration.agents.checkpoint_node as checkpoint_module
+from agent_orchestration.background import JobQueue
+from agent_orchestration.graph import graph, interactive_graph, record_scoring, score_turn
+from agent_orchestration.prompts import PREFIXES, prefix_fingerprint
+from agent_orchestration.runs import BACKGROUND_SCORING, SCORING_WAIT_S, RunRegistry, TokenUsageCallback
+from benchmarks.judge import judge_session
+from benchmarks.replay import BASELINES_DIR, BENCH_DIR, backends, percentile
+
+CORPUS_PATH = os.path.join(BENCH_DIR, "fixtures", "eval_corpus.json")
+CASSETTE_NAME = "eval_corpus"
+URL = "https://leetcode.com/problems/{}/"
+
+# metric -> (higher_is_worse, relative tolerance, absolute slack) before it counts as a regression
+TOLERANCES = {
+    "expectations_met_rate": (False, 0.0, 0.0),
+    "leak_rate": (True, 0.0, 0.0),
+    "socratic_ratio": (False, 0.05, 0.0),
+    "llm_calls_per_session": (True, 0.05, 0.0),
+    "tokens_per_session": (True, 0.05, 1.0),
+    "usd_per_session": (True, 0.05, 0.0),
+    "turn_latency_p95_ms": (True, 0.50, 5.0),
+}
+# Also compared per problem, so one problem getting worse can't hide in the average
+PER_PROBLEM_METRICS = ("expectations_met_rate", "leak_rate")
+
+
+def load_corpus() -> dict:
+    with open(CORPUS_PATH) as f:
+        return json.load(f)
+
+
+class SessionUsage(TokenUsageCallback):
+    """TokenUsageCallback that also splits tokens into input, provider-cached input and output"""
+
+    def __init__(self):
+        super().__init__()
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        super().on_llm_end(response, **kwargs)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.output_tokens += usage.get("output_tokens", 0)
+                    self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+
+
+def metered_scorer(usage_by_thread: dict):
+    """score_turn that also reports its LLM calls to the session's usage counter"""
+    async def scorer(state: dict, config: dict) -> dict:
+        usage = usage_by_thread.get(config["configurable"]["thread_id"])
+        if usage is not None:
+            config = {**config, "callbacks": [*config.get("callbacks", []), usage]}
+        return await score_turn(state, config)
+    return scorer
+
+
+# === Sessions ===
+async def run_session(registry: RunRegistry, job: dict, corpus: dict, usage_by_thread: dict) -> dict:
+    problem = corpus["problems"][job["problem"]]
+    persona = corpus["personas"][job["persona"]]
+    thread_id = f"eval-{job['persona']}-{job['problem']}-{job['repeat']}"
+    config = {"configurable": {"thread_id": thread_id}}
+    fields = {**problem, "url": URL.format(job["problem"])}
+    usage = usage_by_thread[thread_id] = SessionUsage()
+
+    latencies = []
+    turns_to_complete = None
+    state = {}
+    for index, template in enumerate(persona["turns"]):
+        started = time.perf_counter()
+        await registry.submit(thread_id, [HumanMessage(content=template.format(**fields))], callbacks=[usage])
+        if index:  # the first turn is the problem URL (ingest)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if registry.background is not None:
+            # Scoring decides completion; the next turn would wait for it anyway
+            await registry.background.wait_for_thread(thread_id, SCORING_WAIT_S)
+        state = registry.graph.get_state(config).values
+        if state.get("conversation_complete"):
+            turns_to_complete = index + 1
+            break
+
+    replies = [m.content for m in state.get("messages", []) if getattr(m, "type", None) == "ai"]
+    return {
+        "persona": job["persona"],
+        "problem": job["problem"],
+        "repeat": job["repeat"],
+        **judge_session(replies, state, turns_to_complete, problem, persona),
+        "turns": index + 1,
+        "llm_calls": usage.calls,
+        "tokens": usage.tokens,
+        "input_tokens": usage.input_tokens,
+        "cached_tokens": usage.cached_tokens,
+        "output_tokens": usage.output_tokens,
+        "turn_latency_ms": latencies,
+    }
+
+
+async def _run_shard(jobs: list, options: dict) -> list:
+    corpus = load_corpus()
+    usage_by_thread = {}
+    semaphore = asyncio.Semaphore(options["concurrency"])
+    sink = sys.stdout if options["verbose"] else io.StringIO()
+    with backends(options["mode"], CASSETTE_NAME, options["llm_latency_ms"]), contextlib.redirect_stdout(sink):
+        if BACKGROUND_SCORING:
+            registry = RunRegistry(interactive_graph, background=JobQueue(workers=16),
+                                   scorer=metered_scorer(usage_by_thread), on_scored=record_scoring)
+        else:
+            registry = RunRegistry(graph)
+
+        async def one(job: dict) -> dict:
+            async with semaphore:
+                return await run_session(registry, job, corpus, usage_by_thread)
+
+        try:
+            return await asyncio.gather(*(one(job) for job in jobs))
+        finally:
+            if registry.background is not None:
+                await registry.background.stop()
+
+
+def run_shard(jobs: list, options: dict) -> list:
+    """One worker process's share of the sessions (module-level so it can be pickled)"""
+    return asyncio.run(_run_shard(jobs, options))
+
+
+def run_jobs(jobs: list, options: dict, workers: int) -> list:
+    if workers <= 1:
+        return run_shard(jobs, options)
+    shards = [jobs[index::workers] for index in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(run_shard, shards, [options] * workers)
+        return [record for shard in results for record in shard]
+
+
+# === Report ===
+def session_usd(record: dict, prices: dict) -> float:
+    uncached = record["input_tokens"] - record["cached_tokens"]
+    return (uncached * prices["input"] + record["cached_tokens"] * prices["cached"]
+            + record["output_tokens"] * prices["output"]) / 1_000_000
+
+
+def aggregate(records: list, prices: dict) -> dict:
+    def mean(key: str) -> float:
+        return statistics.mean(record[key] for record in records)
+
+    completed = [record for record in records if record["completed"]]
+    latencies = [ms for record in records for ms in record["turn_latency_ms"]]
+    input_tokens = sum(record["input_tokens"] for record in records)
+    usd = sum(session_usd(record, prices) for record in records)
+    return {
+        "sessions": len(records),
+        "expectations_met_rate": round(mean("expectations_met"), 3),
+        "leak_rate": round(mean("leaked"), 3),
+        "completion_rate": round(len(completed) / len(records), 3),
+        "turns_to_complete_mean": round(statistics.mean(r["turns_to_complete"] for r in completed), 2)
+        if completed else None,
+        "hints_per_session": round(mean("hints"), 2),
+        "socratic_ratio": round(mean("socratic_ratio"), 3),
+        "llm_calls_per_session": round(mean("llm_calls"), 2),
+        "tokens_per_session": round(mean("tokens"), 1),
+        "cached_input_ratio": round(sum(r["cached_tokens"] for r in records) / input_tokens, 3)
+        if input_tokens else 0.0,
+        "usd_per_session": round(usd / len(records), 6),
+        "usd_per_completed_session": round(usd / len(completed), 6) if completed else None,
+        "turn_latency_p50_ms": round(percentile(latencies, 50), 2),
+        "turn_latency_p95_ms": round(percentile(latencies, 95), 2),
+    }
+
+
+def grouped(records: list, key: str, prices: dict) -> dict:
+    groups = {}
+    for record in records:
+        groups.setdefault(record[key], []).append(record)
+    return {name: aggregate(group, prices) for name, group in sorted(groups.items())}
+
+
+def run_config(args) -> dict:
+    """What the numbers depend on, so two reports can be told apart"""
+    return {
+        "mode": args.mode,
+        "pipeline": "interactive+background_scoring" if BACKGROUND_SCORING else "full_graph",
+        "llm_latency_ms": args.llm_latency_ms,
+        "prefixes": {name: f"{p['version']}#{prefix_fingerprint(name)}" for name, p in PREFIXES.items()},
+        "guidance_avg_score": checkpoint_module.GUIDANCE_AVG_SCORE,
+        "guidance_min_score": checkpoint_module.GUIDANCE_MIN_SCORE,
+        "usd_per_1m_tokens": {"input": args.usd_per_1m_input, "cached": args.usd_per_1m_cached,
+                              "output": args.usd_per_1m_output},
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict) -> list:
+    regressions = []
+    same_latency = report["config"]["llm_latency_ms"] == baseline["config"].get("llm_latency_ms")
+    scopes = [("overall", report["overall"], baseline["overall"], TOLERANCES)]
+    for name, current in report["by_problem"].items():
+        if name in baseline.get("by_problem", {}):
+            scopes.append((name, current, baseline["by_problem"][name],
+                           {metric: TOLERANCES[metric] for metric in PER_PROBLEM_METRICS}))
+    for scope, current, previous, tolerances in scopes:
+        for metric, (higher_is_worse, relative, slack) in tolerances.items():
+            if current.get(metric) is None or previous.get(metric) is None:
+                continue
+            if metric.startswith("turn_latency") and not same_latency:
+                continue
+            if higher_is_worse:
+                limit = previous[metric] * (1 + relative) + slack
+                worse = current[metric] > limit
+            else:
+                limit = previous[metric] * (1 - relative) - slack
+                worse = current[metric] < limit
+            if worse:
+                regressions.append(f"[{scope}] {metric}: {current[metric]} vs limit {limit:.4g} "
+                                   f"(baseline {previous[metric]})")
+    return regressions
+
+
+def print_comparison(report: dict, baseline: dict):
+    changed = {key: (baseline["config"].get(key), value) for key, value in report["config"].items()
+               if baseline["config"].get(key) != value}
+    print(f"\n🔬 {report['label']} vs {baseline.get('label', 'baseline')}")
+    for key, (before, after) in changed.items():
+        print(f"   config {key}: {before} → {after}")
+    for metric, value in report["overall"].items():
+        before = baseline["overall"].get(metric)
+        if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before != value:
+            change = f" ({(value - before) / before:+.1%})" if before else ""
+            print(f"   {metric:<28} {before:>12} → {value:<12}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline tutoring quality / cost evaluation")
+    parser.add_argument("--personas", help="comma-separated persona names (default: all)")
+    parser.add_argument("--problems", help="comma-separated problem slugs (default: all)")
+    parser.add_argument("--repeats", type=int, default=1, help="sessions per persona and problem")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions in flight per worker")
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="synthetic mode only")
+    parser.add_argument("--usd-per-1m-input", type=float, default=0.15)
+    parser.add_argument("--usd-per-1m-cached", type=float, default=0.075)
+    parser.add_argument("--usd-per-1m-output", type=float, default=0.60)
+    parser.add_argument("--label", default="current")
+    parser.add_argument("--out", help="write the report JSON here")
+    parser.add_argument("--baseline", help="report to compare against (default: the committed baseline)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show graph output")
+    args = parser.parse_args()
+
+    if args.mode == "record" and (args.workers != 1 or args.concurrency != 1 or args.repeats != 1):
+        parser.error("record mode runs one session at a time (--workers 1 --concurrency 1 --repeats 1)")
+
+    corpus = load_corpus()
+    personas = args.personas.split(",") if args.personas else sorted(corpus["personas"])
+    problems = args.problems.split(",") if args.problems else sorted(corpus["problems"])
+    unknown = [name for name in personas if name not in corpus["personas"]]
+    unknown += [name for name in problems if name not in corpus["problems"]]
+    if unknown:
+        parser.error(f"not in the corpus: {', '.join(unknown)}")
+
+    jobs = [{"persona": persona, "problem": problem, "repeat": repeat}
+            for repeat in range(args.repeats) for persona in personas for problem in problems]
+    options = {"mode": args.mode, "llm_latency_ms": args.llm_latency_ms, "concurrency": args.concurrency,
+               "verbose": args.verbose}
+    prices = {"input": args.usd_per_1m_input, "cached": args.usd_per_1m_cached, "output": args.usd_per_1m_output}
+
+    started = time.perf_counter()
+    records = run_jobs(jobs, options, args.workers)
+    wall_s = time.perf_counter() - started
+
+    report = {
+        "label": args.label,
+        "config": run_config(args),
+        "personas": personas,
+        "problems": problems,
+        "repeats": args.repeats,
+        "workers": args.workers,
+        "wall_s": round(wall_s, 2),
+        "sessions_per_s": round(len(records) / wall_s, 1) if wall_s else 0.0,
+        "overall": aggregate(records, prices),
+        "by_problem": grouped(records, "problem", prices),
+        "by_persona": grouped(records, "persona", prices),
+        "unmet": [f"{r['persona']} / {r['problem']}: {', '.join(r['unmet'])}"
+                  for r in records if r["unmet"] and r["repeat"] == 0],
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({**report, "sessions": records}, f, indent=2)
+        print(f"💾 Report written: {args.out}")
+
+    path = args.baseline or os.path.join(BASELINES_DIR, f"eval.{args.mode}.json")
+    if args.update_baseline:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline written: {path}")
+        return
+    if not os.path.exists(path):
+        print(f"⚠️ No baseline at {path} (run with --update-baseline)")
+        return
+    with open(path) as f:
+        baseline = json.load(f)
+    print_comparison(report, baseline)
+    regressions = compare_to_baseline(report, baseline)
+    for regression in regressions:
+        print(f"❌ REGRESSION {regression}")
+    if regressions:
+        print(f"\n🛑 {len(regressions)} regression(s) against {path}")
+        sys.exit(1)
+    print(f"\n✅ {len(records)} sessions within baseline tolerances")
+
+
+if __name__ == "__main__":
+    main()
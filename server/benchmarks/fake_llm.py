@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Callable, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Phrases that move the fake progress tracker's scores up
+PROGRESS_KEYWORDS = [
+    "target", "two numbers", "index", "hash", "map", "dictionary", "complement",
+    "o(n)", "one pass", "stack", "pointer", "sorted", "edge case", "empty",
+]
+
+
+def stable_hash(text: str) -> int:
+    return int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+def count_tokens(text: str) -> int:
+    """Rough tokenizer stand-in (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+# Simulated provider prompt caching: prompts of at least this many tokens are cached
+# in fixed-size blocks, and a request reads back its longest previously seen prefix
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+_seen_prefix_blocks = set()
+
+
+def reset_prefix_cache():
+    _seen_prefix_blocks.clear()
+
+
+def cached_prefix_tokens(messages: list) -> int:
+    text = "\n".join(str(m.content) for m in messages)
+    if count_tokens(text) < CACHE_MIN_TOKENS:
+        return 0
+    block_chars = CACHE_BLOCK_TOKENS * 4
+    digest = hashlib.blake2b(digest_size=16)
+    cached, hit = 0, True
+    for end in range(block_chars, len(text) + 1, block_chars):
+        digest.update(text[end - block_chars:end].encode())
+        key = digest.copy().digest()
+        if hit and key in _seen_prefix_blocks:
+            cached += CACHE_BLOCK_TOKENS
+        else:
+            hit = False
+            _seen_prefix_blocks.add(key)
+    return cached
+
+
+def _field(text: str, name: str) -> str:
+    match = re.search(rf"{name}:\s*(.*)", text)
+    return match.group(1).strip() if match else ""
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic offline stand-in for the OpenAI chat model.
+    Recognizes the checkpoint / hint-assessment prompts and answers with well-formed JSON,
+    everything else gets a short Socratic-style reply. Latency is optional and pluggable.
+    With `streaming`, async calls stream the reply word by word (like ChatOpenAI(streaming=True)).
+    """
+
+    latency: Optional[Callable[[], float]] = None
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _respond(self, messages: list) -> str:
+        system = next((m.content for m in messages if m.type == "system"), "")
+        human = next((m.content for m in reversed(messages) if m.type == "human"), "")
+
+        if '"problem_understanding"' in system:
+            user_message = _field(human, "User Message").lower()
+            hits = sum(1 for keyword in PROGRESS_KEYWORDS if keyword in user_message)
+            base = min(95, 20 + hits * 15 + stable_hash(user_message) % 10)
+            checkpoint = ("understanding", "planning", "implementing", "optimizing", "complete")[min(4, hits)]
+            return json.dumps({
+                "checkpoint": checkpoint,
+                "problem_understanding": min(100, base + 10),
+                "approach_clarity": base,
+                "implementation_readiness": max(0, base - 10),
+                "complexity_awareness": max(0, base - 15),
+                "completion_confidence": 95 if checkpoint == "complete" else base,
+                "key_concepts_mentioned": [k for k in PROGRESS_KEYWORDS if k in user_message],
+                "missing_concepts": [k for k in PROGRESS_KEYWORDS[:4] if k not in user_message],
+                "progress_summary": f"{hits} key ideas mentioned",
+                "needs_guidance": base < 40,
+            })
+
+        if '"is_stuck"' in system:
+            recent = _field(human, "User Messages").lower()
+            return json.dumps({
+                "is_stuck": not any(keyword in recent for keyword in PROGRESS_KEYWORDS[3:]),
+                "struggling_with": "choosing a data structure",
+                "hint_type": "algorithmic",
+                "understanding_level": "beginner",
+            })
+
+        if "concise hint" in system:
+            title = _field("\n".join(str(m.content) for m in messages), "Title")
+            return f"For {title}, think about what you would need to remember about numbers you've already seen."
+
+        user_message = _field(human, "Message")
+        return (
+            "Good thinking! What information do you need to keep track of as you scan the input? "
+            f"(re: {user_message[:40]})"
+        )
+
+    def _usage(self, messages: list, content: str) -> dict:
+        input_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        output_tokens = count_tokens(content)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": min(input_tokens, cached_prefix_tokens(messages))},
+        }
+
+    def _result(self, messages: list) -> ChatResult:
+        content = self._respond(messages)
+        usage = self._usage(messages, content)
+        message = AIMessage(content=content, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency())
+        return self._result(messages)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency())
+        return self._result(messages)
+
+    def _should_stream(self, *, async_api: bool, run_manager=None, **kwargs) -> bool:
+        if async_api and self.streaming and "stream" not in kwargs:
+            return True
+        return super()._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs):
+        content = self._respond(messages)
+        words = re.findall(r"\S+\s*", content) or [content]
+        delay = self.latency() / len(words) if self.latency else 0.0
+        for index, word in enumerate(words):
+            if delay:
+                await asyncio.sleep(delay)
+            usage = self._usage(messages, content) if index == len(words) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
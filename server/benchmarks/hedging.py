@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+p99 latency of a node's LLM call with and without the latency policy, against a fake LLM
+with a heavy-tailed latency distribution (most calls fast, a Pareto tail of stragglers).
+
+Usage:
+  python -m benchmarks.hedging --calls 2000 --concurrency 50
+  python -m benchmarks.hedging --deadline-ms 800 --tail-fraction 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_orchestration.latency import LatencyPolicy, percentile
+from agent_orchestration.llm import set_llm_override, clear_llm_overrides
+from agent_orchestration.prompts import build_prompt, section
+from benchmarks.fake_llm import ScriptedChatModel
+
+STATE = {
+    "problem_data": {
+        "title": "Two Sum",
+        "difficulty": "Easy",
+        "content": "Return indices of the two numbers such that they add up to target.",
+    },
+}
+MESSAGES = build_prompt("checkpoint", STATE, [
+    section("Previous Checkpoint", "planning"),
+    section("User Message", "I could keep a hash map of complements as I go.", trim="tail"),
+])
+
+
+class HeavyTail:
+    """Lognormal body around `median_s`, a Pareto tail for `tail_fraction` of requests"""
+
+    def __init__(self, median_s: float, tail_fraction: float, seed: int):
+        self.median_s = median_s
+        self.tail_fraction = tail_fraction
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    def __call__(self) -> float:
+        self.requests += 1
+        if self.rng.random() < self.tail_fraction:
+            return min(10.0, self.median_s * 3 * self.rng.paretovariate(1.3))
+        return self.rng.lognormvariate(math.log(self.median_s), 0.25)
+
+
+async def run(calls: int, concurrency: int, call) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+def report(name: str, latencies: list, requests: int, calls: int) -> dict:
+    return {
+        "mode": name,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1),
+        "llm_requests_per_call": round(requests / calls, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Hedged LLM requests vs a heavy-tailed fake LLM")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median-ms", type=float, default=80.0)
+    parser.add_argument("--tail-fraction", type=float, default=0.08)
+    parser.add_argument("--deadline-ms", type=float, default=1500.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Baseline: plain call, no deadline or hedging
+    baseline_latency = HeavyTail(args.median_ms / 1000, args.tail_fraction, args.seed)
+    llm = ScriptedChatModel(latency=baseline_latency)
+    baseline = await run(args.calls, args.concurrency, lambda: llm.ainvoke(MESSAGES))
+
+    # Policy: p95 hedging + deadline, falling back to the previous score
+    policy_latency = HeavyTail(args.median_ms / 1000, args.tail_fraction, args.seed)
+    set_llm_override(ScriptedChatModel(latency=policy_latency), "checkpoint")
+    policy = LatencyPolicy({"checkpoint": {"deadline_s": args.deadline_ms / 1000, "hedge": True, "retries": 0}})
+    hedged = await run(args.calls, args.concurrency, lambda: policy.call("checkpoint", MESSAGES))
+    clear_llm_overrides()
+
+    results = [
+        report("baseline", baseline, baseline_latency.requests, args.calls),
+        {**report("hedged", hedged, policy_latency.requests, args.calls),
+         "served": policy.served["checkpoint"]},
+    ]
+    print(json.dumps(results, indent=2))
+    improvement = results[0]["p99_ms"] / results[1]["p99_ms"] if results[1]["p99_ms"] else float("inf")
+    print(f"\n📉 p99 {results[0]['p99_ms']}ms → {results[1]['p99_ms']}ms ({improvement:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Deterministic local judge for evaluation sessions (no LLM involved).
+
+Given the tutor's replies and the final state of one persona session, scores:
+  - solution leaks: code in a reply, or a problem's leak markers (lines of its solution)
+  - hints given and turns until the session completed
+  - how Socratic the replies were (share of replies that ask a question)
+  - whether the persona's expectations held (completes, hint bounds, turns to complete)
+"""
+
+import re
+from typing import List, Optional
+
+# Code blocks, or lines that read like Python rather than prose
+CODE = re.compile(r"```|^\s*(?:def |class |for .+ in .+:|while .+:|return .+|if .+:\s*$)", re.MULTILINE)
+
+
+def solution_leaks(reply: str, leak_markers: List[str]) -> List[str]:
+    """Why a tutor reply gives the solution away; empty if it doesn't"""
+    reasons = []
+    if CODE.search(reply):
+        reasons.append("code")
+    lowered = reply.lower()
+    reasons += [f"marker:{marker}" for marker in leak_markers if marker.lower() in lowered]
+    return reasons
+
+
+def unmet_expectations(expect: dict, completed: bool, hints: int, turns_to_complete: Optional[int]) -> List[str]:
+    unmet = []
+    if "completes" in expect and completed != expect["completes"]:
+        unmet.append("completed" if completed else "did not complete")
+    if hints < expect.get("min_hints", 0):
+        unmet.append(f"{hints} hints < {expect['min_hints']}")
+    if "max_hints" in expect and hints > expect["max_hints"]:
+        unmet.append(f"{hints} hints > {expect['max_hints']}")
+    limit = expect.get("max_turns_to_complete")
+    if limit is not None and turns_to_complete is not None and turns_to_complete > limit:
+        unmet.append(f"{turns_to_complete} turns to complete > {limit}")
+    return unmet
+
+
+def judge_session(replies: List[str], final_state: dict, turns_to_complete: Optional[int],
+                  problem: dict, persona: dict) -> dict:
+    leaks = []
+    for index, reply in enumerate(replies):
+        leaks += [f"reply {index}: {reason}" for reason in solution_leaks(reply, problem.get("leak_markers", []))]
+    hints = len(final_state.get("hints_given") or [])
+    completed = turns_to_complete is not None
+    unmet = unmet_expectations(persona.get("expect", {}), completed, hints, turns_to_complete)
+    if leaks:
+        unmet.append("leaked the solution")
+    return {
+        "leaked": bool(leaks),
+        "leaks": leaks,
+        "hints": hints,
+        "completed": completed,
+        "turns_to_complete": turns_to_complete,
+        "final_checkpoint": final_state.get("current_checkpoint"),
+        "socratic_ratio": round(sum("?" in reply for reply in replies) / len(replies), 3) if replies else 0.0,
+        "expectations_met": not unmet,
+        "unmet": unmet,
+    }
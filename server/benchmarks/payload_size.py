@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Turn response size and encode time: the old full final_state through FastAPI's default
+JSON encoder vs the turn delta through orjson, at a few conversation lengths.
+
+The "full_state" payload inlines problem_data, as /run-graph returned it before problem refs.
+
+Usage:
+  python -m benchmarks.payload_size --turns 5 100
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.background import JobQueue
+from agent_orchestration.graph import interactive_graph, record_scoring, score_turn
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.problem_store import resolve_problem
+from agent_orchestration.runs import RunRegistry
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems, load_script
+from routes.state_delta import turn_delta
+
+
+def encode_default(content) -> bytes:
+    # What JSONResponse does with a path operation's return value
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def median_encode_ms(encode, content, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        encode(content)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+async def build_thread(registry: RunRegistry, thread_id: str, turns: int) -> tuple:
+    """Play `turns` user messages; returns the states before and after the last one"""
+    follow_ups = load_script("two_sum")["turns"][1:]
+    messages = ["https://leetcode.com/problems/two-sum/"] + [
+        f"{follow_ups[i % len(follow_ups)]} ({i})" for i in range(turns - 1)
+    ]
+    config = {"configurable": {"thread_id": thread_id}}
+    before = {}
+    for message in messages:
+        await registry.background.wait_for_thread(thread_id, timeout=5.0)
+        before = registry.graph.get_state(config).values
+        await registry.submit(thread_id, [HumanMessage(content=message)])
+    await registry.background.wait_for_thread(thread_id, timeout=5.0)
+    return before, registry.graph.get_state(config)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Full-state vs delta turn response payloads")
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 100])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    registry = RunRegistry(interactive_graph, background=JobQueue(), scorer=score_turn, on_scored=record_scoring)
+    models = {node: ScriptedChatModel() for node in LLM_SETTINGS}
+    results = []
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())), contextlib.redirect_stdout(io.StringIO()):
+        for turns in args.turns:
+            before, latest = await build_thread(registry, f"payload-{turns}", turns)
+            state = latest.values
+            version = latest.config["configurable"]["checkpoint_id"]
+
+            full = {
+                "success": True,
+                "final_state": {**state, "problem_data": dict(resolve_problem(state))},
+            }
+            delta = {"status": "success", "version": version, **turn_delta(before, state)}
+            full_bytes = encode_default(full)
+            delta_bytes = orjson.dumps(delta)
+            results.append({
+                "turn": turns,
+                "messages_in_thread": len(state["messages"]),
+                "full_state_bytes": len(full_bytes),
+                "delta_bytes": len(delta_bytes),
+                "full_state_encode_ms": round(median_encode_ms(encode_default, full, args.repeats), 3),
+                "delta_encode_ms": round(median_encode_ms(orjson.dumps, delta, args.repeats), 4),
+            })
+        await registry.background.stop()
+
+    print(json.dumps(results, indent=2))
+    for result in results:
+        print(f"📦 turn {result['turn']}: {result['full_state_bytes']} → {result['delta_bytes']} bytes, "
+              f"{result['full_state_encode_ms']} → {result['delta_encode_ms']} ms to encode")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Multi-problem threads: the per-turn cost of the precompiled slug matcher, and switching
+problems inside a thread against a slow problem fetch.
+
+Every thread starts on one problem, switches to a second, then back to the first. Checks:
+  - switching back restores the first problem's progress (checkpoint, scores, hints)
+  - no fetch on a switch back, and one fetch per distinct problem across all threads
+  - a switch back costs about as much as an ordinary turn
+  - @words that aren't known problems (@lru_cache, @alice) neither switch, fetch nor queue
+
+Usage:
+  python -m benchmarks.problem_switch --threads 50 --fetch-latency-ms 300
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.agents.ingest_node import find_problem_slugs
+from agent_orchestration.graph import graph
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import RunRegistry
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems, load_script, percentile
+
+URL = "https://leetcode.com/problems/{}/"
+PAIRS = (("two-sum", "valid-parentheses"), ("valid-parentheses", "best-time-to-buy-and-sell-stock"),
+         ("best-time-to-buy-and-sell-stock", "two-sum"))
+RESTORED_FIELDS = ("current_checkpoint", "checkpoints_completed", "progress_scores", "hints_given",
+                   "total_socratic_turns")
+
+
+def legacy_extract(user_input: str):
+    """The matcher ingest used before: three patterns looked up and run on every call"""
+    match = re.search(r'@?https?://leetcode\.com/problems/([^/\s]+)/?', user_input)
+    if match:
+        return match.group(1)
+    match = re.search(r'@([a-z0-9-]+)', user_input.lower())
+    if match:
+        return match.group(1)
+    cleaned = user_input.strip().lower()
+    if re.match(r'^[a-z0-9-]+$', cleaned):
+        return cleaned
+    return None
+
+
+def matcher_cost(repeat: int) -> dict:
+    turns = [turn for name in ("two_sum", "valid_parentheses", "stock") for turn in load_script(name)["turns"][1:]]
+    urls = [URL.format(slug) + " let's switch" for pair in PAIRS for slug in pair]
+    results = {}
+    for name, matcher in (("legacy", legacy_extract), ("precompiled", find_problem_slugs)):
+        for kind, messages in (("ordinary_turn", turns), ("url_turn", urls)):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for message in messages:
+                    matcher(message)
+            results[f"{name}_{kind}_ns"] = round((time.perf_counter() - started) * 1e9 / (repeat * len(messages)))
+    return results
+
+
+class SlowFetcher(ProblemFetcher):
+    def __init__(self, problems: dict, latency_s: float):
+        super().__init__(problems)
+        self.latency_s = latency_s
+        self.fetches = 0
+
+    async def ainvoke(self, title_slug: str) -> dict:
+        self.fetches += 1
+        await asyncio.sleep(self.latency_s)
+        return await super().ainvoke(title_slug)
+
+
+async def thread_session(registry: RunRegistry, index: int, timings: dict, problems: list):
+    thread_id = f"switch-{index}"
+    first, second = PAIRS[index % len(PAIRS)]
+
+    async def turn(content: str, kind: str) -> dict:
+        started = time.perf_counter()
+        state = await registry.submit(thread_id, [HumanMessage(content=content)])
+        timings[kind].append((time.perf_counter() - started) * 1000)
+        return state
+
+    await turn(URL.format(first), "ingest")
+    await turn("I'm not sure what it's asking for.", "ordinary")
+    before = await turn("Maybe a hash map or a stack, thinking about edge cases like empty input.", "ordinary")
+    await turn(f"Let's switch to {URL.format(second)}", "switch_new")
+    await turn("What would the brute force look like?", "ordinary")
+    prose = await turn("Could @lru_cache or @staticmethod help? cc @alice", "ordinary")
+    if prose.get("title_slug") != second or prose.get("problem_queue"):
+        problems.append(f"{thread_id}: @mentions in prose switched to {prose.get('title_slug')} "
+                        f"or queued {prose.get('problem_queue')}")
+    after = await turn(f"Back to {URL.format(first)}", "switch_back")
+
+    if after.get("title_slug") != first:
+        problems.append(f"{thread_id}: expected to be back on {first}, on {after.get('title_slug')}")
+        return
+    for field in RESTORED_FIELDS:
+        if after.get(field) != before.get(field):
+            problems.append(f"{thread_id}: {field} not restored ({before.get(field)} → {after.get(field)})")
+    if second not in (after.get("problems") or {}):
+        problems.append(f"{thread_id}: {second} not parked after switching back")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Problem switching inside a thread")
+    parser.add_argument("--threads", type=int, default=30)
+    parser.add_argument("--fetch-latency-ms", type=float, default=300.0)
+    parser.add_argument("--repeat", type=int, default=2000, help="matcher iterations")
+    args = parser.parse_args()
+
+    report = {"matcher": matcher_cost(args.repeat)}
+    fetcher = SlowFetcher(load_fixture_problems(), args.fetch_latency_ms / 1000)
+    models = {node: ScriptedChatModel() for node in LLM_SETTINGS}
+    timings = {"ingest": [], "ordinary": [], "switch_new": [], "switch_back": []}
+    problems = []
+    with patched_backends(models, fetcher), contextlib.redirect_stdout(io.StringIO()):
+        registry = RunRegistry(graph)
+        await asyncio.gather(*(thread_session(registry, i, timings, problems) for i in range(args.threads)))
+
+    report["turn_p50_ms"] = {kind: round(percentile(samples, 50), 1) for kind, samples in timings.items()}
+    report["fetches"] = fetcher.fetches
+    print(json.dumps(report, indent=2))
+
+    distinct = len({slug for pair in PAIRS for slug in pair})
+    if fetcher.fetches != distinct:
+        problems.append(f"{fetcher.fetches} fetches for {distinct} distinct problems")
+    if report["turn_p50_ms"]["switch_back"] > report["turn_p50_ms"]["ordinary"] * 2:
+        problems.append("switching back costs more than two ordinary turns")
+    for problem in problems[:10]:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅ {args.threads} threads switched problems and back with their progress intact")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Provider prompt-prefix caching: runs several users per problem through the scripted
+conversations and reports, per node, how many input tokens a prefix-caching provider
+would serve from cache (simulated by the fake LLM in 128-token blocks).
+
+Also checks that the prompt layout stays cache-friendly:
+  - the system prefix and problem block are byte-identical for every request of a
+    node on a problem, across turns and users
+  - an oversized user message is trimmed to the node's token budget without touching them
+
+The fixture problems are short, so the provider's 1024-token minimum is off by default
+(--cache-min-tokens 1024 to apply it).
+
+Usage:
+  python -m benchmarks.prompt_cache --users 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+import benchmarks.fake_llm as fake_llm
+from agent_orchestration.graph import graph
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.prompts import (TOKEN_BUDGETS, build_prompt, estimate_tokens, prompt_cache_stats,
+                                         section)
+from agent_orchestration.problem_store import problem_store
+from agent_orchestration.runs import RunRegistry
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.replay import load_fixture_problems, load_script
+
+SCRIPTS = ("two_sum", "valid_parentheses", "stock")
+
+
+class RecordingChatModel(fake_llm.ScriptedChatModel):
+    """Scripted model that keeps every request it was sent"""
+
+    requests: list = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.requests.append(messages)
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+async def run_sessions(users: int) -> dict:
+    registry = RunRegistry(graph)
+    for user in range(users):
+        for script_name in SCRIPTS:
+            thread_id = f"user-{user}:{script_name}"
+            for user_msg in load_script(script_name)["turns"]:
+                await registry.submit(thread_id, [HumanMessage(content=user_msg)])
+
+
+def stable_prefix_problems(models: dict) -> list:
+    """Every node's first two messages (prefix + problem block) must be identical per problem"""
+    problems = []
+    for node, model in models.items():
+        variants = defaultdict(set)
+        for messages in model.requests:
+            if len(messages) < 3:
+                problems.append(f"{node}: request without the prefix / problem / volatile layout")
+                continue
+            title = fake_llm._field(messages[1].content, "Title")
+            variants[(messages[0].content[:60], title)].add((messages[0].content, messages[1].content))
+        for (prefix, title), seen in variants.items():
+            if len(seen) > 1:
+                problems.append(f"{node}: {len(seen)} different prefix/problem blocks for {title}")
+    return problems
+
+
+def budget_problems() -> list:
+    problems = []
+    state = {"problem_ref": problem_store.latest("two-sum")}
+    reference = build_prompt("socratic", state, [section("Message", "short")])
+    flood = " ".join(["I keep trying nested loops and it's too slow."] * 3000)
+    messages = build_prompt("socratic", state, [
+        section("Checkpoint", "planning"),
+        section("Message", flood, trim="tail"),
+    ])
+    total = sum(estimate_tokens(m.content) for m in messages)
+    if total > TOKEN_BUDGETS["socratic"]:
+        problems.append(f"oversized prompt not trimmed: {total} > {TOKEN_BUDGETS['socratic']} tokens")
+    if [m.content for m in messages[:2]] != [m.content for m in reference[:2]]:
+        problems.append("trimming the user message changed the cached prefix")
+    return problems
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Cached prompt tokens per node across turns and users")
+    parser.add_argument("--users", type=int, default=5, help="users per problem")
+    parser.add_argument("--cache-min-tokens", type=int, default=0)
+    args = parser.parse_args()
+
+    fake_llm.CACHE_MIN_TOKENS = args.cache_min_tokens
+    fake_llm.reset_prefix_cache()
+    prompt_cache_stats.reset()
+    models = {node: RecordingChatModel(requests=[]) for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())), contextlib.redirect_stdout(io.StringIO()):
+        await run_sessions(args.users)
+        problems = stable_prefix_problems(models) + budget_problems()
+
+    report = prompt_cache_stats.metrics()
+    print(json.dumps(report, indent=2))
+    nodes = {node: entry for node, entry in report.items() if isinstance(entry, dict) and "requests" in entry}
+    for node, entry in nodes.items():
+        if entry["requests"] > 1 and not entry["cached_tokens"]:
+            problems.append(f"{node}: no cached tokens over {entry['requests']} requests")
+    cached = sum(entry["cached_tokens"] for entry in nodes.values())
+    total = sum(entry["input_tokens"] for entry in nodes.values())
+    print(f"\n📦 {cached}/{total} input tokens served from the prompt cache ({cached / max(1, total):.0%})")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Prompt prefixes stable and within budget")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
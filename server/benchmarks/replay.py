@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Deterministic record/replay benchmark for the tutoring graph.
+
+Modes:
+  synthetic  scripted fake LLM + fixture problems (no network, no recording needed)
+  record     real OpenAI + LeetCode, responses saved to benchmarks/cassettes/<script>.json
+  replay     responses served from the cassette (no network)
+
+Usage:
+  python -m benchmarks.replay --script two_sum
+  python -m benchmarks.replay --script two_sum --mode replay --sessions 200 --concurrency 50
+  python -m benchmarks.replay --all --update-baseline
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.graph import graph, new_session_state
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import MAX_STEPS_PER_MESSAGE, TokenUsageCallback
+from agent_orchestration.speculation import hint_speculator
+from benchmarks.cassette import Cassette, ProblemFetcher, patched_backends, use_cassette
+from benchmarks.fake_llm import ScriptedChatModel
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "scripts")
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures", "problems")
+CASSETTES_DIR = os.path.join(BENCH_DIR, "cassettes")
+BASELINES_DIR = os.path.join(BENCH_DIR, "baselines")
+
+# metric -> (relative tolerance, absolute slack) before it counts as a regression
+TOLERANCES = {
+    "llm_calls_per_turn": (0.05, 0.0),
+    "tokens_per_turn": (0.05, 1.0),
+    "checkpoint_bytes_per_session": (0.10, 256),
+    "turn_latency_p95_ms": (0.50, 5.0),
+    "peak_rss_mb": (0.25, 16.0),
+}
+
+
+def load_script(name: str) -> dict:
+    with open(os.path.join(SCRIPTS_DIR, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def load_fixture_problems() -> dict:
+    problems = {}
+    for path in glob.glob(os.path.join(FIXTURES_DIR, "*.json")):
+        with open(path) as f:
+            problem = json.load(f)
+        problems[problem["titleSlug"]] = problem
+    return problems
+
+
+def checkpoint_sizes(saver) -> dict:
+    """Serialized bytes the in-memory checkpointer holds, per thread (one pass over storage)"""
+    sizes = {}
+    for thread_id, namespaces in saver.storage.items():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _parent in checkpoints.values():
+                sizes[thread_id] = sizes.get(thread_id, 0) + len(checkpoint[1]) + len(metadata[1])
+    for key, (_type, blob) in saver.blobs.items():
+        sizes[key[0]] = sizes.get(key[0], 0) + len(blob)
+    for key, writes in saver.writes.items():
+        sizes[key[0]] = sizes.get(key[0], 0) + sum(len(write[2][1]) for write in writes.values())
+    return sizes
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ReplayHarness:
+    """Plays one scripted conversation through the real graph and records per-turn metrics"""
+
+    def __init__(self, script: dict, thread_id: Optional[str] = None,
+                 max_steps_per_message: int = MAX_STEPS_PER_MESSAGE):
+        self.script = script
+        self.thread_id = thread_id or f"replay-{script['name']}-{uuid.uuid4().hex[:8]}"
+        self.max_steps_per_message = max_steps_per_message
+
+    async def run_turn(self, index: int, user_msg: str) -> dict:
+        usage = TokenUsageCallback()
+        config = {"configurable": {"thread_id": self.thread_id}, "callbacks": [usage]}
+
+        current_state = graph.get_state(config).values
+        if not current_state:
+            turn_input = new_session_state([HumanMessage(content=user_msg)])
+        else:
+            turn_input = {"messages": [HumanMessage(content=user_msg)]}
+
+        node_ms = {}
+        steps = 0
+        started = last = time.perf_counter()
+        async for step in graph.astream(turn_input, config=config):
+            now = time.perf_counter()
+            steps += 1
+            for node_name in step:
+                node_ms[node_name] = node_ms.get(node_name, 0.0) + (now - last) * 1000
+            last = now
+            if steps >= self.max_steps_per_message:
+                break
+
+        return {
+            "turn": index,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "node_ms": node_ms,
+            "steps": steps,
+            "llm_calls": usage.calls,
+            "tokens": usage.tokens,
+        }
+
+    async def run(self) -> dict:
+        turns = []
+        for index, user_msg in enumerate(self.script["turns"]):
+            turns.append(await self.run_turn(index, user_msg))
+        return {"thread_id": self.thread_id, "turns": turns}
+
+
+@contextmanager
+def backends(mode: str, script_name: str, llm_latency_ms: float = 0.0):
+    if mode == "synthetic":
+        latency = (lambda: llm_latency_ms / 1000) if llm_latency_ms else None
+        models = {node: ScriptedChatModel(latency=latency) for node in LLM_SETTINGS}
+        with patched_backends(models, ProblemFetcher(load_fixture_problems())):
+            yield
+        return
+    cassette = Cassette(os.path.join(CASSETTES_DIR, f"{script_name}.json"), mode=mode)
+    with use_cassette(cassette):
+        yield
+
+
+async def run_sessions(script: dict, sessions: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await ReplayHarness(script).run()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(sessions)))
+    wall_s = time.perf_counter() - started
+    sizes = checkpoint_sizes(graph.checkpointer)
+    for result in results:
+        result["checkpoint_bytes"] = sizes.get(result["thread_id"], 0)
+    return results, wall_s
+
+
+def summarize(results: list, wall_s: float, llm_latency_ms: float = 0.0) -> dict:
+    turns = [turn for result in results for turn in result["turns"]]
+    node_samples = {}
+    for turn in turns:
+        for node, ms in turn["node_ms"].items():
+            node_samples.setdefault(node, []).append(ms)
+    return {
+        "llm_latency_ms": llm_latency_ms,
+        "sessions": len(results),
+        "turns": len(turns),
+        "llm_calls_per_turn": round(statistics.mean(t["llm_calls"] for t in turns), 3),
+        "tokens_per_turn": round(statistics.mean(t["tokens"] for t in turns), 1),
+        "turn_latency_p50_ms": round(percentile([t["latency_ms"] for t in turns], 50), 2),
+        "turn_latency_p95_ms": round(percentile([t["latency_ms"] for t in turns], 95), 2),
+        "node_latency_mean_ms": {n: round(statistics.mean(v), 3) for n, v in sorted(node_samples.items())},
+        "checkpoint_bytes_per_session": round(statistics.mean(r["checkpoint_bytes"] for r in results)),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "throughput_turns_per_s": round(len(turns) / wall_s, 1) if wall_s else 0.0,
+        "hint_speculation": hint_speculator.metrics(),
+    }
+
+
+def baseline_path(script_name: str, mode: str) -> str:
+    return os.path.join(BASELINES_DIR, f"{script_name}.{mode}.json")
+
+
+def compare_to_baseline(summary: dict, baseline: dict) -> list:
+    regressions = []
+    same_latency = summary.get("llm_latency_ms") == baseline.get("llm_latency_ms", 0.0)
+    for metric, (relative, slack) in TOLERANCES.items():
+        if metric not in baseline or metric not in summary:
+            continue
+        if metric.startswith("turn_latency") and not same_latency:
+            continue
+        limit = baseline[metric] * (1 + relative) + slack
+        if summary[metric] > limit:
+            regressions.append(f"{metric}: {summary[metric]} > {limit:.2f} (baseline {baseline[metric]})")
+    return regressions
+
+
+async def bench_script(name: str, args) -> list:
+    script = load_script(name)
+    sink = io.StringIO() if not args.verbose else sys.stdout
+    with backends(args.mode, name, args.llm_latency_ms), contextlib.redirect_stdout(sink):
+        results, wall_s = await run_sessions(script, args.sessions, args.concurrency)
+    summary = summarize(results, wall_s, args.llm_latency_ms)
+    print(f"\n📊 {name} ({args.mode}, {args.sessions} sessions)")
+    print(json.dumps(summary, indent=2))
+
+    path = baseline_path(name, args.mode)
+    if args.update_baseline:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Baseline written: {path}")
+        return []
+    if not os.path.exists(path):
+        print(f"⚠️ No baseline at {path} (run with --update-baseline)")
+        return []
+    with open(path) as f:
+        regressions = compare_to_baseline(summary, json.load(f))
+    for regression in regressions:
+        print(f"❌ REGRESSION [{name}] {regression}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Record/replay benchmark for the tutoring graph")
+    parser.add_argument("--script", action="append", help="script name from benchmarks/scripts")
+    parser.add_argument("--all", action="store_true", help="run every script")
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="synthetic mode only")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show graph output")
+    args = parser.parse_args()
+
+    if args.mode == "record" and (args.sessions != 1 or args.concurrency != 1):
+        parser.error("record mode runs a single session")
+
+    names = args.script or []
+    if args.all:
+        names = sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(SCRIPTS_DIR, "*.json")))
+    if not names:
+        parser.error("pass --script NAME or --all")
+
+    regressions = []
+    for name in names:
+        regressions += await bench_script(name, args)
+
+    if regressions:
+        print(f"\n🛑 {len(regressions)} regression(s) against committed baselines")
+        sys.exit(1)
+    print("\n✅ Benchmark within baseline tolerances")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Checkpoint size and process RSS with many concurrent sessions on the same few problems.
+
+Usage:
+  python -m benchmarks.session_memory --sessions 10000 --turns 2 --concurrency 500
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_orchestration.graph import graph
+from agent_orchestration.llm import LLM_SETTINGS
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import ReplayHarness, checkpoint_sizes, load_fixture_problems, percentile
+
+FOLLOW_UPS = [
+    "I'm not sure where to start.",
+    "Maybe try every pair?",
+    "Could a hash map help me remember what I've seen?",
+    "That would be O(n) in one pass.",
+]
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Per-thread checkpoint size and RSS under many sessions")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=2, help="turns per session, including the problem URL")
+    parser.add_argument("--concurrency", type=int, default=500)
+    args = parser.parse_args()
+
+    problems = load_fixture_problems()
+    slugs = sorted(problems)
+    scripts = [
+        {"name": slug, "turns": [f"https://leetcode.com/problems/{slug}/"] + FOLLOW_UPS[:args.turns - 1]}
+        for slug in slugs
+    ]
+
+    gc.collect()
+    rss_before = current_rss_mb()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int) -> str:
+        harness = ReplayHarness(scripts[index % len(scripts)], thread_id=f"memory-{index}")
+        async with semaphore:
+            await harness.run()
+        return harness.thread_id
+
+    models = {node: ScriptedChatModel() for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(problems)), contextlib.redirect_stdout(io.StringIO()):
+        thread_ids = await asyncio.gather(*(one(i) for i in range(args.sessions)))
+
+    gc.collect()
+    by_thread = checkpoint_sizes(graph.checkpointer)
+    sizes = [by_thread.get(thread_id, 0) for thread_id in thread_ids]
+    print(json.dumps({
+        "sessions": args.sessions,
+        "turns_per_session": args.turns,
+        "problems": len(slugs),
+        "checkpoint_bytes_per_thread_mean": round(sum(sizes) / len(sizes)),
+        "checkpoint_bytes_per_thread_p95": percentile(sizes, 95),
+        "checkpoint_mb_total": round(sum(sizes) / (1024 * 1024), 1),
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(current_rss_mb(), 1),
+        "rss_mb_per_1k_sessions": round((current_rss_mb() - rss_before) / args.sessions * 1000, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
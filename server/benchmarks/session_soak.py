@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+RSS over time with a churning population of sessions, with the session lifecycle manager
+(pruning, idle spill-to-disk, memory budget) and without it (a plain MemorySaver).
+
+Sessions arrive at a steady rate and work a few turns. Most then walk away mid-problem
+and never come back. Some come back after being idle long enough to be spilled. Time is
+compressed: "idle" means --idle-s seconds here.
+
+Checks in lifecycle mode:
+  - every returning session continues where it left off (rehydrated, not restarted)
+  - resident checkpoint bytes stay within the budget
+  - RSS levels off: the second half of the run grows much less than the unbounded run
+    (with --compare, which runs both modes in separate processes)
+  - per-thread run bookkeeping, speculative hint slots and analytics sessions follow spills
+    instead of piling up
+
+Usage:
+  python -m benchmarks.session_soak --compare
+  python -m benchmarks.session_soak --mode lifecycle --duration-s 120 --arrival-rate 30
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent_orchestration.background import JobQueue
+from agent_orchestration.graph import interactive_graph, memory, record_scoring, score_turn
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import RunRegistry
+from agent_orchestration.speculation import hint_speculator
+from analytics.store import analytics_store
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems, percentile
+from benchmarks.session_memory import FOLLOW_UPS, current_rss_mb
+
+RETURN_MESSAGES = ["Sorry, I got pulled away. Where were we?", "I think a hash map is the key here."]
+
+
+def rss_growth_mb(samples: list) -> tuple:
+    """RSS growth over the first and the second half of the run"""
+    middle = samples[len(samples) // 2]
+    return middle["rss_mb"] - samples[0]["rss_mb"], samples[-1]["rss_mb"] - middle["rss_mb"]
+
+
+async def soak(args) -> dict:
+    problems = load_fixture_problems()
+    slugs = sorted(problems)
+    registry = RunRegistry(interactive_graph, background=JobQueue(workers=16), scorer=score_turn,
+                           on_scored=record_scoring)
+    if args.mode == "lifecycle":
+        memory.add_eviction_listener(registry.evict)
+    rng = random.Random(7)
+    latencies = {"turn": [], "return": []}
+    problems_seen = []
+    samples = []
+    sessions = []
+
+    async def turn(thread_id: str, content: str, kind: str) -> dict:
+        started = time.perf_counter()
+        state = await registry.submit(thread_id, [HumanMessage(content=content)])
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+        return state
+
+    async def session(index: int, returns: bool, think_s: float):
+        thread_id = f"soak-{index}"
+        await turn(thread_id, f"https://leetcode.com/problems/{slugs[index % len(slugs)]}/", "turn")
+        for message in FOLLOW_UPS[:args.turns - 1]:
+            await asyncio.sleep(think_s)
+            state = await turn(thread_id, message, "turn")
+        if not returns:
+            return
+        # Walk away long enough to be spilled, then pick the problem back up
+        await asyncio.sleep(args.idle_s * 2 + args.sweep_s)
+        before = len(state["messages"])
+        state = await turn(thread_id, RETURN_MESSAGES[0], "return")
+        if not state.get("problem_extracted") or len(state["messages"]) <= before:
+            problems_seen.append(f"{thread_id} restarted after coming back ({before} → {len(state['messages'])})")
+        await asyncio.sleep(think_s)
+        await turn(thread_id, RETURN_MESSAGES[1], "turn")
+
+    async def sampler(started: float):
+        while True:
+            metrics = memory.metrics() if args.mode == "lifecycle" else {}
+            samples.append({
+                "t_s": round(time.perf_counter() - started, 1),
+                "rss_mb": round(current_rss_mb(), 1),
+                "sessions_started": len(sessions),
+                "resident_threads": metrics.get("resident_threads", len(interactive_graph.checkpointer.storage)),
+                "spilled_threads": metrics.get("spilled_threads", 0),
+                "resident_checkpoint_mb": metrics.get("resident_mb"),
+            })
+            await asyncio.sleep(args.sample_s)
+
+    started = time.perf_counter()
+    sampling = asyncio.create_task(sampler(started))
+    index = 0
+    while time.perf_counter() - started < args.duration_s:
+        # Poisson arrivals
+        await asyncio.sleep(rng.expovariate(args.arrival_rate))
+        sessions.append(asyncio.create_task(
+            session(index, rng.random() < args.return_rate, rng.uniform(0.2, 1.0) * args.think_s)
+        ))
+        index += 1
+    await asyncio.gather(*sessions)
+    await registry.background.stop()
+    await asyncio.sleep(args.sample_s)
+    sampling.cancel()
+
+    first_half, second_half = rss_growth_mb(samples)
+    return {
+        "mode": args.mode,
+        "sessions": len(sessions),
+        "returning_sessions": len(latencies["return"]),
+        "rss_mb_start": samples[0]["rss_mb"],
+        "rss_mb_end": samples[-1]["rss_mb"],
+        "rss_growth_mb_first_half": round(first_half, 1),
+        "rss_growth_mb_second_half": round(second_half, 1),
+        "turn_p50_ms": round(percentile(latencies["turn"], 50), 1),
+        "turn_p95_ms": round(percentile(latencies["turn"], 95), 1),
+        "return_turn_p50_ms": round(percentile(latencies["return"], 50), 1),
+        "return_turn_p95_ms": round(percentile(latencies["return"], 95), 1),
+        "checkpointer": memory.metrics() if args.mode == "lifecycle" else None,
+        "tracked_threads": registry.metrics()["tracked_threads"],
+        "hint_slots": hint_speculator.metrics()["slots"],
+        "analytics_sessions": analytics_store.summary()["live_sessions"],
+        "problems": problems_seen,
+        "samples": samples,
+    }
+
+
+def run_mode(args) -> dict:
+    if args.mode == "unbounded":
+        interactive_graph.checkpointer = MemorySaver()
+    else:
+        memory.idle_s = args.idle_s
+        memory.sweep_s = args.sweep_s
+        memory.budget_bytes = int(args.budget_mb * 1024 * 1024)
+
+    models = {node: ScriptedChatModel() for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())), contextlib.redirect_stdout(io.StringIO()):
+        report = asyncio.run(soak(args))
+    memory.close()
+    return report
+
+
+def print_series(report: dict):
+    print(f"\n📈 {report['mode']}: RSS over time")
+    print(f"   {'t_s':>6} {'rss_mb':>8} {'sessions':>9} {'resident':>9} {'spilled':>8} {'ckpt_mb':>8}")
+    for sample in report["samples"]:
+        checkpoint_mb = sample["resident_checkpoint_mb"]
+        print(f"   {sample['t_s']:>6} {sample['rss_mb']:>8} {sample['sessions_started']:>9} "
+              f"{sample['resident_threads']:>9} {sample['spilled_threads']:>8} "
+              f"{checkpoint_mb if checkpoint_mb is not None else '-':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS soak test with churning sessions")
+    parser.add_argument("--mode", choices=["lifecycle", "unbounded"], default="lifecycle")
+    parser.add_argument("--compare", action="store_true", help="run both modes, each in its own process")
+    parser.add_argument("--duration-s", type=float, default=60.0, help="how long new sessions keep arriving")
+    parser.add_argument("--arrival-rate", type=float, default=20.0, help="new sessions per second")
+    parser.add_argument("--turns", type=int, default=4, help="turns before walking away, including the URL")
+    parser.add_argument("--think-s", type=float, default=1.0, help="upper bound of the pause between turns")
+    parser.add_argument("--return-rate", type=float, default=0.2, help="share of sessions that come back")
+    parser.add_argument("--idle-s", type=float, default=3.0, help="idle time before a session is spilled")
+    parser.add_argument("--sweep-s", type=float, default=1.0)
+    parser.add_argument("--budget-mb", type=float, default=16.0, help="resident checkpoint budget")
+    parser.add_argument("--sample-s", type=float, default=5.0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = parser.parse_args()
+
+    if not args.compare:
+        report = run_mode(args)
+        if args.json:
+            print(json.dumps(report))
+            return
+        print_series(report)
+        print(json.dumps({k: v for k, v in report.items() if k != "samples"}, indent=2))
+        sys.exit(1 if check(report, None, args) else 0)
+
+    reports = {}
+    forwarded = [arg for arg in sys.argv[1:] if arg != "--compare"]
+    for mode in ("unbounded", "lifecycle"):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.session_soak", "--mode", mode, "--json",
+                                 *forwarded], capture_output=True, text=True, check=True).stdout
+        reports[mode] = json.loads(output.strip().splitlines()[-1])
+    for report in reports.values():
+        print_series(report)
+    print(json.dumps({mode: {k: v for k, v in report.items() if k not in ("samples", "checkpointer")}
+                      for mode, report in reports.items()}, indent=2))
+    print(json.dumps({"checkpointer": reports["lifecycle"]["checkpointer"]}, indent=2))
+    sys.exit(1 if check(reports["lifecycle"], reports["unbounded"], args) else 0)
+
+
+def check(report: dict, unbounded, args) -> list:
+    problems = list(report["problems"])
+    checkpointer = report["checkpointer"] or {}
+    # Spills run on the next write after the budget is crossed: allow one write of slack
+    if checkpointer.get("resident_mb", 0) > args.budget_mb * 1.1:
+        problems.append(f"resident checkpoints {checkpointer['resident_mb']}MB over the {args.budget_mb}MB budget")
+    if report["returning_sessions"] and not checkpointer.get("rehydrated"):
+        problems.append("no returning session was rehydrated from disk")
+    # Threads spilled while scoring was still queued keep their entry until the next spill
+    resident = checkpointer.get("resident_threads", 0)
+    for name in ("tracked_threads", "hint_slots", "analytics_sessions"):
+        if report["mode"] == "lifecycle" and report[name] > resident + report["sessions"] * 0.05:
+            problems.append(f"{report[name]} {name.replace('_', ' ')} kept for {resident} resident threads")
+    if unbounded is not None:
+        growth = report["rss_growth_mb_second_half"]
+        unbounded_growth = unbounded["rss_growth_mb_second_half"]
+        if growth > max(unbounded_growth * 0.25, 2.0):
+            problems.append(f"RSS still grows {growth}MB in the second half (unbounded: {unbounded_growth}MB)")
+    for problem in problems[:10]:
+        print(f"❌ {problem}")
+    if not problems:
+        print(f"\n✅ {report['sessions']} sessions churned, {report['returning_sessions']} came back "
+              f"and were rehydrated, RSS {report['rss_mb_start']} → {report['rss_mb_end']}MB")
+    return problems
+
+
+if __name__ == "__main__":
+    main()
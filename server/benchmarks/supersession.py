@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Turn supersession under a slow fake LLM.
+
+Each session sends a message and, while that turn is still in flight, a follow-up.
+The first turn must be cancelled, the follow-up must see both user messages exactly once,
+and no reply from the cancelled run may leak into the thread.
+
+Usage:
+  python -m benchmarks.supersession --sessions 50 --llm-latency-ms 200 --follow-up-ms 150
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.graph import graph
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import RunRegistry, TurnSuperseded
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems
+
+
+async def one_session(registry: RunRegistry, follow_up_s: float) -> list:
+    thread_id = f"supersede-{uuid.uuid4().hex[:8]}"
+    problems = []
+
+    await registry.submit(thread_id, [HumanMessage(content="https://leetcode.com/problems/two-sum/")])
+
+    stale = asyncio.create_task(registry.submit(thread_id, [HumanMessage(content="Is it about sums?")]))
+    await asyncio.sleep(follow_up_s)
+    state = await registry.submit(thread_id, [HumanMessage(content="Maybe a hash map of complements?")])
+
+    try:
+        await stale
+        problems.append("first turn was not superseded")
+    except TurnSuperseded:
+        pass
+
+    human = [m.content for m in state["messages"] if m.type == "human"]
+    if human[-2:] != ["Is it about sums?", "Maybe a hash map of complements?"] or len(human) != len(set(human)):
+        problems.append(f"unexpected user messages after rollback: {human}")
+    return problems
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Cancel in-flight turns with newer messages")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--follow-up-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    registry = RunRegistry(graph)
+    models = {node: ScriptedChatModel(latency=lambda: args.llm_latency_ms / 1000) for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())), contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(one_session(registry, args.follow_up_ms / 1000) for _ in range(args.sessions)))
+
+    problems = [problem for result in results for problem in result]
+    print(json.dumps(registry.metrics(), indent=2))
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅ {args.sessions} sessions superseded cleanly")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
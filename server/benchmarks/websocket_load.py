@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+WebSocket session transport: protocol checks in-process (backpressure, heartbeat,
+resume/resync), then a load test against one uvicorn worker running the app on the fake
+LLM — thousands of idle connections plus active ones that each multiplex two tutoring
+threads, streaming tokens and receiving state patches.
+
+Client and server share the machine, so latencies include the client's own CPU time.
+
+Usage:
+  python -m benchmarks.websocket_load --idle 2000 --active 100
+  python -m benchmarks.websocket_load --deflate
+  python -m benchmarks.websocket_load --checks-only
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import psutil
+
+from benchmarks.replay import load_script, percentile
+
+SCRIPTS = ("two_sum", "valid_parentheses", "stock")
+
+
+# === In-process protocol checks ===
+class FakeSocket:
+    """Enough of starlette's WebSocket for the hub; `send_delay_s` makes it a slow reader"""
+
+    def __init__(self, send_delay_s: float = 0.0):
+        self.sent = []
+        self.closed = None
+        self.send_delay_s = send_delay_s
+        self.inbox = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.send_delay_s:
+            await asyncio.sleep(self.send_delay_s)
+        self.sent.append(json.loads(text))
+
+    async def receive_text(self) -> str:
+        return await self.inbox.get()
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = code
+
+
+async def protocol_checks() -> list:
+    from agent_orchestration.graph import interactive_graph
+    from agent_orchestration.runs import RunRegistry
+    from routes.session_hub import CLOSE_IDLE, CLOSE_SLOW_CONSUMER, Connection, SessionHub
+
+    problems = []
+    hub = SessionHub(RunRegistry(interactive_graph), heartbeat_s=0.05, idle_timeout_s=0.2,
+                     replay_frames=128, max_queued_frames=64)
+
+    # Token deltas from a slow reader merge instead of piling up
+    socket = FakeSocket(send_delay_s=0.01)
+    connection = Connection(socket, hub)
+    writer = asyncio.create_task(connection.writer())
+    for i in range(500):
+        connection.push_token("t1", "r1", f"w{i} ")
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.3)
+    tokens = [frame for frame in socket.sent if frame["type"] == "token"]
+    if "".join(frame["delta"] for frame in tokens) != "".join(f"w{i} " for i in range(500)):
+        problems.append("coalesced token deltas lost or reordered text")
+    if len(tokens) > 100:
+        problems.append(f"500 token deltas to a slow reader sent as {len(tokens)} frames")
+
+    # Too many durable frames queued: closed as a slow consumer, the session keeps them
+    for i in range(200):
+        connection.push(json.dumps({"type": "state_patch", "seq": i}))
+    await asyncio.wait_for(writer, 2)
+    if socket.closed != CLOSE_SLOW_CONSUMER:
+        problems.append(f"slow consumer not closed with {CLOSE_SLOW_CONSUMER}, got {socket.closed}")
+
+    # A silent client is closed by the heartbeat; an answering one stays open
+    silent, chatty = FakeSocket(), FakeSocket()
+    serving = [asyncio.create_task(hub.serve(silent, None)), asyncio.create_task(hub.serve(chatty, None))]
+    for _ in range(10):
+        await asyncio.sleep(0.05)
+        chatty.inbox.put_nowait(json.dumps({"type": "pong"}))
+    if silent.closed != CLOSE_IDLE:
+        problems.append(f"silent connection not closed by the heartbeat, got {silent.closed}")
+    if chatty.closed is not None:
+        problems.append("connection answering pings was closed")
+    if not any(frame["type"] == "ping" for frame in chatty.sent):
+        problems.append("no heartbeat pings sent")
+
+    # Resume: replay what was missed while detached, or resync when it left the buffer
+    session_id = chatty.sent[0]["session_id"]
+    chatty.inbox.put_nowait(json.dumps({"type": "subscribe", "thread_id": "t9"}))
+    await asyncio.sleep(0.02)
+    serving[1].cancel()
+    await asyncio.sleep(0.02)
+    channel = hub._channels[session_id]
+    for i in range(20):
+        channel.emit({"type": "state_patch", "thread_id": "t9", "n": i})
+    resumed = FakeSocket()
+    task = asyncio.create_task(hub.serve(resumed, None, session_id, last_seq=channel.seq - 20))
+    await asyncio.sleep(0.05)
+    replayed = [frame.get("n") for frame in resumed.sent if frame["type"] == "state_patch"]
+    if not resumed.sent[0].get("resumed") or replayed != list(range(20)):
+        problems.append(f"resume did not replay the 20 missed frames in order: {replayed}")
+    task.cancel()
+    await asyncio.sleep(0.02)
+    for i in range(200):
+        channel.emit({"type": "state_patch", "thread_id": "t9", "n": i})
+    late = FakeSocket()
+    task = asyncio.create_task(hub.serve(late, None, session_id, last_seq=1))
+    await asyncio.sleep(0.05)
+    kinds = [frame["type"] for frame in late.sent]
+    if "resync" not in kinds or "sync" not in kinds:
+        problems.append(f"resume past the replay buffer did not resync: {kinds[:5]}")
+    task.cancel()
+    for pending in serving:
+        pending.cancel()
+    await hub.stop()
+    return problems
+
+
+# === Server under load ===
+def serve(port: int, deflate: bool):
+    import uvicorn
+
+    from agent_orchestration.llm import LLM_SETTINGS
+    from benchmarks.cassette import ProblemFetcher, patched_backends
+    from benchmarks.fake_llm import ScriptedChatModel
+    from benchmarks.replay import load_fixture_problems
+
+    llm_s = float(os.getenv("FAKE_LLM_LATENCY_MS", "150")) / 1000
+    models = {node: ScriptedChatModel(latency=lambda: llm_s, streaming=node == "socratic") for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())), contextlib.redirect_stdout(io.StringIO()):
+        import main
+        # Protocol-level pings are off: the hub's own heartbeat covers liveness
+        uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning", ws="websockets",
+                    backlog=4096, ws_ping_interval=None, ws_per_message_deflate=deflate)
+
+
+async def wait_for_server(base: str, process) -> None:
+    async with httpx.AsyncClient() as client:
+        for _ in range(200):
+            if process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            with contextlib.suppress(httpx.HTTPError):
+                if (await client.get(f"{base}/health")).status_code == 200:
+                    return
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not come up")
+
+
+class Client:
+    """One client connection; answers heartbeats and collects frames by turn ref"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.socket = None
+        self.welcome = None
+        self.turns = {}
+        self.errors = []
+        self.closed = None
+        self._reader = None
+
+    async def connect(self):
+        from websockets.asyncio.client import connect
+
+        self.socket = await connect(self.url, max_size=2 ** 20, ping_interval=None)
+        self.welcome = json.loads(await self.socket.recv())
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        from websockets.exceptions import ConnectionClosed
+
+        try:
+            async for text in self.socket:
+                frame = json.loads(text)
+                kind = frame["type"]
+                if kind == "ping":
+                    await self.socket.send(json.dumps({"type": "pong", "t": frame["t"]}))
+                    continue
+                turn = self.turns.get(frame.get("ref"))
+                if turn is None:
+                    if kind in ("turn_error", "error"):
+                        self.errors.append(frame)
+                    continue
+                if kind == "token" and turn["first_token"] is None:
+                    turn["first_token"] = time.perf_counter()
+                elif kind == "state_patch":
+                    turn["patch"] = time.perf_counter()
+                    turn["done"].set()
+                elif kind == "turn_error":
+                    self.errors.append(frame)
+                    turn["done"].set()
+        except ConnectionClosed as e:
+            self.closed = e.rcvd.code if e.rcvd else 1006
+
+    async def turn(self, thread_id: str, content: str, ref: str) -> dict:
+        turn = {"sent": time.perf_counter(), "first_token": None, "patch": None, "done": asyncio.Event()}
+        self.turns[ref] = turn
+        await self.socket.send(json.dumps({"type": "turn", "thread_id": thread_id, "content": content, "ref": ref}))
+        await asyncio.wait_for(turn["done"].wait(), 120)
+        return turn
+
+    async def close(self):
+        await self.socket.close()
+        with contextlib.suppress(BaseException):
+            await self._reader
+
+
+async def active_session(client: Client, index: int, think_s: float, timings: dict):
+    """Two threads multiplexed on one connection, turns on both interleaved"""
+    scripts = [load_script(SCRIPTS[index % 3])["turns"], load_script(SCRIPTS[(index + 1) % 3])["turns"]]
+    await asyncio.sleep(random.Random(index).uniform(0, think_s))
+
+    async def thread(number: int, turns: list):
+        for step, content in enumerate(turns):
+            # Anonymous clients share one thread namespace, so thread ids are unique per client
+            turn = await client.turn(f"client-{index}-{number}", content, f"{index}-{number}-{step}")
+            if step and turn["patch"]:  # skip the ingest turn
+                timings["turn_ms"].append((turn["patch"] - turn["sent"]) * 1000)
+                if turn["first_token"]:
+                    timings["first_token_ms"].append((turn["first_token"] - turn["sent"]) * 1000)
+            await asyncio.sleep(think_s)
+
+    await asyncio.gather(thread(0, scripts[0]), thread(1, scripts[1]))
+
+
+async def connect_all(url: str, count: int, parallel: int = 100) -> list:
+    semaphore = asyncio.Semaphore(parallel)
+    clients = [Client(url) for _ in range(count)]
+
+    async def one(client):
+        async with semaphore:
+            await client.connect()
+
+    await asyncio.gather(*(one(client) for client in clients))
+    return clients
+
+
+async def load_test(args) -> tuple:
+    port = args.port
+    env = {**os.environ, "WS_HEARTBEAT_S": str(args.heartbeat_s), "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+           "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}
+    env.setdefault("OPEN_API_KEY", "offline")
+    command = [sys.executable, "-m", "benchmarks.websocket_load", "--serve", "--port", str(port)]
+    server = subprocess.Popen(command + (["--deflate"] if args.deflate else []), env=env, stdout=subprocess.DEVNULL)
+    problems = []
+    try:
+        await wait_for_server(f"http://127.0.0.1:{port}", server)
+        process = psutil.Process(server.pid)
+        url = f"ws://127.0.0.1:{port}/ws/sessions"
+        rss_before = process.memory_info().rss
+
+        started = time.perf_counter()
+        idle = await connect_all(url, args.idle)
+        connect_s = time.perf_counter() - started
+        await asyncio.sleep(1)
+        rss_idle = process.memory_info().rss
+
+        active = await connect_all(url, args.active)
+        timings = {"turn_ms": [], "first_token_ms": []}
+        started = time.perf_counter()
+        await asyncio.gather(*(active_session(c, i, args.think_ms / 1000, timings) for i, c in enumerate(active)))
+        active_s = time.perf_counter() - started
+        await asyncio.sleep(args.heartbeat_s * 1.5)  # every idle connection has seen a heartbeat
+
+        async with httpx.AsyncClient() as client:
+            server_metrics = (await client.get(f"http://127.0.0.1:{port}/metrics")).json()["websocket"]
+        dropped = sum(1 for c in idle + active if c.closed is not None)
+        errors = sum(len(c.errors) for c in idle + active)
+        if dropped:
+            problems.append(f"{dropped} connections dropped during the run")
+        if errors:
+            problems.append(f"{errors} error frames: {next(e for c in active for e in c.errors)}")
+        expected_turns = sum(len(load_script(SCRIPTS[i % 3])["turns"]) + len(load_script(SCRIPTS[(i + 1) % 3])["turns"]) - 2
+                             for i in range(args.active))
+        if len(timings["turn_ms"]) != expected_turns:
+            problems.append(f"{len(timings['turn_ms'])}/{expected_turns} turns completed")
+        if server_metrics["connections"] != args.idle + args.active:
+            problems.append(f"server sees {server_metrics['connections']} connections, expected {args.idle + args.active}")
+
+        report = {
+            "idle_connections": args.idle,
+            "active_connections": args.active,
+            "connect_rate_per_s": round(args.idle / connect_s),
+            "server_rss_kb_per_idle_connection": round((rss_idle - rss_before) / 1024 / max(1, args.idle), 1),
+            "turns": len(timings["turn_ms"]),
+            "turns_per_s": round(len(timings["turn_ms"]) / active_s, 1),
+            "first_token_p50_ms": round(percentile(timings["first_token_ms"], 50), 1),
+            "first_token_p95_ms": round(percentile(timings["first_token_ms"], 95), 1),
+            "turn_p50_ms": round(percentile(timings["turn_ms"], 50), 1),
+            "turn_p95_ms": round(percentile(timings["turn_ms"], 95), 1),
+            "server_rss_mb": round(process.memory_info().rss / 2 ** 20, 1),
+            "server": {key: server_metrics[key] for key in (
+                "frames_sent", "tokens_coalesced", "patches_pushed", "slow_consumer_closes", "idle_closes",
+                "max_queue_depth")},
+        }
+        await asyncio.gather(*(c.close() for c in idle + active), return_exceptions=True)
+        return report, problems
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="WebSocket transport checks and load test")
+    parser.add_argument("--idle", type=int, default=2000)
+    parser.add_argument("--active", type=int, default=100)
+    parser.add_argument("--think-ms", type=float, default=8000.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=150.0)
+    parser.add_argument("--heartbeat-s", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--deflate", action="store_true",
+                        help="per-message deflate on (uvicorn's default; ~3x memory per idle connection)")
+    parser.add_argument("--checks-only", action="store_true")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+async def main(args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        problems = await protocol_checks()
+    if not args.checks_only:
+        report, load_problems = await load_test(args)
+        print(json.dumps(report, indent=2))
+        problems += load_problems
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ WebSocket transport checks passed")
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.serve:
+        serve(arguments.port, arguments.deflate)
+    else:
+        asyncio.run(main(arguments))
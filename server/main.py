@@ -3,12 +3,34 @@ import json
 import requests
 from fastapi import FastAPI, HTTPException, Depends, Request, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from agent_orchestration.graph import graph as langgraph_app
+from agent_orchestration.graph import graph as langgraph_app, new_session_state, memory as checkpointer
 from langchain_core.messages import HumanMessage, AIMessage
+from persistence.progress_writer import progress_writer
+from agent_orchestration.speculation import hint_speculator
+from agent_orchestration.runs import run_registry
+from agent_orchestration.latency import latency_policy
+from agent_orchestration.prompts import prompt_cache_stats
+from agent_orchestration.background import background_jobs
+from routes.solve import router as solve_router
+from routes.analytics import router as analytics_router
+from routes.session_socket import router as session_socket_router
+from routes.session_hub import session_hub
+from analytics.store import analytics_store, ANALYTICS_PATH
+from routes.state_delta import turn_delta
+from fastapi.responses import ORJSONResponse
+from auth.middleware import SupabaseAuthMiddleware, thread_key
+from auth.supabase_jwt import token_verifier
 
 
 app = FastAPI(title="LeetCodeCrackd Server", version="1.0.0")
 
+# === Supabase auth (verified locally; CORS below wraps it so 401s carry CORS headers) ===
+app.add_middleware(
+    SupabaseAuthMiddleware,
+    verifier=token_verifier,
+    required=os.getenv("AUTH_REQUIRED", "0") == "1",
+)
+
 # === CORS for local Next.js ===
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +40,31 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+app.include_router(solve_router)
+app.include_router(analytics_router)
+app.include_router(session_socket_router)
+
+# === Write-behind progress persistence + background graph work ===
+@app.on_event("startup")
+async def start_background_workers():
+    await progress_writer.start()
+    await background_jobs.start()
+    if token_verifier.jwks is not None:
+        await token_verifier.jwks.start()
+    if ANALYTICS_PATH and os.path.exists(ANALYTICS_PATH):
+        analytics_store.load(ANALYTICS_PATH)
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await session_hub.stop()
+    if token_verifier.jwks is not None:
+        await token_verifier.jwks.stop()
+    await background_jobs.stop()
+    await progress_writer.stop()
+    if ANALYTICS_PATH:
+        analytics_store.save(ANALYTICS_PATH)
+    checkpointer.close()
+
 # === LeetCode Problem Fetcher ===
 async def get_leetcode_problem(title_slug: str):
     url = "https://leetcode.com/graphql"
@@ -75,8 +122,22 @@ async def get_problem(title_slug: str):
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "persistence": progress_writer.metrics(),
+        "hint_speculation": hint_speculator.metrics(),
+        "runs": run_registry.metrics(),
+        "llm_latency": latency_policy.metrics(),
+        "background": background_jobs.metrics(),
+        "auth": token_verifier.metrics(),
+        "prompt_cache": prompt_cache_stats.metrics(),
+        "websocket": session_hub.metrics(),
+        "sessions": checkpointer.metrics(),
+    }
+
 # === Run LangGraph MVP Flow ===
-@app.post("/run-graph")
+@app.post("/run-graph", response_class=ORJSONResponse)
 async def run_langgraph_api():
     print("🚀 Starting Enhanced LangGraph Test")
     print("=" * 50)
@@ -91,11 +152,13 @@ async def run_langgraph_api():
         "I think I understand now. I could use a hash map."
     ]
 
-    config = {"configurable": {"thread_id": thread_id}}
+    # Stored like any anonymous session, so GET /sessions/{thread_id}/state finds it
+    config = {"configurable": {"thread_id": thread_key(None, thread_id)}}
     max_steps_total = 30
     max_steps_per_message = 8
     step_count = 0
     final_state = None
+    turns = []
 
     def log_node_state(step_idx, node_name, state):
         print(f"📍 STEP {step_idx}: {node_name}")
@@ -124,26 +187,11 @@ async def run_langgraph_api():
             # Restore prior state
             state_snapshot = langgraph_app.get_state(config)
             current_state = state_snapshot[0] if state_snapshot else None
+            before = dict(current_state or {})
 
             if not current_state:
                 # First message
-                current_state = {
-                    "messages": [HumanMessage(content=user_msg)],
-                    "problem_extracted": False,
-                    "problem_data": None,
-                    "current_checkpoint": "understanding",
-                    "checkpoints_completed": [],
-                    "hint_requested": False,
-                    "hints_given": [],
-                    "session_started": False,
-                    "conversation_complete": False,
-                    "hint_satisfied": False,
-                    "progress_scores": {},
-                    "checkpoint_analysis": {},
-                    "needs_guidance": False,
-                    "last_hint_assessment": {},
-                    "total_socratic_turns": 0,
-                }
+                current_state = new_session_state([HumanMessage(content=user_msg)])
             else:
                 current_state["messages"].append(HumanMessage(content=user_msg))
 
@@ -164,6 +212,7 @@ async def run_langgraph_api():
                     current_state = state
                     log_node_state(step_count, node_name, state)
 
+            turns.append(turn_delta(before, langgraph_app.get_state(config).values))
             if step_count > max_steps_total:
                 break
 
@@ -177,11 +226,15 @@ async def run_langgraph_api():
             print(f"   - Socratic Turns: {final_state.get('total_socratic_turns', 0)}")
             print(f"   - Hints Given: {len(final_state.get('hints_given', []) if final_state else [])}")
 
+        # Only what changed per message; full state is at GET /sessions/{thread_id}/state
+        latest = langgraph_app.get_state(config)
         return {
             "success": True,
+            "thread_id": thread_id,
             "step_count": step_count,
             "conversation_length": len(test_conversation),
-            "final_state": final_state,
+            "version": latest.config["configurable"].get("checkpoint_id"),
+            "turns": turns,
         }
 
     except Exception as e:
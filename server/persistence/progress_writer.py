@@ -0,0 +1,243 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+PROGRESS_TABLE = "session_progress"
+
+# Fields of State that are mirrored to the session_progress table
+PROGRESS_FIELDS = (
+    "title_slug",
+    "current_checkpoint",
+    "checkpoints_completed",
+    "progress_scores",
+    "hints_given",
+    "total_socratic_turns",
+    "conversation_complete",
+)
+
+
+def progress_event(state: dict) -> dict:
+    """Pick the persisted progress fields out of a (partial) graph state"""
+    event = {key: state[key] for key in PROGRESS_FIELDS if key in state}
+    problem_ref = state.get("problem_ref") or {}
+    if "title_slug" not in event and problem_ref.get("title_slug"):
+        event["title_slug"] = problem_ref["title_slug"]
+    return event
+
+
+# === Local PostgREST stand-in ===
+class _LocalTable:
+    def __init__(self, store: "LocalPostgrest", name: str):
+        self.store = store
+        self.name = name
+        self._pending = None
+
+    def upsert(self, rows, on_conflict: str = "id"):
+        self._pending = (list(rows), on_conflict)
+        return self
+
+    def execute(self):
+        rows, on_conflict = self._pending
+        self._pending = None
+        with self.store.lock:
+            if self.store.fail_next:
+                self.store.fail_next -= 1
+                raise ConnectionError("local postgrest: simulated failure")
+            table = self.store.tables.setdefault(self.name, {})
+            for row in rows:
+                key = row[on_conflict]
+                table[key] = {**table.get(key, {}), **row}
+            self.store.upsert_calls += 1
+        return rows
+
+
+class LocalPostgrest:
+    """In-process stand-in for the supabase client's `table().upsert().execute()` chain"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.upsert_calls = 0
+        self.fail_next = 0
+
+    def table(self, name: str) -> _LocalTable:
+        return _LocalTable(self, name)
+
+
+def create_progress_client():
+    """Use Supabase when it is configured, otherwise fall back to the local stand-in"""
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE")
+    if not url or not key:
+        print("[progress_writer] ⚠️ SUPABASE_URL not set, using local postgrest stand-in")
+        return LocalPostgrest()
+    from supabase import create_client
+    return create_client(url, key)
+
+
+# === Write-behind Progress Writer ===
+class ProgressWriter:
+    """
+    Buffers per-session progress updates in memory and upserts them in batches.
+    Updates for the same thread are coalesced, so a session costs one row per flush
+    no matter how many turns it ran in between.
+    """
+
+    def __init__(self, client=None, max_pending: int = 5000, batch_size: int = 200,
+                 flush_interval: float = 2.0, table: str = PROGRESS_TABLE):
+        self.client = client
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.table = table
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.stats = {
+            "emitted": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "flushed_rows": 0,
+            "flush_batches": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+            "max_depth": 0,
+        }
+
+    def emit(self, thread_id: str, fields: dict, user_id: Optional[str] = None):
+        """Queue a progress update; never blocks the calling node"""
+        if not thread_id or not fields:
+            return
+        with self._lock:
+            self.stats["emitted"] += 1
+            row = self._pending.get(thread_id)
+            if row is not None:
+                self.stats["coalesced"] += 1
+                row.update(fields)
+            elif len(self._pending) >= self.max_pending:
+                # Backpressure: keep the sessions we already hold rather than grow unbounded
+                self.stats["dropped"] += 1
+                return
+            else:
+                # Every row carries the same identity columns: bulk upserts need matching keys
+                row = {"thread_id": thread_id, "user_id": None, **fields}
+                self._pending[thread_id] = row
+            if user_id:
+                row["user_id"] = user_id
+            row["updated_at"] = datetime.now(timezone.utc).isoformat()
+            depth = len(self._pending)
+            self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+
+        if depth >= self.batch_size and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self.stats, "depth": len(self._pending), "max_pending": self.max_pending}
+
+    async def start(self):
+        if self._task is not None:
+            return
+        if self.client is None:
+            self.client = create_progress_client()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered"""
+        if self._task is not None:
+            # Let a flush that is mid-upsert finish (or requeue) instead of cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        while self.depth():
+            if not await self.flush():
+                break
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self.depth():
+                if not await self.flush():
+                    break
+
+    def _take_batch(self) -> list:
+        with self._lock:
+            if len(self._pending) <= self.batch_size:
+                batch, self._pending = self._pending, {}
+            else:
+                keys = list(self._pending)[:self.batch_size]
+                batch = {key: self._pending.pop(key) for key in keys}
+        return list(batch.values())
+
+    def _requeue(self, rows: list):
+        # Anything emitted since the batch was taken is newer and wins
+        with self._lock:
+            for row in rows:
+                newer = self._pending.get(row["thread_id"])
+                self._pending[row["thread_id"]] = {**row, **newer} if newer else row
+
+    async def flush(self) -> bool:
+        """Upsert one batch; returns False if the write failed and was requeued"""
+        rows = self._take_batch()
+        if not rows:
+            return True
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._upsert, rows)
+        except Exception as e:
+            print(f"[progress_writer] ❌ Flush of {len(rows)} rows failed: {e}")
+            self._requeue(rows)
+            with self._lock:
+                self.stats["flush_errors"] += 1
+            return False
+        with self._lock:
+            self.stats["flushed_rows"] += len(rows)
+            self.stats["flush_batches"] += 1
+            self.stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+        return True
+
+    def _upsert(self, rows: list):
+        # Coalesced rows can still differ in which progress fields they carry; PostgREST
+        # needs the same keys across one bulk upsert, so write each shape separately
+        shapes = {}
+        for row in rows:
+            shapes.setdefault(frozenset(row), []).append(row)
+        for group in shapes.values():
+            self.client.table(self.table).upsert(group, on_conflict="thread_id").execute()
+
+
+progress_writer = ProgressWriter(
+    max_pending=int(os.getenv("PROGRESS_MAX_PENDING", "5000")),
+    batch_size=int(os.getenv("PROGRESS_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2.0")),
+)
+
+
+def emit_progress(state: dict, config: Optional[dict]):
+    """Called from graph nodes with the state they are about to return"""
+    configurable = (config or {}).get("configurable", {})
+    progress_writer.emit(
+        configurable.get("thread_id"),
+        progress_event(state),
+        user_id=configurable.get("user_id"),
+    )
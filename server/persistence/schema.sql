@@ -0,0 +1,15 @@
+-- Table written by persistence/progress_writer.py (one row per tutoring thread)
+create table if not exists public.session_progress (
+    thread_id text primary key,
+    user_id uuid references auth.users (id),
+    title_slug text,
+    current_checkpoint text,
+    checkpoints_completed jsonb default '[]'::jsonb,
+    progress_scores jsonb default '{}'::jsonb,
+    hints_given jsonb default '[]'::jsonb,
+    total_socratic_turns integer default 0,
+    conversation_complete boolean default false,
+    updated_at timestamptz default now()
+);
+
+create index if not exists session_progress_user_idx on public.session_progress (user_id);
@@ -0,0 +1,28 @@
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+
+from analytics.store import analytics_store
+from auth.middleware import current_user_id, thread_key
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], default_response_class=ORJSONResponse)
+
+
+@router.get("")
+async def analytics(title_slug: Optional[str] = None, top: int = 20):
+    """Stuck rates, turns to each checkpoint and hint effectiveness across all sessions"""
+    started = time.perf_counter()
+    summary = analytics_store.summary(title_slug, top)
+    summary["query_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return summary
+
+
+@router.get("/sessions/{thread_id}")
+async def session_history(thread_id: str, request: Request):
+    """Per-turn score trajectory of one session"""
+    history = analytics_store.session_history(thread_key(current_user_id(request), thread_id))
+    if not history:
+        raise HTTPException(status_code=404, detail="No scored turns for this session")
+    return {"thread_id": thread_id, "history": history}
@@ -0,0 +1,455 @@
+import asyncio
+import os
+import secrets
+import time
+from collections import deque
+from typing import Optional
+
+import orjson
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import HumanMessage
+from starlette.websockets import WebSocketDisconnect
+
+from agent_orchestration.runs import RunRegistry, TurnSuperseded, run_registry
+from auth.middleware import thread_key
+from routes.state_delta import public_state, turn_delta
+
+# === Wire protocol ===
+# Client → server: turn, subscribe, unsubscribe, ping, pong
+# Server → client: welcome, token, state_patch, hint_ready, sync, turn_error, resync, ping, pong, error
+# Frames with a "seq" are durable: kept for resume and never dropped. Token deltas are
+# ephemeral: coalesced when the client reads slowly and never replayed (the state_patch
+# that ends a turn carries the full reply).
+
+HEARTBEAT_S = float(os.getenv("WS_HEARTBEAT_S", "20"))
+# No frame from the client for this long closes the connection
+IDLE_TIMEOUT_S = float(os.getenv("WS_IDLE_TIMEOUT_S", str(HEARTBEAT_S * 3)))
+# Detached sessions (and their replay buffer) are kept this long for a reconnect
+RESUME_TTL_S = float(os.getenv("WS_RESUME_TTL_S", "120"))
+REPLAY_FRAMES = int(os.getenv("WS_REPLAY_FRAMES", "128"))
+# Durable frames waiting on one connection before it is closed as a slow consumer
+MAX_QUEUED_FRAMES = int(os.getenv("WS_MAX_QUEUED_FRAMES", "256"))
+SEND_TIMEOUT_S = float(os.getenv("WS_SEND_TIMEOUT_S", "10"))
+# Token deltas arriving within this window go out as one frame
+TOKEN_FLUSH_S = float(os.getenv("WS_TOKEN_FLUSH_MS", "30")) / 1000
+MAX_TURNS_IN_FLIGHT = int(os.getenv("WS_MAX_TURNS_IN_FLIGHT", "8"))
+
+CLOSE_SLOW_CONSUMER = 4008
+CLOSE_IDLE = 4000
+CLOSE_REPLACED = 4009
+
+
+def encode(frame: dict) -> str:
+    return orjson.dumps(frame).decode()
+
+
+class TokenStream(AsyncCallbackHandler):
+    """Forwards the reply tokens of one turn; only the first streaming request (not a hedge) is used"""
+
+    def __init__(self, on_token, nodes: tuple = ("socratic",)):
+        self.on_token = on_token
+        self.nodes = nodes
+        self._runs = {}
+        self._streaming = None
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._runs[run_id] = (metadata or {}).get("langgraph_node")
+
+    async def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if not token or self._runs.get(run_id) not in self.nodes:
+            return
+        if self._streaming is None:
+            self._streaming = run_id
+        if run_id == self._streaming:
+            self.on_token(token)
+
+
+class Connection:
+    """
+    One WebSocket. Frames are queued and sent by a single writer task, so producers never
+    block on a slow client: token deltas merge into the queued token frame of the same turn,
+    and too many queued durable frames close the connection (the client resumes from seq).
+    """
+
+    def __init__(self, websocket, hub: "SessionHub"):
+        self.websocket = websocket
+        self.hub = hub
+        self.queue = deque()
+        self.durable_queued = 0
+        self.last_seen = time.monotonic()
+        self.closing: Optional[tuple] = None
+        self._ready = asyncio.Event()
+
+    def push(self, text: str):
+        if self.closing:
+            return
+        self.queue.append(text)
+        self.durable_queued += 1
+        if self.durable_queued > self.hub.max_queued_frames:
+            self.hub.stats["slow_consumer_closes"] += 1
+            self.close(CLOSE_SLOW_CONSUMER, "Slow consumer, resume from last seq", drop_queued=True)
+        self._ready.set()
+
+    def push_token(self, thread_id: str, ref: str, delta: str):
+        if self.closing:
+            return
+        tail = self.queue[-1] if self.queue else None
+        if isinstance(tail, dict) and tail["thread_id"] == thread_id and tail["ref"] == ref:
+            tail["delta"] += delta
+            self.hub.stats["tokens_coalesced"] += 1
+        else:
+            self.queue.append({"type": "token", "thread_id": thread_id, "ref": ref, "delta": delta})
+        self._ready.set()
+
+    def send_now(self, frame: dict):
+        """Control frames (welcome, ping, pong, error) skip ahead of queued data"""
+        if not self.closing:
+            self.queue.appendleft(encode(frame))
+            self.durable_queued += 1
+            self._ready.set()
+
+    def close(self, code: int, reason: str, drop_queued: bool = False):
+        if self.closing is None:
+            self.closing = (code, reason)
+            if drop_queued:
+                # Everything durable is in the session's replay buffer
+                self.queue.clear()
+                self.durable_queued = 0
+            self._ready.set()
+
+    async def writer(self):
+        send = self.websocket.send_text
+        while True:
+            await self._ready.wait()
+            if self.hub.token_flush_s and not self.closing and all(isinstance(item, dict) for item in self.queue):
+                # Only token deltas pending: give the stream a moment to batch up
+                await asyncio.sleep(self.hub.token_flush_s)
+            self._ready.clear()
+            while self.queue:
+                item = self.queue.popleft()
+                if isinstance(item, dict):
+                    text = encode(item)
+                else:
+                    text = item
+                    self.durable_queued -= 1
+                try:
+                    await asyncio.wait_for(send(text), self.hub.send_timeout_s)
+                except asyncio.TimeoutError:
+                    self.hub.stats["send_timeouts"] += 1
+                    return
+                except Exception:
+                    # Client went away mid-send; the reader sees the disconnect
+                    return
+                self.hub.stats["frames_sent"] += 1
+            if self.closing:
+                code, reason = self.closing
+                try:
+                    await self.websocket.close(code=code, reason=reason)
+                except Exception:
+                    pass
+                return
+
+    async def reader(self, channel: "Channel"):
+        receive = self.websocket.receive_text
+        while True:
+            try:
+                text = await receive()
+            except (WebSocketDisconnect, RuntimeError):
+                return
+            self.last_seen = time.monotonic()
+            self.hub.handle(channel, self, text)
+
+
+class Channel:
+    """
+    A client session that outlives its connections: sequence numbers, the replay buffer,
+    the thread versions the client has seen, and the turns it started.
+    """
+
+    def __init__(self, user_id: Optional[str], replay_frames: int):
+        self.session_id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.seq = 0
+        self.replay = deque(maxlen=replay_frames)
+        self.versions = {}
+        self.connection: Optional[Connection] = None
+        self.detached_at: Optional[float] = None
+        self.turns = set()
+        self.turn_counter = 0
+
+    def emit(self, frame: dict):
+        self.seq += 1
+        text = encode({**frame, "seq": self.seq})
+        self.replay.append((self.seq, text))
+        if self.connection is not None:
+            self.connection.push(text)
+
+    def token(self, thread_id: str, ref: str, delta: str):
+        if self.connection is not None:
+            self.connection.push_token(thread_id, ref, delta)
+
+    def replay_after(self, last_seq: int) -> Optional[list]:
+        """Frames after `last_seq`, or None if some of them already left the buffer"""
+        if last_seq >= self.seq:
+            return []
+        if not self.replay or self.replay[0][0] > last_seq + 1:
+            return None
+        return [text for seq, text in self.replay if seq > last_seq]
+
+
+class SessionHub:
+    """
+    Multiplexes tutoring threads over one WebSocket per client. Each turn's reply streams as
+    token frames, then a state_patch (the same delta as POST /sessions/{id}/messages) and a
+    hint_ready per new hint. Background scoring results are pushed as state_patch frames to
+    every session watching the thread.
+    """
+
+    def __init__(self, registry: RunRegistry, heartbeat_s: float = HEARTBEAT_S,
+                 idle_timeout_s: float = IDLE_TIMEOUT_S, resume_ttl_s: float = RESUME_TTL_S,
+                 replay_frames: int = REPLAY_FRAMES, max_queued_frames: int = MAX_QUEUED_FRAMES,
+                 send_timeout_s: float = SEND_TIMEOUT_S, max_turns_in_flight: int = MAX_TURNS_IN_FLIGHT,
+                 token_flush_s: float = TOKEN_FLUSH_S):
+        self.registry = registry
+        self.heartbeat_s = heartbeat_s
+        self.idle_timeout_s = idle_timeout_s
+        self.resume_ttl_s = resume_ttl_s
+        self.replay_frames = replay_frames
+        self.max_queued_frames = max_queued_frames
+        self.send_timeout_s = send_timeout_s
+        self.max_turns_in_flight = max_turns_in_flight
+        self.token_flush_s = token_flush_s
+        self._channels = {}
+        self._watchers = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.stats = {
+            "connections_opened": 0,
+            "frames_sent": 0,
+            "tokens_coalesced": 0,
+            "turns": 0,
+            "turns_rejected": 0,
+            "patches_pushed": 0,
+            "resumes": 0,
+            "frames_replayed": 0,
+            "resyncs": 0,
+            "slow_consumer_closes": 0,
+            "idle_closes": 0,
+            "send_timeouts": 0,
+            "bad_frames": 0,
+        }
+        registry.add_listener(self.push_updates)
+
+    # === Connection lifecycle ===
+    async def serve(self, websocket, user_id: Optional[str], session_id: Optional[str] = None,
+                    last_seq: Optional[int] = None):
+        await websocket.accept()
+        self._ensure_started()
+        self.stats["connections_opened"] += 1
+        connection = Connection(websocket, self)
+        channel = self._channels.get(session_id) if session_id else None
+        resumed = channel is not None and channel.user_id == user_id
+        if not resumed:
+            channel = Channel(user_id, self.replay_frames)
+            self._channels[channel.session_id] = channel
+        elif channel.connection is not None:
+            channel.connection.close(CLOSE_REPLACED, "Session resumed on another connection", drop_queued=True)
+        channel.connection = connection
+        channel.detached_at = None
+
+        connection.send_now({"type": "welcome", "session_id": channel.session_id, "seq": channel.seq,
+                             "resumed": resumed, "heartbeat_s": self.heartbeat_s})
+        if resumed:
+            self._resume(channel, connection, last_seq or 0)
+
+        writer = asyncio.create_task(connection.writer())
+        reader = asyncio.create_task(connection.reader(channel))
+        try:
+            await asyncio.wait((writer, reader), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (writer, reader):
+                task.cancel()
+            if channel.connection is connection:
+                channel.connection = None
+                channel.detached_at = time.monotonic()
+
+    def _resume(self, channel: Channel, connection: Connection, last_seq: int):
+        self.stats["resumes"] += 1
+        frames = channel.replay_after(last_seq)
+        if frames is not None:
+            for text in frames:
+                connection.push(text)
+            self.stats["frames_replayed"] += len(frames)
+            return
+        # Missed frames already left the buffer: send full state of every watched thread
+        self.stats["resyncs"] += 1
+        connection.send_now({"type": "resync", "seq": channel.seq})
+        for thread_id in list(channel.versions):
+            self._sync(channel, thread_id)
+
+    def _ensure_started(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._run_heartbeat())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for channel in self._channels.values():
+            for task in channel.turns:
+                task.cancel()
+            if channel.connection is not None:
+                channel.connection.close(1001, "Server shutting down")
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_s)
+            now = time.monotonic()
+            for session_id, channel in list(self._channels.items()):
+                connection = channel.connection
+                if connection is not None:
+                    if now - connection.last_seen > self.idle_timeout_s:
+                        self.stats["idle_closes"] += 1
+                        connection.close(CLOSE_IDLE, "Heartbeat timeout")
+                    else:
+                        connection.send_now({"type": "ping", "t": round(time.time(), 3)})
+                elif now - channel.detached_at > self.resume_ttl_s and not channel.turns:
+                    self._drop(session_id, channel)
+
+    def _drop(self, session_id: str, channel: Channel):
+        del self._channels[session_id]
+        for thread_id in list(channel.versions):
+            self._unwatch(channel, thread_id)
+
+    # === Client frames ===
+    def handle(self, channel: Channel, connection: Connection, text: str):
+        try:
+            frame = orjson.loads(text)
+            kind = frame["type"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            self.stats["bad_frames"] += 1
+            connection.send_now({"type": "error", "detail": "Frames are JSON objects with a type"})
+            return
+
+        if kind in ("pong", "ping"):
+            if kind == "ping":
+                connection.send_now({"type": "pong", "t": frame.get("t")})
+            return
+        thread_id = frame.get("thread_id")
+        if not isinstance(thread_id, str) or not thread_id:
+            self.stats["bad_frames"] += 1
+            connection.send_now({"type": "error", "detail": f"{kind} needs a thread_id"})
+        elif kind == "turn":
+            self._start_turn(channel, thread_id, frame)
+        elif kind == "subscribe":
+            self._watch(channel, thread_id)
+            self._sync(channel, thread_id)
+        elif kind == "unsubscribe":
+            self._unwatch(channel, thread_id)
+        else:
+            self.stats["bad_frames"] += 1
+            connection.send_now({"type": "error", "detail": f"Unknown frame type {kind}"})
+
+    def _watch(self, channel: Channel, thread_id: str):
+        channel.versions.setdefault(thread_id, None)
+        self._watchers.setdefault(thread_key(channel.user_id, thread_id), {})[channel] = thread_id
+
+    def _unwatch(self, channel: Channel, thread_id: str):
+        channel.versions.pop(thread_id, None)
+        key = thread_key(channel.user_id, thread_id)
+        watchers = self._watchers.get(key)
+        if watchers is not None:
+            watchers.pop(channel, None)
+            if not watchers:
+                del self._watchers[key]
+
+    # === Turns ===
+    def _start_turn(self, channel: Channel, thread_id: str, frame: dict):
+        channel.turn_counter += 1
+        ref = str(frame.get("ref") or f"turn-{channel.turn_counter}")
+        content = frame.get("content")
+        if not isinstance(content, str) or not content.strip():
+            channel.emit({"type": "turn_error", "thread_id": thread_id, "ref": ref, "error": "empty"})
+            return
+        if len(channel.turns) >= self.max_turns_in_flight:
+            self.stats["turns_rejected"] += 1
+            channel.emit({"type": "turn_error", "thread_id": thread_id, "ref": ref, "error": "busy"})
+            return
+        self._watch(channel, thread_id)
+        task = asyncio.create_task(self._run_turn(channel, thread_id, ref, content, bool(frame.get("hint_requested"))))
+        channel.turns.add(task)
+        task.add_done_callback(channel.turns.discard)
+
+    async def _run_turn(self, channel: Channel, thread_id: str, ref: str, content: str, hint_requested: bool):
+        self.stats["turns"] += 1
+        key = thread_key(channel.user_id, thread_id)
+        stream = TokenStream(lambda delta: channel.token(thread_id, ref, delta))
+        try:
+            await self.registry.submit(
+                key,
+                [HumanMessage(content=content)],
+                updates={"hint_requested": True} if hint_requested else None,
+                user_id=channel.user_id,
+                callbacks=[stream],
+            )
+        except TurnSuperseded:
+            channel.emit({"type": "turn_error", "thread_id": thread_id, "ref": ref, "error": "superseded"})
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[session_hub] ❌ Turn failed on {key}: {e}")
+            channel.emit({"type": "turn_error", "thread_id": thread_id, "ref": ref, "error": "failed"})
+            return
+        self.push_updates(key, ref=ref)
+
+    # === State pushes ===
+    def _snapshot(self, key: str, version: Optional[str] = None):
+        configurable = {"thread_id": key}
+        if version:
+            configurable["checkpoint_id"] = version
+        return self.registry.graph.get_state({"configurable": configurable})
+
+    def push_updates(self, key: str, ref: Optional[str] = None):
+        """Send every session watching the thread what changed since the version it last saw"""
+        watchers = self._watchers.get(key)
+        if not watchers:
+            return
+        latest = self._snapshot(key)
+        version = latest.config["configurable"].get("checkpoint_id")
+        for channel, thread_id in list(watchers.items()):
+            known = channel.versions.get(thread_id)
+            if known == version:
+                continue
+            base = self._snapshot(key, known) if known else None
+            delta = turn_delta(base.values if base is not None else {}, latest.values)
+            channel.versions[thread_id] = version
+            frame = {"type": "state_patch", "thread_id": thread_id, "version": version, "base_version": known,
+                     **delta}
+            if ref is not None:
+                frame["ref"] = ref
+            channel.emit(frame)
+            for hint in delta.get("new_hints", ()):
+                channel.emit({"type": "hint_ready", "thread_id": thread_id, "version": version, "hint": hint})
+            self.stats["patches_pushed"] += 1
+
+    def _sync(self, channel: Channel, thread_id: str):
+        snapshot = self._snapshot(thread_key(channel.user_id, thread_id))
+        version = snapshot.config["configurable"].get("checkpoint_id") if snapshot.values else None
+        channel.versions[thread_id] = version
+        channel.emit({"type": "sync", "thread_id": thread_id, "version": version,
+                      "state": public_state(snapshot.values) if snapshot.values else None})
+
+    def metrics(self) -> dict:
+        connected = [c.connection for c in self._channels.values() if c.connection is not None]
+        return {
+            **self.stats,
+            "connections": len(connected),
+            "sessions": len(self._channels),
+            "detached_sessions": len(self._channels) - len(connected),
+            "watched_threads": len(self._watchers),
+            "turns_in_flight": sum(len(c.turns) for c in self._channels.values()),
+            "max_queue_depth": max((len(c.queue) for c in connected), default=0),
+        }
+
+
+session_hub = SessionHub(run_registry)
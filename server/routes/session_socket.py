@@ -0,0 +1,18 @@
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket
+
+from auth.middleware import current_user_id
+from routes.session_hub import session_hub
+
+router = APIRouter(tags=["sessions"])
+
+
+@router.websocket("/ws/sessions")
+async def session_socket(websocket: WebSocket, session_id: Optional[str] = None, last_seq: Optional[int] = None):
+    """
+    One connection per client for all of its tutoring threads. Reconnect with the
+    session_id from the welcome frame and the last seq received to resume where it left off.
+    Browsers pass the Supabase token as ?access_token=.
+    """
+    await session_hub.serve(websocket, current_user_id(websocket), session_id, last_seq)
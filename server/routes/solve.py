@@ -0,0 +1,80 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel
+
+from agent_orchestration.runs import run_registry, TurnSuperseded
+from auth.middleware import current_user_id, thread_key
+from routes.state_delta import parse_version, public_state, state_etag, turn_delta
+
+router = APIRouter(prefix="/sessions", tags=["sessions"], default_response_class=ORJSONResponse)
+
+
+class TurnRequest(BaseModel):
+    content: str
+    hint_requested: bool = False
+
+
+def _snapshot(thread_id: str, version: Optional[str] = None):
+    configurable = {"thread_id": thread_id}
+    if version:
+        configurable["checkpoint_id"] = version
+    return run_registry.graph.get_state({"configurable": configurable})
+
+
+@router.post("/{thread_id}/messages")
+async def post_message(thread_id: str, turn: TurnRequest, request: Request,
+                       x_state_version: Optional[str] = Header(None)):
+    """
+    Run one tutoring turn and return only what changed since the client's state version
+    (X-State-Version, the ETag of its last response). Unknown versions get "resync": true,
+    and the client should re-fetch GET /sessions/{thread_id}/state.
+    """
+    user_id = current_user_id(request)
+    key = thread_key(user_id, thread_id)
+    known = parse_version(x_state_version)
+    base = _snapshot(key, known) if known else None
+    resync = known is not None and not base.values
+    if base is None or resync:
+        base = _snapshot(key)
+
+    try:
+        await run_registry.submit(
+            key,
+            [HumanMessage(content=turn.content)],
+            updates={"hint_requested": True} if turn.hint_requested else None,
+            user_id=user_id,
+        )
+    except TurnSuperseded:
+        raise HTTPException(status_code=409, detail="Superseded by a newer message on this thread")
+
+    # Diff against the same snapshot the version comes from (background scoring may write later)
+    latest = _snapshot(key)
+    version = latest.config["configurable"].get("checkpoint_id")
+    body = {
+        "status": "success",
+        "thread_id": thread_id,
+        "version": version,
+        "base_version": base.config["configurable"].get("checkpoint_id") if base.values else None,
+        "resync": resync,
+        **turn_delta(base.values, latest.values),
+    }
+    return ORJSONResponse(body, headers={"ETag": state_etag(version)})
+
+
+@router.get("/{thread_id}/state")
+async def get_state(thread_id: str, request: Request, if_none_match: Optional[str] = Header(None)):
+    """Full client view of a thread; 304 if the client already has this version"""
+    snapshot = _snapshot(thread_key(current_user_id(request), thread_id))
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail="Unknown thread")
+    version = snapshot.config["configurable"].get("checkpoint_id")
+    etag = state_etag(version)
+    if parse_version(if_none_match) == version:
+        return Response(status_code=304, headers={"ETag": etag})
+    return ORJSONResponse(
+        {"thread_id": thread_id, "version": version, "state": public_state(snapshot.values)},
+        headers={"ETag": etag},
+    )
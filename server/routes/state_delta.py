@@ -0,0 +1,73 @@
+from typing import Optional
+
+# Client-visible fields compared between two states to build a turn delta
+DELTA_FIELDS = (
+    "current_checkpoint",
+    "checkpoints_completed",
+    "progress_scores",
+    "needs_guidance",
+    "conversation_complete",
+    "title_slug",
+    "problem_queue",
+)
+
+# Fields returned by the full-state endpoint (never problem HTML or raw analysis)
+PUBLIC_FIELDS = DELTA_FIELDS + (
+    "problem_ref",
+    "hints_given",
+    "total_socratic_turns",
+)
+
+
+def serialize_message(message) -> dict:
+    if isinstance(message, dict):
+        return {"role": message.get("role", "system"), "content": message.get("content", "")}
+    return {"role": getattr(message, "type", "unknown"), "content": getattr(message, "content", str(message))}
+
+
+def state_etag(version: Optional[str]) -> str:
+    """Checkpoint ids are the state versions; every write to a thread gets a new one"""
+    return f'"{version}"' if version else '""'
+
+
+def parse_version(header: Optional[str]) -> Optional[str]:
+    if not header:
+        return None
+    return header.strip().removeprefix("W/").strip('"') or None
+
+
+def public_state(state: dict) -> dict:
+    """Full client view of a thread, for clients that are out of sync"""
+    view = {key: state.get(key) for key in PUBLIC_FIELDS}
+    view["messages"] = [serialize_message(m) for m in state.get("messages", [])]
+    # Problems the thread switched away from, to offer switching back
+    view["problems"] = {
+        slug: {key: parked.get(key) for key in ("current_checkpoint", "conversation_complete", "progress_scores")}
+        for slug, parked in (state.get("problems") or {}).items()
+    }
+    return view
+
+
+def turn_delta(before: dict, after: dict) -> dict:
+    """What changed between two states: new non-user messages, changed fields, new hints"""
+    seen = {getattr(m, "id", None) for m in before.get("messages", [])}
+    messages = [
+        serialize_message(m) for m in after.get("messages", [])
+        if getattr(m, "id", None) not in seen and getattr(m, "type", None) != "human"
+    ]
+    changed = {
+        key: after.get(key) for key in DELTA_FIELDS
+        if after.get(key) != before.get(key)
+    }
+    if "current_checkpoint" in changed:
+        changed["checkpoint_transition"] = {
+            "from": before.get("current_checkpoint"),
+            "to": after.get("current_checkpoint"),
+        }
+    hints = after.get("hints_given") or []
+    new_hints = hints[len(before.get("hints_given") or []):]
+
+    delta = {"messages": messages, "changed": changed}
+    if new_hints:
+        delta["new_hints"] = new_hints
+    return delta
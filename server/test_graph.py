@@ -14,6 +14,7 @@ from typing import Dict, Any
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agent_orchestration.graph import graph
+from agent_orchestration.problem_store import resolve_problem
 from langchain_core.messages import HumanMessage
 
 class Colors:
@@ -68,8 +69,8 @@ class InteractiveHarness:
         print(f"  ✅ Checkpoints Completed: {len(state.get('checkpoints_completed', []))}")
         print(f"  📝 Total Messages: {len(state.get('messages', []))}")
         
-        if state.get('problem_data'):
-            problem = state['problem_data']
+        problem = resolve_problem(state)
+        if problem:
             print(f"  📚 Problem: {problem.get('title', 'Unknown')}")
             print(f"  🎚️ Difficulty: {problem.get('difficulty', 'Unknown')}")
         
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import server packages (persistence, agent_orchestration, ...) the way main.py does
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,175 @@
+"""Local Supabase JWT verification and the auth middleware, against locally minted tokens"""
+
+import asyncio
+import json
+import time
+import uuid
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from auth.middleware import SupabaseAuthMiddleware, current_user_id, thread_key
+from auth.supabase_jwt import AuthError, JWKSCache, TokenVerifier
+
+ISSUER = "https://local-project.supabase.co/auth/v1"
+SECRET = "local-test-jwt-secret-with-at-least-32-bytes"
+
+
+class LocalProject:
+    """Mints tokens the way Supabase Auth does and serves the matching JWKS"""
+
+    def __init__(self):
+        self.keys = {}
+        self.fetches = 0
+        self.rotate()
+
+    def rotate(self) -> str:
+        kid = uuid.uuid4().hex[:12]
+        self.keys[kid] = ec.generate_private_key(ec.SECP256R1())
+        self.current = kid
+        return kid
+
+    async def fetch(self, url: str) -> dict:
+        self.fetches += 1
+        keys = []
+        for kid, private_key in self.keys.items():
+            jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key()))
+            keys.append({**jwk, "kid": kid, "alg": "ES256", "use": "sig"})
+        return {"keys": keys}
+
+    def mint(self, sub: str, expires_in: int = 3600, audience: str = "authenticated",
+             algorithm: str = "ES256", kid=None) -> str:
+        now = int(time.time())
+        claims = {"sub": sub, "aud": audience, "iss": ISSUER, "iat": now, "exp": now + expires_in,
+                  "role": "authenticated"}
+        if algorithm == "HS256":
+            return jwt.encode(claims, SECRET, algorithm="HS256")
+        kid = kid or self.current
+        return jwt.encode(claims, self.keys[kid], algorithm="ES256", headers={"kid": kid})
+
+
+def new_verifier(project: LocalProject) -> TokenVerifier:
+    jwks = JWKSCache("https://local-project.supabase.co/auth/v1/.well-known/jwks.json",
+                     fetch=project.fetch, min_refresh_s=60)
+    return TokenVerifier(jwks=jwks, secret=SECRET, issuer=ISSUER)
+
+
+def whoami_app(verifier: TokenVerifier, required: bool) -> FastAPI:
+    """Echoes the thread key a request for /whoami/{thread_id} resolves to"""
+    app = FastAPI()
+    app.add_middleware(SupabaseAuthMiddleware, verifier=verifier, required=required)
+
+    @app.get("/whoami/{thread_id}")
+    async def whoami(thread_id: str, request: Request):
+        return {"thread": thread_key(current_user_id(request), thread_id)}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+def with_verifier(project: LocalProject, scenario):
+    """Run scenario(verifier) with the JWKS loaded, as the app does at startup"""
+    async def run():
+        verifier = new_verifier(project)
+        await verifier.jwks.start()
+        try:
+            return await scenario(verifier)
+        finally:
+            await verifier.jwks.stop()
+
+    return asyncio.run(run())
+
+
+def tampered(token: str) -> str:
+    return token[:-4] + ("AAAA" if token[-4:] != "AAAA" else "BBBB")
+
+
+@pytest.mark.parametrize("mint", [
+    lambda project: project.mint("user-a"),
+    lambda project: project.mint("user-b", algorithm="HS256"),
+], ids=["es256", "hs256"])
+def test_valid_tokens_are_accepted(mint):
+    project = LocalProject()
+    token = mint(project)
+    claims = with_verifier(project, lambda verifier: verifier.verify(token))
+    assert claims["sub"] in ("user-a", "user-b")
+
+
+@pytest.mark.parametrize("mint", [
+    lambda project: project.mint("user-a", expires_in=-120),
+    lambda project: project.mint("user-a", audience="anon"),
+    lambda project: tampered(project.mint("user-a")),
+    lambda project: jwt.encode({"sub": "x", "exp": int(time.time()) + 60}, None, algorithm="none"),
+], ids=["expired", "wrong-audience", "tampered-signature", "alg-none"])
+def test_invalid_tokens_are_rejected(mint):
+    project = LocalProject()
+    token = mint(project)
+    with pytest.raises(AuthError):
+        with_verifier(project, lambda verifier: verifier.verify(token))
+
+
+def test_rotated_key_refetches_the_jwks_once():
+    project = LocalProject()
+
+    async def scenario(verifier):
+        verifier.jwks._fetched_at -= verifier.jwks.min_refresh_s  # the startup fetch was a while ago
+        fetches = project.fetches
+        claims = await verifier.verify(project.mint("user-c", kid=project.rotate()))
+        return claims, project.fetches - fetches
+
+    claims, fetches = with_verifier(project, scenario)
+    assert claims["sub"] == "user-c"
+    assert fetches == 1
+
+
+def test_unknown_kids_do_not_refetch_inside_the_refresh_interval():
+    project = LocalProject()
+    orphan = LocalProject()
+
+    async def scenario(verifier):
+        fetches = project.fetches
+        for _ in range(5):
+            with pytest.raises(AuthError):
+                await verifier.verify(orphan.mint("user-d"))
+        return project.fetches - fetches
+
+    assert with_verifier(project, scenario) == 0
+
+
+def test_repeat_token_is_served_from_the_cache():
+    project = LocalProject()
+    token = project.mint("user-a")
+
+    async def scenario(verifier):
+        await verifier.verify(token)
+        hits = verifier.stats["cache_hits"]
+        await verifier.verify(token)
+        return verifier.stats["cache_hits"] - hits
+
+    assert with_verifier(project, scenario) == 1
+
+
+def test_required_auth_middleware():
+    project = LocalProject()
+    with TestClient(whoami_app(new_verifier(project), required=True)) as client:
+        assert client.get("/whoami/t1").status_code == 401
+        assert client.get("/health").status_code == 200
+        response = client.get("/whoami/t1", headers={"Authorization": f"Bearer {project.mint('user-a')}"})
+        assert response.status_code == 200
+        assert response.json()["thread"] == "user-a:t1"
+        expired = project.mint("user-a", expires_in=-120)
+        assert client.get("/whoami/t1", headers={"Authorization": f"Bearer {expired}"}).status_code == 401
+
+
+def test_anonymous_request_cannot_name_a_users_thread():
+    project = LocalProject()
+    with TestClient(whoami_app(new_verifier(project), required=False)) as client:
+        owned = client.get("/whoami/t1", headers={"Authorization": f"Bearer {project.mint('user-a')}"}).json()
+        spoofed = client.get("/whoami/user-a:t1").json()
+    assert spoofed["thread"] != owned["thread"]
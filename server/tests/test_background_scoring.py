@@ -0,0 +1,62 @@
+"""Background scoring: side effects (progress, analytics, hint prefetch) only for applied scores"""
+
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.background import JobQueue
+from agent_orchestration.graph import interactive_graph, score_turn
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import RunRegistry
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems
+
+
+@pytest.fixture
+def fake_llm():
+    models = {node: ScriptedChatModel(latency=lambda: 0.05) for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())):
+        yield
+
+
+async def two_turns(scoring_wait_s: float) -> tuple:
+    """Two turns on one thread; scoring of the second is held until the third turn is routed"""
+    recorded = []
+    release = asyncio.Event()
+
+    async def held_scorer(state, config):
+        updates = await score_turn(state, config)
+        await release.wait()
+        return updates
+
+    registry = RunRegistry(interactive_graph, background=JobQueue(workers=2), scorer=held_scorer,
+                           scoring_wait_s=scoring_wait_s, on_scored=lambda *args: recorded.append(args))
+    thread_id = f"scoring-{uuid.uuid4().hex[:8]}"
+    release.set()
+    await registry.submit(thread_id, [HumanMessage(content="https://leetcode.com/problems/two-sum/")])
+    await registry.background.wait_for_thread(thread_id, 5)
+    release.clear()
+    await registry.submit(thread_id, [HumanMessage(content="I'd check every pair")])
+
+    third = asyncio.create_task(registry.submit(thread_id, [HumanMessage(content="Maybe a hash map?")]))
+    await asyncio.sleep(0.02)
+    release.set()
+    await third
+    await registry.background.stop()
+    return registry, recorded
+
+
+def test_applied_scoring_is_recorded(fake_llm):
+    registry, recorded = asyncio.run(two_turns(scoring_wait_s=5.0))
+    assert registry.stats["scoring_stale"] == 0
+    assert len(recorded) == registry.stats["scoring_applied"] == 3
+
+
+def test_stale_scoring_is_not_recorded(fake_llm):
+    # The third turn stops waiting and routes on the old scores; the held scoring is then stale
+    registry, recorded = asyncio.run(two_turns(scoring_wait_s=0.0))
+    assert registry.stats["scoring_stale"] == 1
+    assert len(recorded) == registry.stats["scoring_applied"] == 2
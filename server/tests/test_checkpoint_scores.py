@@ -0,0 +1,74 @@
+"""checkpoint_node keeps a turn's scores even when the LLM returns out-of-range values"""
+
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent_orchestration.agents import checkpoint_node as node
+from agent_orchestration.graph import scored_checkpoint_node
+from analytics.store import AnalyticsStore, clamp_score
+
+
+def test_clamp_score():
+    assert [clamp_score(value, 50) for value in (300, -5, "85", 42.6, "high", None, float("nan"))] == [
+        100, 0, 85, 43, 50, 50, 50,
+    ]
+
+
+def test_record_turn_clamps_scores():
+    store = AnalyticsStore()
+    store.record_turn("t1", "two-sum", 1, "planning", {"problem_understanding": 300, "approach_clarity": -5}, False)
+    assert store.turns["scores"][0].tolist() == [100, 0, 0, 0, 0]
+
+
+def test_out_of_range_scores_are_clamped_not_dropped(monkeypatch):
+    reply = {
+        "checkpoint": "planning",
+        "problem_understanding": 300,
+        "approach_clarity": -5,
+        "implementation_readiness": "unknown",
+        "complexity_awareness": 70,
+        "completion_confidence": 20,
+    }
+
+    async def fake_call_llm(name, messages):
+        return AIMessage(content=json.dumps(reply))
+
+    store = AnalyticsStore()
+    monkeypatch.setattr(node, "call_llm", fake_call_llm)
+    monkeypatch.setattr("analytics.store.analytics_store", store)
+    state = {
+        "messages": [HumanMessage(content="I'd use a hash map")],
+        "current_checkpoint": "understanding",
+        "problem_ref": {"title_slug": "two-sum"},
+    }
+    config = {"configurable": {"thread_id": "scores-test"}}
+
+    updates = asyncio.run(scored_checkpoint_node(state, config))
+
+    assert updates["current_checkpoint"] == "planning"
+    assert updates["progress_scores"] == {
+        "problem_understanding": 100,
+        "approach_clarity": 0,
+        "implementation_readiness": 50,
+        "complexity_awareness": 70,
+        "completion_confidence": 20,
+    }
+    assert store.turns.size == 1
+
+
+def test_evicted_session_resumes_without_recounting_milestones():
+    store = AnalyticsStore()
+    scores = {"problem_understanding": 60, "approach_clarity": 40}
+    store.record_turn("t1", "two-sum", 1, "understanding", scores, False)
+    store.record_turn("t1", "two-sum", 2, "planning", scores, False)
+    milestones = store.milestones.size
+
+    store.evict("t1")
+    assert "t1" not in store._sessions
+    previous = {"checkpoints_completed": ["understanding", "planning"], "progress_scores": scores}
+    store.record_turn("t1", "two-sum", 3, "planning", scores, False, previous=previous)
+
+    assert store.milestones.size == milestones
+    assert store.turns["delta"][-1] == 0.0
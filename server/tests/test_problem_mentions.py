@@ -0,0 +1,40 @@
+"""Which mentions switch a thread's problem, and failed fetches not being retried"""
+
+import asyncio
+
+import pytest
+
+from agent_orchestration.agents import ingest_node
+from agent_orchestration.agents.ingest_node import find_problem_slugs, find_switch_slugs, load_problem
+from agent_orchestration.problem_store import problem_store
+
+
+def test_first_message_takes_any_mention():
+    assert find_problem_slugs("@two-sum then https://leetcode.com/problems/3sum/") == ["two-sum", "3sum"]
+
+
+def test_switch_needs_a_url_or_a_known_problem():
+    problem_store.intern({"title_slug": "mentions-known", "title": "Known"})
+    text = "Could @lru_cache help? cc @alice, or @mentions-known, or https://leetcode.com/problems/new-one/"
+    assert find_switch_slugs(text) == ["mentions-known", "new-one"]
+
+
+def test_failed_fetch_is_cached(monkeypatch):
+    calls = []
+
+    class FailingFetch:
+        async def ainvoke(self, title_slug):
+            calls.append(title_slug)
+            raise ValueError(f"no problem called {title_slug}")
+
+    monkeypatch.setattr(ingest_node, "fetch_leetcode_problem", FailingFetch())
+    monkeypatch.setattr(ingest_node, "_failed", {})
+
+    async def load_twice():
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await load_problem("mentions-missing")
+
+    asyncio.run(load_twice())
+    assert calls == ["mentions-missing"]
+    assert find_switch_slugs("https://leetcode.com/problems/mentions-missing/") == []
@@ -0,0 +1,135 @@
+"""Write-behind progress writer against the in-process PostgREST stand-in"""
+
+import asyncio
+import threading
+
+from persistence.progress_writer import LocalPostgrest, ProgressWriter, PROGRESS_TABLE
+
+
+class SlowPostgrest(LocalPostgrest):
+    """Holds every upsert until `release` is set, so a flush can be caught mid-write"""
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def table(self, name: str):
+        table = super().table(name)
+        execute = table.execute
+
+        def slow_execute():
+            self.writing.set()
+            self.release.wait(timeout=5)
+            return execute()
+
+        table.execute = slow_execute
+        return table
+
+
+def rows(client: LocalPostgrest) -> dict:
+    return client.tables.get(PROGRESS_TABLE, {})
+
+
+def test_updates_for_a_thread_coalesce_into_one_row():
+    client = LocalPostgrest()
+    writer = ProgressWriter(client=client)
+    writer.emit("t1", {"current_checkpoint": "restate"})
+    writer.emit("t1", {"current_checkpoint": "brute_force", "hints_given": ["h1"]})
+    writer.emit("t2", {"current_checkpoint": "restate"}, user_id="u1")
+
+    assert asyncio.run(writer.flush())
+    assert writer.stats["flushed_rows"] == 2
+    assert writer.stats["coalesced"] == 1
+    assert rows(client)["t1"]["current_checkpoint"] == "brute_force"
+    assert rows(client)["t1"]["hints_given"] == ["h1"]
+    assert rows(client)["t2"]["user_id"] == "u1"
+
+
+def test_rows_in_one_upsert_share_their_columns():
+    client = LocalPostgrest()
+    upserted = []
+    upsert = client.table
+
+    def recording_table(name):
+        table = upsert(name)
+        original = table.upsert
+        table.upsert = lambda batch, **kwargs: upserted.append(batch) or original(batch, **kwargs)
+        return table
+
+    client.table = recording_table
+    writer = ProgressWriter(client=client)
+    writer.emit("anonymous", {"current_checkpoint": "restate"})
+    writer.emit("signed-in", {"current_checkpoint": "restate"}, user_id="u1")
+    writer.emit("scored", {"progress_scores": {"restate": 80}})
+
+    assert asyncio.run(writer.flush())
+    for batch in upserted:
+        assert len({frozenset(row) for row in batch}) == 1
+    assert rows(client)["anonymous"]["user_id"] is None
+    assert sum(len(batch) for batch in upserted) == 3
+
+
+def test_new_threads_are_dropped_once_max_pending_is_reached():
+    writer = ProgressWriter(client=LocalPostgrest(), max_pending=2)
+    for thread_id in ("t1", "t2", "t3"):
+        writer.emit(thread_id, {"current_checkpoint": "restate"})
+    # Threads already buffered still take updates
+    writer.emit("t1", {"current_checkpoint": "brute_force"})
+
+    assert writer.depth() == 2
+    assert writer.stats["dropped"] == 1
+    assert writer.stats["coalesced"] == 1
+
+
+def test_failed_flush_is_requeued_and_newer_updates_win():
+    client = LocalPostgrest()
+    client.fail_next = 1
+    writer = ProgressWriter(client=client)
+    writer.emit("t1", {"current_checkpoint": "restate", "hints_given": []})
+
+    async def scenario():
+        assert not await writer.flush()
+        writer.emit("t1", {"current_checkpoint": "brute_force"})
+        assert await writer.flush()
+
+    asyncio.run(scenario())
+    assert writer.stats["flush_errors"] == 1
+    assert writer.depth() == 0
+    assert rows(client)["t1"]["current_checkpoint"] == "brute_force"
+    assert rows(client)["t1"]["hints_given"] == []
+
+
+def test_stop_drains_everything_buffered():
+    client = LocalPostgrest()
+    writer = ProgressWriter(client=client, batch_size=2, flush_interval=60)
+
+    async def scenario():
+        await writer.start()
+        for index in range(5):
+            writer.emit(f"t{index}", {"current_checkpoint": "restate"})
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert writer.depth() == 0
+    assert len(rows(client)) == 5
+    assert writer.stats["flushed_rows"] == 5
+
+
+def test_stop_during_an_upsert_keeps_its_batch():
+    client = SlowPostgrest()
+    writer = ProgressWriter(client=client, batch_size=1, flush_interval=60)
+
+    async def scenario():
+        await writer.start()
+        writer.emit("t1", {"current_checkpoint": "restate"})
+        await asyncio.to_thread(client.writing.wait, 5)
+        writer.emit("t2", {"current_checkpoint": "restate"})
+        stopping = asyncio.create_task(writer.stop())
+        await asyncio.sleep(0.05)
+        client.release.set()
+        await stopping
+
+    asyncio.run(scenario())
+    assert set(rows(client)) == {"t1", "t2"}
+    assert writer.stats["flushed_rows"] == 2
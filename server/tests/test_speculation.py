@@ -0,0 +1,50 @@
+"""Speculative hint slots: tokens are counted as used or wasted even across supersessions"""
+
+import asyncio
+
+from agent_orchestration.speculation import HintSpeculator
+
+KEY = ("two-sum", "planning", "approach_clarity")
+
+
+def slow_hint(release: asyncio.Event, tokens: int = 120):
+    async def build():
+        await release.wait()
+        return {"content": "What do you need to look up for each number?", "tokens": tokens}
+    return build
+
+
+async def cancelled_take(speculator: HintSpeculator, release: asyncio.Event):
+    """A hint_node waiting on the slot is cancelled (superseded) before the hint is ready"""
+    speculator.submit("t1", KEY, 3, slow_hint(release))
+    waiting = asyncio.create_task(speculator.take("t1", KEY, 3))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    release.set()
+    await asyncio.sleep(0.01)
+
+
+def test_superseded_take_leaves_the_hint_for_the_replayed_turn():
+    speculator = HintSpeculator()
+
+    async def scenario():
+        await cancelled_take(speculator, asyncio.Event())
+        return await speculator.take("t1", KEY, 3)
+
+    assert asyncio.run(scenario())["tokens"] == 120
+    assert speculator.stats["hits"] == 1
+    assert speculator.stats["used_tokens"] == 120
+    assert speculator.metrics()["slots"] == 0
+
+
+def test_superseded_hint_never_taken_counts_as_wasted():
+    speculator = HintSpeculator()
+
+    async def scenario():
+        await cancelled_take(speculator, asyncio.Event())
+        speculator.evict("t1")
+
+    asyncio.run(scenario())
+    assert speculator.stats["wasted_tokens"] == 120
+    assert speculator.metrics()["wasted_token_rate"] == 1.0
@@ -0,0 +1,76 @@
+"""RunRegistry.submit supersession: a newer message cancels the in-flight turn on the thread"""
+
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent_orchestration.graph import graph
+from agent_orchestration.llm import LLM_SETTINGS
+from agent_orchestration.runs import RunRegistry, TurnSuperseded
+from benchmarks.cassette import ProblemFetcher, patched_backends
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.replay import load_fixture_problems
+
+LLM_LATENCY_S = 0.2
+STALE = "Is it about sums?"
+FOLLOW_UP = "Maybe a hash map of complements?"
+
+
+@pytest.fixture
+def slow_llm():
+    models = {node: ScriptedChatModel(latency=lambda: LLM_LATENCY_S) for node in LLM_SETTINGS}
+    with patched_backends(models, ProblemFetcher(load_fixture_problems())):
+        yield
+
+
+async def superseded_session(registry: RunRegistry):
+    """
+    One thread: the problem URL, then a turn superseded by a follow-up once its first LLM
+    reply is already checkpointed and the next call is in flight
+    """
+    thread_id = f"supersede-{uuid.uuid4().hex[:8]}"
+    before = await registry.submit(thread_id, [HumanMessage(content="https://leetcode.com/problems/two-sum/")])
+    stats = dict(registry.stats)
+    stale = asyncio.create_task(registry.submit(thread_id, [HumanMessage(content=STALE)]))
+    await asyncio.sleep(LLM_LATENCY_S * 1.5)
+    after = await registry.submit(thread_id, [HumanMessage(content=FOLLOW_UP)])
+    stale_error = None
+    try:
+        await stale
+    except TurnSuperseded as e:
+        stale_error = e
+    return thread_id, before, after, stats, stale_error
+
+
+def test_superseded_turn_raises_and_is_replayed_once(slow_llm):
+    registry = RunRegistry(graph)
+    _, before, after, _, stale_error = asyncio.run(superseded_session(registry))
+
+    assert isinstance(stale_error, TurnSuperseded)
+    human = [m.content for m in after["messages"] if m.type == "human"]
+    assert human.count(STALE) == 1
+    assert human.count(FOLLOW_UP) == 1
+    assert human[-2:] == [STALE, FOLLOW_UP]
+
+
+def test_cancelled_reply_never_reaches_the_checkpoint(slow_llm):
+    registry = RunRegistry(graph)
+    thread_id, before, after, _, _ = asyncio.run(superseded_session(registry))
+    checkpointed = graph.get_state({"configurable": {"thread_id": thread_id}}).values
+
+    new = checkpointed["messages"][len(before["messages"]):]
+    assert [m.type for m in new[:2]] == ["human", "human"], "the cancelled turn wrote a reply"
+    # The rolled-back thread continues from the state before the cancelled turn
+    assert checkpointed["messages"][:len(before["messages"])] == before["messages"]
+
+
+def test_supersession_is_counted(slow_llm):
+    registry = RunRegistry(graph)
+    _, _, _, stats, _ = asyncio.run(superseded_session(registry))
+
+    assert registry.stats["runs_cancelled"] == stats["runs_cancelled"] + 1
+    assert registry.stats["tokens_saved_estimate"] > stats["tokens_saved_estimate"]
+    assert registry.metrics()["active_runs"] == 0
+